@@ -0,0 +1,56 @@
+"""
+Skeleton extraction cost on generated Python files of growing size.
+
+    python -m benchmarks.bench_syntax_analyzer
+
+With linear scaling the per-line cost stays flat as the file grows.
+"""
+import time
+import warnings
+
+from src.core.syntax_analyzer import SyntaxAnalyzer
+
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+
+def generate_module(lines: int) -> str:
+    chunk = [
+        "class Handler{i}(Base):",
+        "    def handle(self, request, *args, **kwargs):",
+        "        value = request.get('value', {i})",
+        "        return self.process(value) + {i}",
+        "",
+        "def helper_{i}(a, b=None):",
+        "    if b is None:",
+        "        return a",
+        "    return a + b",
+        "",
+    ]
+    out = []
+    i = 0
+    while len(out) < lines:
+        out.extend(line.format(i=i) for line in chunk)
+        i += 1
+    return "\n".join(out[:lines]) + "\n"
+
+
+def measure(code: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        SyntaxAnalyzer.get_backbone(code, "generated.py")
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    SyntaxAnalyzer.get_backbone("def warmup():\n    pass\n", "warmup.py")
+
+    print(f"{'lines':>8} {'seconds':>10} {'us/line':>10}")
+    for lines in (6_250, 12_500, 25_000, 50_000):
+        seconds = measure(generate_module(lines))
+        print(f"{lines:>8} {seconds:>10.3f} {seconds / lines * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
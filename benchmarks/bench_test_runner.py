@@ -0,0 +1,78 @@
+"""
+run_tests latency with a cold pytest process per call vs. the warm forking runner,
+on a generated project whose tests import a heavy third-party package.
+
+    python -m benchmarks.bench_test_runner
+
+The first warm run pays for starting the worker; later runs only pay for the fork.
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from src.core.config import settings
+from src.core.warm_runner import WarmRunner
+from src.tools.test_tool import run_pytest
+
+HEAVY_MODULES = 400
+RUNS = 5
+
+
+def make_heavy_package(site: Path):
+    package = site / "heavydep"
+    package.mkdir(parents=True)
+    lines = []
+    for i in range(HEAVY_MODULES):
+        body = "".join(f"class Model{j}:\n    field = {j}\n    def method(self):\n        return {j}\n\n" for j in range(50))
+        (package / f"mod{i}.py").write_text(body + f"TABLE = {{k: k * {i} for k in range(2000)}}\n")
+        lines.append(f"from . import mod{i}")
+    (package / "__init__.py").write_text("\n".join(lines) + "\n")
+
+
+def make_project(root: Path):
+    (root / "pytest.ini").write_text("[pytest]\n")
+    (root / "app.py").write_text("def double(x):\n    return x * 2\n")
+    tests = root / "tests"
+    tests.mkdir()
+    for i in range(5):
+        (tests / f"test_app_{i}.py").write_text(
+            "import heavydep\nfrom app import double\n\n"
+            f"def test_double():\n    assert double({i}) == {i * 2}\n"
+        )
+    (tests / "conftest.py").write_text(
+        "import os, sys\nsys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))\n"
+    )
+
+
+def measure(root: Path, mode: str):
+    settings.TEST_RUNNER_MODE = mode
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = run_pytest(root, ["tests"], 300)
+        timings.append(time.perf_counter() - started)
+        assert result.passed, result.output
+    return timings
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        site, root = Path(tmp) / "site", Path(tmp) / "project"
+        root.mkdir()
+        make_heavy_package(site)
+        make_project(root)
+        os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [str(site), os.environ.get("PYTHONPATH")]))
+        os.environ["PYTHONDONTWRITEBYTECODE"] = "1"
+
+        cold = measure(root, "cold")
+        warm = measure(root, "warm")
+        WarmRunner.drop(str(root))
+
+    print(f"{'mode':>6} {'first':>8} {'median':>8}")
+    for name, timings in (("cold", cold), ("warm", warm)):
+        print(f"{name:>6} {timings[0]:>8.2f} {sorted(timings)[len(timings) // 2]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
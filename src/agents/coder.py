@@ -1,13 +1,27 @@
+import asyncio
+import contextvars
+import json
 import operator
-from typing import Annotated, List, TypedDict
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Annotated, Dict, FrozenSet, List, Optional, Tuple, TypedDict
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.load import dumps, loads
+from langchain_core.runnables import RunnableLambda
+from langchain_core.messages import (
+    SystemMessage, BaseMessage, HumanMessage, ToolMessage, AIMessage, AIMessageChunk, message_chunk_to_message,
+)
 
 from src.core.config import settings
+from src.core.llm_cache import get_llm_cache
+from src.core.tracing import span, traced
+from src.agents.context_manager import ContextManager
 from src.agents.prompts import CODER_SYSTEM_PROMPT
-from src.tools import TOOLS
+from src.tools import TOOLS, READ_ONLY_TOOLS, written_paths
 from src.logger import log
 
 
@@ -16,25 +30,44 @@ class CoderState(TypedDict):
     messages: Annotated[List[BaseMessage], operator.add]
     iterations: int
     is_complete: bool
+    context_tokens: Annotated[List[int], operator.add]
+    usage: Annotated[List[dict], operator.add]
 
 
 class ToolExecutorNode:
-    def __init__(self, tools):
+    """
+    Runs the tool calls of one model turn on a thread pool.
+
+    Calls only wait for earlier calls they conflict with: reads of a file wait
+    for earlier writes to it, writes wait for everything earlier on the files
+    they change (all the files of an `apply_edits` batch), and tools touching
+    the whole workspace (`run_tests`, unknown tools) wait for all earlier
+    writes or calls. Independent reads run side by side.
+    ToolMessages are returned in the order of `tool_calls`.
+    """
+
+    def __init__(self, tools, max_workers: int = 4):
         self.tool_map = {tool.name: tool for tool in tools}
-
-    def __call__(self, state: CoderState):
-        last_message = state["messages"][-1]
-        if not hasattr(last_message, 'tool_calls') or not last_message.tool_calls:
-            return {"messages": []}
-
-        tool_messages = []
-        for tool_call in last_message.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-
-            log.info(f"Executing tool: {tool_name}")
-            log.debug(f"Tool args: {tool_args}")
-
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._prefetched: Dict[str, Future] = {}
+
+    @staticmethod
+    def _resource(tool_name: str, tool_args) -> Tuple[FrozenSet[str], bool]:
+        """Returns (paths, writes); path '*' stands for the whole workspace."""
+        if tool_name in READ_ONLY_TOOLS:
+            path = tool_args.get("filepath") if isinstance(tool_args, dict) else None
+            return frozenset([os.path.normpath(path) if path else "*"]), False
+        return frozenset(written_paths(tool_name, tool_args) or ["*"]), True
+
+    def _invoke(self, tool_call) -> ToolMessage:
+        tool_name = tool_call["name"]
+        tool_args = tool_call["args"]
+
+        log.info(f"Executing tool: {tool_name}")
+        log.debug(f"Tool args: {tool_args}")
+
+        started = time.perf_counter()
+        with span(f"tool.{tool_name}") as tool_span:
             try:
                 tool = self.tool_map.get(tool_name)
                 if not tool:
@@ -49,44 +82,247 @@ class ToolExecutorNode:
                 error_msg = f"Error executing {tool_name}: {str(e)}"
                 log.error(f"{error_msg}")
                 result = error_msg
+                # The error goes back to the model as the tool's output, the span still records it
+                if tool_span:
+                    tool_span.error = error_msg
+
+        duration = time.perf_counter() - started
+        log.debug(f"{tool_name} took {duration:.3f}s")
+
+        return ToolMessage(
+            content=str(result),
+            tool_call_id=tool_call["id"],
+            name=tool_name,
+            response_metadata={"duration": round(duration, 4)},
+        )
 
-            tool_message = ToolMessage(
-                content=str(result),
-                tool_call_id=tool_call["id"],
-                name=tool_name
-            )
-            tool_messages.append(tool_message)
+    def _invoke_after(self, dependencies: List[Future], tool_call) -> ToolMessage:
+        wait(dependencies)
+        return self._invoke(tool_call)
+
+    def prefetch(self, tool_call) -> bool:
+        """
+        Starts a read-only call while the model is still streaming the rest of
+        its response. Returns False for any other call: those run in order in
+        the tools node, and so must every call after them.
+        """
+        if tool_call["name"] not in READ_ONLY_TOOLS or not tool_call.get("id"):
+            return False
+        if tool_call["id"] not in self._prefetched:
+            context = contextvars.copy_context()
+            self._prefetched[tool_call["id"]] = self.executor.submit(context.run, self._invoke, tool_call)
+        return True
+
+    @staticmethod
+    def _conflicting(scheduled, paths: FrozenSet[str], writes: bool) -> list:
+        return [
+            future for other_paths, other_writes, future in scheduled
+            if (writes or other_writes) and (paths & other_paths or "*" in paths | other_paths)
+        ]
+
+    @traced("tools")
+    def __call__(self, state: CoderState):
+        last_message = state["messages"][-1]
+        if not hasattr(last_message, 'tool_calls') or not last_message.tool_calls:
+            return {"messages": []}
 
-        return {"messages": tool_messages}
+        scheduled = []
+        for tool_call in last_message.tool_calls:
+            paths, writes = self._resource(tool_call["name"], tool_call["args"])
+            dependencies = self._conflicting(scheduled, paths, writes)
+            future = self._prefetched.pop(tool_call["id"], None)
+            if future is None:
+                # Tools read the workspace from a context variable, every call gets its own copy
+                context = contextvars.copy_context()
+                future = self.executor.submit(context.run, self._invoke_after, dependencies, tool_call)
+            scheduled.append((paths, writes, future))
+
+        self._prefetched.clear()
+        return {"messages": [future.result() for _, _, future in scheduled]}
+
+    async def _ainvoke_after(self, dependencies: List[asyncio.Future], tool_call) -> ToolMessage:
+        if dependencies:
+            await asyncio.wait(dependencies)
+        # Tools are blocking functions, to_thread runs them with a copy of the current context
+        return await asyncio.to_thread(self._invoke, tool_call)
+
+    @traced("tools")
+    async def acall(self, state: CoderState):
+        """Same scheduling as `__call__`, with the waiting done on the event loop."""
+        last_message = state["messages"][-1]
+        if not hasattr(last_message, 'tool_calls') or not last_message.tool_calls:
+            return {"messages": []}
+
+        scheduled = []
+        for tool_call in last_message.tool_calls:
+            paths, writes = self._resource(tool_call["name"], tool_call["args"])
+            dependencies = self._conflicting(scheduled, paths, writes)
+            prefetched = self._prefetched.pop(tool_call["id"], None)
+            if prefetched is not None:
+                task = asyncio.wrap_future(prefetched)
+            else:
+                task = asyncio.ensure_future(self._ainvoke_after(dependencies, tool_call))
+            scheduled.append((paths, writes, task))
+
+        self._prefetched.clear()
+        return {"messages": list(await asyncio.gather(*(task for _, _, task in scheduled)))}
+
+
+class StreamCollector:
+    """
+    Accumulates a streamed completion. A tool call is complete once the next one
+    starts, and read-only calls are dispatched right then, while the model is
+    still generating. The stream is always read to the end: a model may follow
+    its prose with tool calls, and only the finished message tells
+    `_should_continue` whether it is done.
+    """
+
+    def __init__(self, executor: ToolExecutorNode):
+        self.executor = executor
+        self.response: Optional[AIMessageChunk] = None
+        self.dispatched = 0
+        self.early = True
+
+    @staticmethod
+    def _parse_tool_call(chunk: dict) -> Optional[dict]:
+        try:
+            args = json.loads(chunk.get("args") or "{}")
+        except json.JSONDecodeError:
+            return None
+        return {"id": chunk.get("id"), "name": chunk.get("name"), "args": args}
+
+    def feed(self, chunk: AIMessageChunk):
+        self.response = chunk if self.response is None else self.response + chunk
+        calls = self.response.tool_call_chunks
+        while self.early and self.dispatched < len(calls) - 1:
+            tool_call = self._parse_tool_call(calls[self.dispatched])
+            self.early = tool_call is not None and self.executor.prefetch(tool_call)
+            self.dispatched += 1
+
+    def message(self) -> AIMessage:
+        if self.response is None:
+            return AIMessage(content="")
+        return message_chunk_to_message(self.response)
 
 
 class CoderAgent:
-    def __init__(self, ):
+    def __init__(self, checkpointer: Optional[BaseCheckpointSaver] = None):
         self.tools = TOOLS
+        # With a checkpointer, runs on the same thread id continue one conversation
+        self.checkpointer = checkpointer
 
         self.llm = ChatOpenAI(
             model=settings.MODEL_NAME,
             api_key=settings.OPENAI_API_KEY,
             temperature=0.2,
+            cache=get_llm_cache(),
+            stream_usage=True,
         ).bind_tools(self.tools)
+        # Streaming bypasses the response cache, so a configured cache means blocking calls
+        self.streaming = settings.CODER_STREAMING and get_llm_cache() is None
+        self.context = ContextManager(tools=self.tools)
 
         self.graph = self._build_graph()
 
-    def _agent_node(self, state: CoderState):
-        messages = state["messages"]
+    @staticmethod
+    def _prompt(state: CoderState) -> List[BaseMessage]:
+        """
+        System prompt and task first, identical on every turn, then the history.
+        Together with the tool schemas (sent before the messages) they form a
+        stable prefix that providers can serve from their prompt cache.
+        """
+        history = state["messages"]
+        if history and isinstance(history[0], SystemMessage):
+            # Initial task message, already part of the prefix
+            history = history[1:]
+        return [
+            SystemMessage(content=CODER_SYSTEM_PROMPT),
+            HumanMessage(content=f"ACTUAL TASK: {state['task']}"),
+            *history,
+        ]
+
+    @staticmethod
+    def _usage(response) -> dict:
+        usage = getattr(response, "usage_metadata", None) or {}
+        input_tokens = usage.get("input_tokens", 0)
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        return {
+            "input": input_tokens,
+            "cached": cached,
+            "uncached": input_tokens - cached,
+            "output": usage.get("output_tokens", 0),
+        }
 
-        if len(messages) <= 1:
-            messages = [
-                SystemMessage(content=CODER_SYSTEM_PROMPT),
-                HumanMessage(content=f"ACTUAL TASK: {state['task']}"),
-            ]
+    def _stream(self, messages: List[BaseMessage]) -> AIMessage:
+        collector = StreamCollector(self.tool_executor)
+        stream = self.llm.stream(messages)
+        try:
+            for chunk in stream:
+                collector.feed(chunk)
+        finally:
+            stream.close()
+        return collector.message()
+
+    async def _astream(self, messages: List[BaseMessage]) -> AIMessage:
+        collector = StreamCollector(self.tool_executor)
+        stream = self.llm.astream(messages)
+        try:
+            async for chunk in stream:
+                collector.feed(chunk)
+        finally:
+            await stream.aclose()
+        return collector.message()
+
+    @traced("context.build")
+    def _context(self, state: CoderState):
+        messages, stats = self.context.build(self._prompt(state))
+        log.info(
+            f"Context: {stats.tokens} tokens in {stats.messages} messages "
+            f"(history {stats.original_tokens}, {stats.compressed} outputs compressed, "
+            f"{stats.dropped_steps} steps dropped)"
+        )
+        return messages, stats
 
-        if len(messages) > 15:
-            messages = [messages[0], messages[1]] + messages[-13:]
+    def _update(self, state: CoderState, response: AIMessage, stats) -> dict:
+        usage = self._usage(response)
+        log.debug(
+            f"LLM usage: {usage['input']} input tokens ({usage['cached']} cached, "
+            f"{usage['uncached']} uncached), {usage['output']} output"
+        )
 
-        response = self.llm.invoke(messages)
+        return {
+            "messages": [response],
+            "iterations": state.get("iterations", 0) + 1,
+            "context_tokens": [stats.tokens],
+            "usage": [usage],
+        }
 
-        return {"messages": [response], "iterations": state.get("iterations", 0) + 1}
+    def _record(self, call, response: AIMessage):
+        if call is None:
+            return
+        usage = self._usage(response)
+        call.set(**{
+            "llm.input_tokens": usage["input"],
+            "llm.cached_tokens": usage["cached"],
+            "llm.output_tokens": usage["output"],
+            "llm.tool_calls": len(response.tool_calls),
+        })
+
+    @traced("agent")
+    def _agent_node(self, state: CoderState):
+        messages, stats = self._context(state)
+        with span("llm.call", model=settings.MODEL_NAME, streaming=self.streaming, context_tokens=stats.tokens) as call:
+            response = self._stream(messages) if self.streaming else self.llm.invoke(messages)
+            self._record(call, response)
+        return self._update(state, response, stats)
+
+    @traced("agent")
+    async def _aagent_node(self, state: CoderState):
+        messages, stats = self._context(state)
+        with span("llm.call", model=settings.MODEL_NAME, streaming=self.streaming, context_tokens=stats.tokens) as call:
+            response = await (self._astream(messages) if self.streaming else self.llm.ainvoke(messages))
+            self._record(call, response)
+        return self._update(state, response, stats)
 
     def _should_continue(self, state: CoderState):
         last_msg = state["messages"][-1]
@@ -102,8 +338,10 @@ class CoderAgent:
     def _build_graph(self):
         workflow = StateGraph(CoderState)
 
-        workflow.add_node("agent", self._agent_node)
-        workflow.add_node("tools", ToolExecutorNode(self.tools))
+        # Every node has a blocking and an async body, for graph.invoke and graph.ainvoke
+        workflow.add_node("agent", RunnableLambda(self._agent_node, afunc=self._aagent_node))
+        self.tool_executor = ToolExecutorNode(self.tools)
+        workflow.add_node("tools", RunnableLambda(self.tool_executor, afunc=self.tool_executor.acall))
 
         workflow.set_entry_point("agent")
 
@@ -118,19 +356,68 @@ class CoderAgent:
         )
 
         workflow.add_edge("tools", "agent")
-        return workflow.compile()
+        return workflow.compile(checkpointer=self.checkpointer)
 
-    def run(self, task_description: str, feedback: str = ""):
+    @staticmethod
+    def _initial_state(task_description: str, feedback: str = "") -> dict:
         input_msg = f"Task: {task_description}"
         if feedback:
             input_msg += f"\n\n!!! PREVIOUS ATTEMPT FAILED with feedback:\n{feedback}\nFix it."
 
-        initial_state = {
+        return {
             "task": input_msg,
             "messages": [SystemMessage(content=input_msg)],
             "iterations": 0,
             "is_complete": False,
         }
 
-        final_state = self.graph.invoke(initial_state)
+    @staticmethod
+    def _config(thread_id: Optional[str]) -> Optional[dict]:
+        return {"configurable": {"thread_id": thread_id}} if thread_id else None
+
+    def _input(self, task_description: str, feedback: str, config: Optional[dict]) -> dict:
+        if not config or not self.graph.get_state(config).values.get("messages"):
+            return self._initial_state(task_description, feedback)
+
+        # Known thread: keep the history, put the review feedback into the task
+        return {
+            "task": self._initial_state(task_description, feedback)["task"],
+            "messages": [HumanMessage(
+                content="The reviewer requested changes to your previous attempt (see ACTUAL TASK). "
+                        "The workspace contains your pushed changes, continue from there."
+            )],
+            "iterations": 0,
+            "is_complete": False,
+        }
+
+    def export_state(self, thread_id: str) -> str:
+        """Serialized graph state of a thread, for resuming it in another process."""
+        return dumps(self.graph.get_state(self._config(thread_id)).values)
+
+    def import_state(self, thread_id: str, data: str):
+        self.graph.update_state(self._config(thread_id), loads(data, allowed_objects="messages"), as_node="agent")
+
+    @staticmethod
+    def _log_usage(final_state: dict):
+        usage = final_state.get("usage", [])
+        input_tokens = sum(u["input"] for u in usage)
+        cached = sum(u["cached"] for u in usage)
+        if input_tokens:
+            log.info(
+                f"LLM calls: {len(usage)}, input tokens: {input_tokens} "
+                f"({cached} cached, {cached / input_tokens:.0%}), output tokens: {sum(u['output'] for u in usage)}"
+            )
+
+    @traced("coder.run")
+    def run(self, task_description: str, feedback: str = "", thread_id: Optional[str] = None):
+        config = self._config(thread_id)
+        final_state = self.graph.invoke(self._input(task_description, feedback, config), config)
+        self._log_usage(final_state)
+        return "Finished"
+
+    @traced("coder.run")
+    async def arun(self, task_description: str, feedback: str = "", thread_id: Optional[str] = None):
+        config = self._config(thread_id)
+        final_state = await self.graph.ainvoke(self._input(task_description, feedback, config), config)
+        self._log_usage(final_state)
         return "Finished"
@@ -0,0 +1,213 @@
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.core.config import settings
+from src.tools import written_paths
+
+# Per-message overhead of the chat format (role, separators), as in OpenAI's counting recipe
+MESSAGE_OVERHEAD = 4
+CHARS_PER_TOKEN = 4
+
+# Tools whose output is a pure function of their arguments and the files they read
+REPEATABLE_TOOLS = {"read_file", "get_file_structure", "list_files", "find_symbol", "search_code"}
+FILE_READ_TOOLS = {"read_file", "get_file_structure"}
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            try:
+                _encoding = tiktoken.encoding_for_model(settings.MODEL_NAME)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # No tiktoken or no cached encoding files (offline): estimate from length
+            _encoding = False
+    return _encoding
+
+
+@lru_cache(maxsize=8192)
+def count_text_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _content_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+def count_message_tokens(message: BaseMessage) -> int:
+    tokens = MESSAGE_OVERHEAD + count_text_tokens(_content_text(message))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_text_tokens(tool_call["name"] + json.dumps(tool_call["args"], sort_keys=True))
+    return tokens
+
+
+def count_tools_tokens(tools) -> int:
+    """Tokens taken by the tool schemas sent along with every request."""
+    schemas = [convert_to_openai_tool(tool) for tool in tools]
+    return count_text_tokens(json.dumps(schemas, sort_keys=True)) if schemas else 0
+
+
+@dataclass
+class ContextStats:
+    messages: int
+    tokens: int
+    original_tokens: int
+    dropped_steps: int
+    compressed: int
+
+
+class ContextManager:
+    """
+    Fits the conversation of an agent into a token budget.
+
+    Leading system/task messages are always kept. The rest is split into steps,
+    an AIMessage together with the ToolMessages answering it, so a tool call is
+    never separated from its result. Outside the most recent steps, repeated
+    reads keep only their latest output, reads of files modified afterwards are
+    replaced by a note, and large tool outputs are cut to their head and tail.
+    If that is still over budget, the oldest steps are dropped whole.
+    """
+
+    # When steps have to go, drop down to this share of the budget so the same
+    # steps stay at the start of the history for the next turns (prompt caching)
+    DROP_TARGET = 0.75
+
+    def __init__(self, max_tokens: Optional[int] = None, tool_output_tokens: Optional[int] = None,
+                 recent_steps: Optional[int] = None, tools: Sequence = ()):
+        self.max_tokens = max_tokens or settings.CONTEXT_MAX_TOKENS
+        self.tool_output_tokens = tool_output_tokens or settings.CONTEXT_TOOL_OUTPUT_TOKENS
+        self.recent_steps = recent_steps if recent_steps is not None else settings.CONTEXT_RECENT_STEPS
+        self.tools_tokens = count_tools_tokens(tools)
+        self._dropped: Tuple[Optional[Tuple[str, ...]], int] = (None, 0)
+
+    @staticmethod
+    def _split(messages: List[BaseMessage]) -> Tuple[List[BaseMessage], List[List[BaseMessage]]]:
+        pinned = 0
+        while pinned < len(messages) and not isinstance(messages[pinned], (AIMessage, ToolMessage)):
+            pinned += 1
+
+        steps: List[List[BaseMessage]] = []
+        for message in messages[pinned:]:
+            if isinstance(message, ToolMessage) and steps:
+                steps[-1].append(message)
+            else:
+                steps.append([message])
+        return messages[:pinned], steps
+
+    @staticmethod
+    def _tool_calls(steps: List[List[BaseMessage]]) -> Dict[str, dict]:
+        return {
+            tool_call["id"]: tool_call
+            for step in steps for message in step
+            for tool_call in getattr(message, "tool_calls", None) or []
+        }
+
+    def _compress_output(self, text: str) -> str:
+        lines = text.split("\n")
+        head, tail = lines[:20], lines[-10:] if len(lines) > 30 else []
+        omitted = len(lines) - len(head) - len(tail)
+        budget = self.tool_output_tokens * CHARS_PER_TOKEN // 2
+        head_text, tail_text = "\n".join(head)[:budget], "\n".join(tail)[-budget:]
+        note = f"... [{omitted} lines omitted to save context, call the tool again for the full output] ..."
+        return "\n".join(part for part in (head_text, note, tail_text) if part)
+
+    def _rewrite_old(self, steps: List[List[BaseMessage]]) -> int:
+        """Compresses tool outputs of steps before the recent ones in place, returns how many."""
+        calls = self._tool_calls(steps)
+        old = max(len(steps) - self.recent_steps, 0)
+
+        # Latest position of every repeatable call and of every write per file
+        last_seen: Dict[str, int] = {}
+        last_write: Dict[str, int] = {}
+        for position, step in enumerate(steps):
+            for message in step:
+                if not isinstance(message, ToolMessage) or message.tool_call_id not in calls:
+                    continue
+                call = calls[message.tool_call_id]
+                args = call["args"] if isinstance(call["args"], dict) else {}
+                if call["name"] in REPEATABLE_TOOLS:
+                    last_seen[call["name"] + json.dumps(args, sort_keys=True)] = position
+                for path in written_paths(call["name"], args):
+                    last_write[path] = position
+
+        compressed = 0
+        for position, step in enumerate(steps[:old]):
+            for i, message in enumerate(step):
+                if not isinstance(message, ToolMessage):
+                    continue
+                call = calls.get(message.tool_call_id)
+                args = call["args"] if call and isinstance(call["args"], dict) else {}
+                key = call["name"] + json.dumps(args, sort_keys=True) if call else None
+                path = os.path.normpath(args["filepath"]) if args.get("filepath") else None
+
+                content = None
+                if call and call["name"] in REPEATABLE_TOOLS and last_seen.get(key, position) > position:
+                    content = f"[Output omitted: the same {call['name']} call was repeated later]"
+                elif call and call["name"] in FILE_READ_TOOLS and last_write.get(path, -1) > position:
+                    content = f"[Output omitted: {args['filepath']} was modified afterwards, read it again if needed]"
+                elif count_text_tokens(_content_text(message)) > self.tool_output_tokens:
+                    content = self._compress_output(_content_text(message))
+
+                if content is not None and content != message.content:
+                    step[i] = message.model_copy(update={"content": content})
+                    compressed += 1
+        return compressed
+
+    def build(self, messages: List[BaseMessage]) -> Tuple[List[BaseMessage], ContextStats]:
+        pinned, steps = self._split(list(messages))
+        original_tokens = self.tools_tokens + sum(count_message_tokens(m) for m in messages)
+
+        steps = [list(step) for step in steps]
+        compressed = self._rewrite_old(steps)
+
+        fixed = self.tools_tokens + sum(count_message_tokens(m) for m in pinned)
+        step_tokens = [sum(count_message_tokens(m) for m in step) for step in steps]
+
+        # Drop whole steps from the oldest, the latest step is always sent. Steps
+        # dropped on an earlier turn of the same task stay dropped while it fits.
+        pinned_key = tuple(_content_text(m) for m in pinned)
+        dropped = self._dropped[1] if self._dropped[0] == pinned_key else 0
+        dropped = min(dropped, max(len(steps) - 1, 0))
+        total = fixed + sum(step_tokens[dropped:])
+        if total > self.max_tokens:
+            target = self.max_tokens * self.DROP_TARGET
+            while total > target and dropped < len(steps) - 1:
+                total -= step_tokens[dropped]
+                dropped += 1
+        self._dropped = (pinned_key, dropped)
+
+        result = list(pinned)
+        if dropped:
+            note = HumanMessage(content=(
+                f"[Context note: {dropped} earlier steps were removed to fit the context window. "
+                f"Re-read files if you need their current content.]"
+            ))
+            result.append(note)
+            total += count_message_tokens(note)
+        for step in steps[dropped:]:
+            result.extend(step)
+
+        return result, ContextStats(
+            messages=len(result),
+            tokens=total,
+            original_tokens=original_tokens,
+            dropped_steps=dropped,
+            compressed=compressed,
+        )
@@ -11,11 +11,12 @@ Analyze and fix the provided GitHub Issue.
 ### MANDATORY WORKFLOW (NON-NEGOTIABLE)
 You MUST follow these steps in the specified order. DO NOT deviate.
 1.  **EXPLORE:** Use `list_files` to understand the project structure.
-2.  **MAP:** Use `get_file_structure` on relevant files to create a code map.
+2.  **MAP:** Use `get_file_structure` on relevant files to create a code map. If you know a class or function name, use `find_symbol` to locate it directly. To find where an identifier, string or error message is used, use `search_code` instead of opening files one by one.
 3.  **PLAN:** Based on the map, decide which application files and which test files need modification.
 4.  **IMPLEMENT & ALIGN (Two-Part Step):**
-    a. **Correct Application Code:** First, use `read_file` and `replace_code_block` to fix the primary logic in the application code as described in the issue.
-    b. **Proactively Align Tests:** **Immediately after** correcting the application code, you MUST `read_file` on the corresponding test files. Analyze the test assertions. If an assertion was written to validate the old, buggy behavior, it is now invalid. **You MUST update the test file** with `replace_code_block` to assert the new, correct behavior.
+    a. **Correct Application Code:** First, use `read_file` and `apply_edits` to fix the primary logic in the application code as described in the issue.
+    b. **Proactively Align Tests:** **Immediately after** correcting the application code, you MUST `read_file` on the corresponding test files. Analyze the test assertions. If an assertion was written to validate the old, buggy behavior, it is now invalid. **You MUST update the test file** with `apply_edits` to assert the new, correct behavior.
+    c. Put all edits of a change into ONE `apply_edits` call (many files and sites at once) instead of one call per site.
 5.  **VALIDATE:**
     a. **Run Tests:** **Only after** both the application code and the test code have been aligned, call `run_project_tests`.
     b. If tests fail now, it indicates a deeper logical error you missed. Go back to step 4 to re-analyze and fix both the application and test code.
@@ -26,8 +27,8 @@ You MUST follow these steps in the specified order. DO NOT deviate.
 - **Issue:** "The `divide(a, b)` function in `logic.py` incorrectly multiplies."
 - **PLAN:** You decide to modify `logic.py` and `test_logic.py`.
 - **IMPLEMENT & ALIGN:**
-    - `a.` You use `replace_code_block` on `logic.py` to change `return a * b` to `return a / b`.
-    - `b.` You immediately use `read_file` on `test_logic.py`. You see the assertion `assert divide(10, 2) == 20`. You identify this as invalid. You use `replace_code_block` to change it to `assert divide(10, 2) == 5`.
+    - `a.` You use `apply_edits` on `logic.py` to change `return a * b` to `return a / b`.
+    - `b.` You immediately use `read_file` on `test_logic.py`. You see the assertion `assert divide(10, 2) == 20`. You identify this as invalid. You use `apply_edits` to change it to `assert divide(10, 2) == 5`.
 - **VALIDATE:** You call `run_project_tests`. The tests pass.
 - **FINISH:** You output `DONE`.
 """
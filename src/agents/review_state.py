@@ -0,0 +1,126 @@
+import base64
+import json
+import re
+from typing import Iterable, List, Optional, Tuple
+from pydantic import BaseModel
+
+from src.agents.reviewer import ReviewComment, ReviewResult
+from src.core.diff import HUNK_RANGE, DiffFile
+
+MARKER = re.compile(r"<!-- ai-review-state: ([A-Za-z0-9+/=]+) -->")
+
+
+class ReviewState(BaseModel):
+    """What a review run saw and said, kept in a hidden marker in its PR comment."""
+    sha: str
+    action: str
+    summary: str
+    comments: List[ReviewComment]
+
+    @classmethod
+    def from_result(cls, sha: str, result: ReviewResult) -> "ReviewState":
+        return cls(sha=sha, action=result.action, summary=result.general_summary, comments=result.comments)
+
+    def marker(self) -> str:
+        payload = base64.b64encode(self.model_dump_json().encode()).decode()
+        return f"<!-- ai-review-state: {payload} -->"
+
+    @classmethod
+    def parse(cls, text: str) -> Optional["ReviewState"]:
+        match = MARKER.search(text or "")
+        if not match:
+            return None
+        try:
+            return cls.model_validate(json.loads(base64.b64decode(match.group(1))))
+        except ValueError:
+            return None
+
+
+def latest_state(comments: Iterable[Tuple[str, str]], author: str) -> Optional[ReviewState]:
+    """
+    State of the most recent review among the PR's comments, (login, body)
+    pairs oldest first. Anyone can post a marker, so only `author`'s count.
+    """
+    state = None
+    for login, body in comments:
+        if login == author:
+            state = ReviewState.parse(body) or state
+    return state
+
+
+def _ranges(diff_file: DiffFile) -> List[Tuple[int, int, int]]:
+    """(old_start, old_len, new_len) of every hunk."""
+    ranges = []
+    for hunk in diff_file.hunks:
+        match = HUNK_RANGE.match(hunk)
+        if match:
+            old_start, old_len, _, new_len = match.groups()
+            ranges.append((int(old_start), int(old_len or 1), int(new_len or 1)))
+    return ranges
+
+
+def remap_line(line: int, diff_file: DiffFile) -> Optional[int]:
+    """
+    Where a line of the old version ends up after `diff_file`'s hunks, None if
+    a hunk changed it. Lines between hunks only shift by the size difference
+    of the hunks above them.
+    """
+    shift = 0
+    for old_start, old_len, new_len in _ranges(diff_file):
+        # A pure insertion (old_len 0) goes after line old_start
+        if old_len == 0:
+            if line <= old_start:
+                break
+        elif line < old_start:
+            break
+        elif line < old_start + old_len:
+            return None
+        shift += new_len - old_len
+    return line + shift
+
+
+def carry_comments(comments: List[ReviewComment], increment: List[DiffFile],
+                   pr_paths: Iterable[str]) -> List[ReviewComment]:
+    """
+    Earlier comments that still point at unchanged code, moved to their new line
+    numbers. Comments on changed hunks are dropped, their code gets reviewed again.
+    """
+    changed = {f.path: f for f in increment}
+    pr_paths = set(pr_paths)
+    carried = []
+    for comment in comments:
+        if comment.path not in pr_paths:
+            continue
+        diff_file = changed.get(comment.path)
+        if diff_file is None:
+            carried.append(comment)
+            continue
+        if diff_file.status == "removed" or diff_file.skipped:
+            continue
+        line = remap_line(comment.line, diff_file)
+        if line is not None:
+            carried.append(comment.model_copy(update={"line": line}))
+    return carried
+
+
+def review_increment(reviewer, issue_text: str, pr_files: List[DiffFile], increment: List[DiffFile],
+                     previous: ReviewState) -> ReviewResult:
+    """
+    Reviews only what changed since `previous`. Earlier comments on code the
+    update did not touch go to the reviewer as open comments: a fix can land
+    elsewhere, so the fresh review re-raises those still unresolved and its
+    verdict decides. Without new changes the previous verdict stands.
+    """
+    pr_paths = {f.path for f in pr_files}
+    carried = carry_comments(previous.comments, increment, pr_paths)
+    # Files merged in from the base branch show up in the increment but not in the PR
+    new_files = [f for f in increment if f.path in pr_paths]
+    if not any(f.hunks for f in new_files):
+        return ReviewResult(general_summary=previous.summary, comments=carried, action=previous.action)
+
+    fresh = reviewer.review_pr(issue_text, new_files, pr_files=pr_files, open_comments=carried)
+    summary = fresh.general_summary
+    if carried:
+        summary += (f"\n\n{len(carried)} comment(s) from the review of {previous.sha[:7]} "
+                    f"on unchanged code were checked against these changes.")
+    return ReviewResult(general_summary=summary, comments=fresh.comments, action=fresh.action)
@@ -1,10 +1,15 @@
-from typing import List, Dict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
 from pydantic import BaseModel, Field
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage
 
 from src.core.config import settings
+from src.core.diff import HUNK_RANGE, DiffFile, parse_diff
+from src.core.llm_cache import get_llm_cache
+from src.agents.context_manager import count_text_tokens
 from src.agents.prompts import REVIEWER_SYSTEM_PROMPT
+from src.logger import log
 
 
 class ReviewComment(BaseModel):
@@ -19,29 +24,173 @@ class ReviewResult(BaseModel):
     action: str = Field(description="APPROVE or REQUEST_CHANGES")
 
 
+@dataclass
+class ReviewChunk:
+    paths: List[str]
+    text: str
+    tokens: int
+
+
+def _line_counts(lines: List[str]) -> Tuple[int, int]:
+    """How many lines of the old and of the new file a run of hunk lines covers."""
+    return sum(line[:1] in (" ", "-") for line in lines), sum(line[:1] in (" ", "+") for line in lines)
+
+
+def _split_oversized(hunk: str, budget: int) -> List[str]:
+    """Cuts a hunk larger than the budget into line ranges, each with an `@@` header of its own range."""
+    header, *lines = hunk.split("\n")
+    parts, current, current_tokens = [], [], 0
+    for line in lines:
+        line_tokens = count_text_tokens(line) + 1
+        if current and current_tokens + line_tokens > budget:
+            parts.append(current)
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    parts.append(current)
+
+    match = HUNK_RANGE.match(header)
+    if not match:
+        return ["\n".join([header + " (continued)" if i else header, *part]) for i, part in enumerate(parts)]
+    old_start, new_start, section = int(match.group(1)), int(match.group(3)), header[match.end():]
+    pieces = []
+    for part in parts:
+        old_len, new_len = _line_counts(part)
+        # An empty range is numbered by the line before it
+        pieces.append("\n".join([
+            f"@@ -{old_start if old_len else old_start - 1},{old_len} "
+            f"+{new_start if new_len else new_start - 1},{new_len} @@{section}",
+            *part,
+        ]))
+        old_start, new_start = old_start + old_len, new_start + new_len
+    return pieces
+
+
+def chunk_diff(files: List[DiffFile], budget: int) -> List[ReviewChunk]:
+    """
+    Packs the diff into chunks of at most `budget` tokens, in file order. Small
+    files share a chunk, a file over the budget is split between its hunks and
+    a hunk over the budget between its lines, so nothing is ever cut off.
+    """
+    chunks: List[ReviewChunk] = []
+    paths, parts, tokens = [], [], 0
+
+    def flush():
+        nonlocal paths, parts, tokens
+        if parts:
+            chunks.append(ReviewChunk(paths, "\n\n".join(parts), tokens))
+        paths, parts, tokens = [], [], 0
+
+    for diff_file in files:
+        if not diff_file.hunks:
+            continue
+        rendered = diff_file.render()
+        rendered_tokens = count_text_tokens(rendered)
+        if rendered_tokens <= budget:
+            if tokens + rendered_tokens > budget:
+                flush()
+            paths.append(diff_file.path)
+            parts.append(rendered)
+            tokens += rendered_tokens
+            continue
+
+        flush()
+        hunks = [piece for hunk in diff_file.hunks for piece in (
+            _split_oversized(hunk, budget) if count_text_tokens(hunk) > budget else [hunk]
+        )]
+        selected, selected_tokens = [], 0
+        for hunk in hunks:
+            hunk_tokens = count_text_tokens(hunk)
+            if selected and selected_tokens + hunk_tokens > budget:
+                chunks.append(ReviewChunk([diff_file.path], diff_file.render(selected), selected_tokens))
+                selected, selected_tokens = [], 0
+            selected.append(hunk)
+            selected_tokens += hunk_tokens
+        chunks.append(ReviewChunk([diff_file.path], diff_file.render(selected), selected_tokens))
+
+    flush()
+    return chunks
+
+
+def merge_results(chunks: List[ReviewChunk], results: List[ReviewResult]) -> ReviewResult:
+    """Changes are requested if any part requests them; comments are concatenated without duplicates."""
+    comments, seen = [], set()
+    for result in results:
+        for comment in result.comments:
+            key = (comment.path, comment.line, comment.body.strip())
+            if key not in seen:
+                seen.add(key)
+                comments.append(comment)
+
+    verdicts = [result.action.strip().upper().replace(" ", "_") for result in results]
+    action = "APPROVE" if verdicts and all(v == "APPROVE" for v in verdicts) else "REQUEST_CHANGES"
+
+    if len(results) == 1:
+        summary = results[0].general_summary
+    else:
+        summary = "\n\n".join(
+            f"**{', '.join(chunk.paths)}** ({verdict}): {result.general_summary}"
+            for chunk, result, verdict in zip(chunks, results, verdicts)
+        )
+    return ReviewResult(general_summary=summary, comments=comments, action=action)
+
+
 class ReviewerAgent:
     def __init__(self):
         self.llm = ChatOpenAI(
             model=settings.MODEL_NAME,
             api_key=settings.OPENAI_API_KEY,
             temperature=0.2,
+            cache=get_llm_cache(),
         )
         self.structured_llm = self.llm.with_structured_output(ReviewResult)
 
-    def review_pr(self, issue_text: str, pr_diff: str) -> ReviewResult:
-        system_prompt = REVIEWER_SYSTEM_PROMPT
-
-        user_prompt = f"""
-        ISSUE:
-        {issue_text}
+    @staticmethod
+    def _messages(issue_text: str, files: List[DiffFile], chunk: ReviewChunk, part: int, parts: int,
+                  open_comments: List[ReviewComment] = ()):
+        # System prompt and issue are the same for every part, a prefix the provider can cache
+        context = f"ISSUE:\n{issue_text}\n\nFILES CHANGED IN THIS PR:\n" + "\n".join(f.describe() for f in files)
+        if open_comments:
+            context += (
+                "\n\nOPEN COMMENTS FROM THE PREVIOUS REVIEW, on code this update did not touch:\n"
+                + "\n".join(f"- `{c.path}:{c.line}` {c.body}" for c in open_comments)
+                + "\n\nA fix may be elsewhere, e.g. a test added in another file or a caller changed. "
+                  "Repeat a comment unchanged (same path, line and text) only if these changes leave it unresolved."
+            )
+        if parts > 1:
+            context += (
+                f"\n\nThe diff is reviewed in {parts} parts. Judge only the part below; "
+                f"the other files are reviewed separately, so don't complain that they are missing."
+            )
+        return [
+            SystemMessage(content=REVIEWER_SYSTEM_PROMPT),
+            HumanMessage(content=context),
+            HumanMessage(content=f"GIT DIFF (part {part} of {parts}):\n{chunk.text}"),
+        ]
 
-        GIT DIFF:
-        {pr_diff[:20000]} 
+    def review_pr(self, issue_text: str, pr_diff: Union[str, List[DiffFile]],
+                  pr_files: Optional[List[DiffFile]] = None,
+                  open_comments: Optional[List[ReviewComment]] = None) -> ReviewResult:
         """
+        `pr_diff` is diff text or the per-file hunks from `ingest_pull_request`.
+        `pr_files`, when only part of the PR is reviewed, lists the whole PR for context.
+        `open_comments` are earlier comments the model re-raises if still unresolved.
+        """
+        files = parse_diff(pr_diff) if isinstance(pr_diff, str) else pr_diff
+        chunks = chunk_diff(files, settings.REVIEW_CHUNK_TOKENS)
+        if not chunks:
+            return ReviewResult(general_summary="The PR has no reviewable changes.", comments=[], action="APPROVE")
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("user", user_prompt)
-        ])
+        context_files = pr_files or files
+        inputs = [
+            self._messages(issue_text, context_files, chunk, i, len(chunks), open_comments or [])
+            for i, chunk in enumerate(chunks, 1)
+        ]
+        log.info(
+            f"Reviewing {len(files)} files in {len(chunks)} parts "
+            f"(largest {max(c.tokens for c in chunks)} tokens, {settings.REVIEW_MAX_CONCURRENCY} at a time)"
+        )
 
-        return self.structured_llm.invoke({})
\ No newline at end of file
+        # A part that fails after the client's retries fails the review: unreviewed code is never approved
+        results = self.structured_llm.batch(inputs, config={"max_concurrency": settings.REVIEW_MAX_CONCURRENCY})
+        return merge_results(chunks, results)
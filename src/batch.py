@@ -0,0 +1,180 @@
+import os
+import re
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.logger import log
+
+ISSUE_REF = re.compile(r"^\s*([\w.-]+/[\w.-]+)\s*(?:#|\s)\s*(\d+)\s*$")
+
+
+@dataclass(frozen=True)
+class IssueRef:
+    repo_name: str
+    issue_number: int
+
+    def __str__(self):
+        return f"{self.repo_name}#{self.issue_number}"
+
+
+@dataclass
+class IssueResult:
+    issue: IssueRef
+    ok: bool
+    duration: float
+    error: str = ""
+
+
+def parse_issue_ref(text: str) -> IssueRef:
+    """Accepts `owner/repo#12` or `owner/repo 12`."""
+    match = ISSUE_REF.match(text)
+    if not match:
+        raise ValueError(f"Not an issue reference: {text!r} (expected owner/repo#number)")
+    return IssueRef(match.group(1), int(match.group(2)))
+
+
+def load_issue_file(path: str) -> List[IssueRef]:
+    """One issue reference per line, blank lines and `#` comments are skipped."""
+    refs = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                refs.append(parse_issue_ref(line))
+    return refs
+
+
+def search_issues(repo_name: str, labels: List[str], limit: int = 0) -> List[IssueRef]:
+    from src.core.github_client import get_github_client
+
+    numbers = get_github_client().find_issues(repo_name, labels=labels, limit=limit)
+    return [IssueRef(repo_name, number) for number in numbers]
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def run_issue(repo_name: str, issue_number: int, feedback: str = "", log_dir: str = "") -> Tuple[bool, str]:
+    """
+    Runs one pipeline in a pool worker. Output goes to a per-issue log file so
+    the parent's progress lines stay readable. Returns (ok, error).
+    """
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        log_file = open(os.path.join(log_dir, f"{repo_name.replace('/', '_')}_{issue_number}.log"), "w")
+        sys.stdout = sys.stderr = log_file
+
+    try:
+        from src.runner import PipelineRunner
+
+        PipelineRunner(repo_name, issue_number).run(feedback=feedback)
+        return True, ""
+    except Exception as e:
+        traceback.print_exc()
+        return False, f"{type(e).__name__}: {e}"
+    finally:
+        sys.stdout.flush()
+
+
+class BatchRunner:
+    """
+    Runs the pipelines of many issues in a process pool.
+
+    At most `workers` pipelines run at once and at most `per_repo_limit` of them
+    on the same repository (0 = no limit); issues wait in input order for a free
+    slot. Workers share the on-disk mirror cache (GIT_CACHE_DIR), so every
+    repository is fetched once and then checked out as cheap worktrees.
+    """
+
+    def __init__(self, issues: Iterable[IssueRef], workers: int = 4, per_repo_limit: int = 1,
+                 feedback: str = "", log_dir: str = "", worker_fn: Callable = run_issue):
+        self.issues = list(dict.fromkeys(issues))
+        self.workers = workers
+        self.per_repo_limit = per_repo_limit
+        self.feedback = feedback
+        self.log_dir = log_dir
+        self.worker_fn = worker_fn
+        self.results: List[IssueResult] = []
+        self.elapsed = 0.0
+
+    def _next_issue(self, pending: List[IssueRef], repo_load: Dict[str, int]) -> Optional[IssueRef]:
+        for issue in pending:
+            if self.per_repo_limit <= 0 or repo_load.get(issue.repo_name, 0) < self.per_repo_limit:
+                return issue
+        return None
+
+    def _progress(self, result: IssueResult, running: int, started: float):
+        done = len(self.results)
+        failed = sum(1 for r in self.results if not r.ok)
+        elapsed = time.time() - started
+        throughput = done / elapsed * 3600 if elapsed else 0
+        status = "ok" if result.ok else f"FAILED ({result.error.splitlines()[0] if result.error else 'unknown'})"
+        log.info(
+            f"[{done}/{len(self.issues)}] {result.issue} {status} in {_format_duration(result.duration)} | "
+            f"running {running}, failed {failed}, {throughput:.1f} issues/h"
+        )
+
+    def run(self) -> List[IssueResult]:
+        pending = list(self.issues)
+        repo_load: Dict[str, int] = {}
+        running: Dict[Future, Tuple[IssueRef, float]] = {}
+        started = time.time()
+
+        # One task per child: pipelines keep module-level state (workspace context, indexes)
+        with ProcessPoolExecutor(max_workers=self.workers, max_tasks_per_child=1) as pool:
+            try:
+                while pending or running:
+                    while len(running) < self.workers:
+                        issue = self._next_issue(pending, repo_load)
+                        if issue is None:
+                            break
+                        pending.remove(issue)
+                        repo_load[issue.repo_name] = repo_load.get(issue.repo_name, 0) + 1
+                        future = pool.submit(
+                            self.worker_fn, issue.repo_name, issue.issue_number, self.feedback, self.log_dir
+                        )
+                        running[future] = (issue, time.time())
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        issue, issue_started = running.pop(future)
+                        repo_load[issue.repo_name] -= 1
+                        try:
+                            ok, error = future.result()
+                        except Exception as e:
+                            # Raised past the worker function, or the worker process died
+                            ok, error = False, f"{type(e).__name__}: {e}"
+                        result = IssueResult(issue, ok, time.time() - issue_started, error)
+                        self.results.append(result)
+                        self._progress(result, len(running), started)
+            except KeyboardInterrupt:
+                log.error(f"Interrupted, cancelling {len(pending)} queued issues")
+                for future in running:
+                    future.cancel()
+                raise
+
+        self.elapsed = time.time() - started
+        return self.results
+
+    def summary(self) -> str:
+        failed = [r for r in self.results if not r.ok]
+        throughput = len(self.results) / self.elapsed * 3600 if self.elapsed else 0
+        lines = [
+            f"Processed {len(self.results)} issues in {_format_duration(self.elapsed)}: "
+            f"{len(self.results) - len(failed)} succeeded, {len(failed)} failed, {throughput:.1f} issues/h"
+        ]
+        if failed:
+            lines.append("Failures:")
+            for result in failed:
+                first_line = result.error.splitlines()[0] if result.error else "unknown error"
+                lines.append(f"  {result.issue}: {first_line}")
+            if self.log_dir:
+                lines.append(f"Full logs: {self.log_dir}")
+        return "\n".join(lines)
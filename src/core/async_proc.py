@@ -0,0 +1,37 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class CommandResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+
+
+async def run_command(args: List[str], cwd: Optional[str] = None, timeout: Optional[float] = None,
+                      env: Optional[Dict[str, str]] = None) -> CommandResult:
+    """Runs a command without blocking the event loop, killing it on timeout."""
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        env={**os.environ, **env} if env else None,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        stdout, stderr = await process.communicate()
+        return CommandResult(-1, stdout.decode(errors="replace"), stderr.decode(errors="replace"), timed_out=True)
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+
+    return CommandResult(process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace"))
@@ -0,0 +1,321 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.core.ignore import IgnoreManager
+
+MAX_FILE_BYTES = 2 * 1024 * 1024
+SEARCH_THREADS = min(8, (os.cpu_count() or 1) + 4)
+REGEX_META = set(".^$*+?{}[]()|\\")
+
+
+@dataclass
+class SearchMatch:
+    path: str
+    line: int
+    text: str
+    before: List[Tuple[int, str]] = field(default_factory=list)
+    after: List[Tuple[int, str]] = field(default_factory=list)
+
+
+@dataclass
+class SearchResult:
+    matches: List[SearchMatch]
+    files_searched: int
+    truncated: bool
+    indexed: bool
+
+
+def _read_text(full_path: str) -> Optional[str]:
+    try:
+        if os.path.getsize(full_path) > MAX_FILE_BYTES:
+            return None
+        with open(full_path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    if b"\0" in raw[:8192]:
+        return None
+    return raw.decode("utf-8", errors="replace")
+
+
+def trigrams(text: str) -> Set[str]:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _class_end(pattern: str, start: int) -> int:
+    """Index of the `]` closing the character class opened at `start`, len(pattern) if unclosed."""
+    i = start + 1
+    if pattern[i:i + 1] == "^":
+        i += 1
+    # A `]` right after the opening bracket is a literal
+    if pattern[i:i + 1] == "]":
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+            continue
+        if pattern[i] == "]":
+            return i
+        i += 1
+    return len(pattern)
+
+
+def _group_end(pattern: str, start: int) -> int:
+    """Index of the `)` closing the group opened at `start`, skipping nested groups and classes."""
+    depth, i = 0, start
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            i = _class_end(pattern, i)
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(pattern)
+
+
+def required_literals(pattern: str, regex: bool) -> List[str]:
+    """
+    Literal runs every match must contain, used to pick candidate files from
+    the trigram index. Conservative: anything it doesn't understand (groups,
+    classes, alternation) just ends the run, and alternation disables it.
+    """
+    if not regex:
+        return [pattern] if len(pattern) >= 3 else []
+    if "|" in pattern:
+        return []
+
+    runs, current = [], []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if escaped and not escaped.isalnum():
+                current.append(escaped)
+            else:
+                runs.append("".join(current))
+                current = []
+            i += 2
+            continue
+        if char in "*?{":
+            # The previous character is optional or repeated
+            if current:
+                current.pop()
+            runs.append("".join(current))
+            current = []
+            if char == "{":
+                close = pattern.find("}", i)
+                i = close if close != -1 else i
+        elif char == "+":
+            runs.append("".join(current))
+            current = []
+        elif char in "[(":
+            # Nothing inside a group or class is required: it may be optional or repeated
+            runs.append("".join(current))
+            current = []
+            i = _class_end(pattern, i) if char == "[" else _group_end(pattern, i)
+        elif char in REGEX_META:
+            runs.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    runs.append("".join(current))
+    return [run for run in runs if len(run) >= 3]
+
+
+@dataclass
+class _IndexedFile:
+    mtime_ns: int
+    size: int
+    grams: Set[str]
+
+
+class TrigramIndex:
+    """
+    Lowercased trigrams of every searchable file in a workspace. A query's
+    literal parts select the files containing all of their trigrams, so only
+    those are read and matched. Entries are checked against mtime and size on
+    every query and re-indexed when a file changed; new and deleted files are
+    picked up from the file list the query walks anyway.
+    """
+
+    _instances: Dict[str, "TrigramIndex"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files: Dict[str, _IndexedFile] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.built = False
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+
+    @classmethod
+    def for_workspace(cls, root) -> "TrigramIndex":
+        root = os.path.abspath(str(root))
+        with cls._instances_lock:
+            if root not in cls._instances:
+                cls._instances[root] = cls(root)
+            return cls._instances[root]
+
+    @classmethod
+    def drop(cls, root):
+        with cls._instances_lock:
+            cls._instances.pop(os.path.abspath(str(root)), None)
+
+    def _remove(self, rel_path: str):
+        entry = self.files.pop(rel_path, None)
+        if entry is not None:
+            for gram in entry.grams:
+                paths = self.postings.get(gram)
+                if paths is not None:
+                    paths.discard(rel_path)
+                    if not paths:
+                        del self.postings[gram]
+
+    def _index_file(self, rel_path: str) -> Optional[_IndexedFile]:
+        full_path = os.path.join(self.root, rel_path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return None
+        text = _read_text(full_path)
+        return _IndexedFile(stat.st_mtime_ns, stat.st_size, trigrams(text) if text is not None else set())
+
+    def _store(self, rel_path: str, entry: Optional[_IndexedFile]):
+        with self.lock:
+            self._remove(rel_path)
+            if entry is None:
+                return
+            self.files[rel_path] = entry
+            for gram in entry.grams:
+                self.postings.setdefault(gram, set()).add(rel_path)
+
+    def build(self):
+        paths = list(IgnoreManager.for_workspace(self.root).walk())
+        with ThreadPoolExecutor(max_workers=SEARCH_THREADS) as pool:
+            for rel_path, entry in zip(paths, pool.map(self._index_file, paths)):
+                self._store(rel_path, entry)
+        with self.lock:
+            self.built = True
+
+    def ensure_built(self):
+        with self.build_lock:
+            if not self.built:
+                self.build()
+
+    def build_in_background(self):
+        if not self.built and not self.build_lock.locked():
+            threading.Thread(target=self.ensure_built, daemon=True).start()
+
+    def _fresh(self, rel_path: str) -> bool:
+        entry = self.files.get(rel_path)
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(os.path.join(self.root, rel_path))
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == (entry.mtime_ns, entry.size)
+
+    def candidates(self, paths: List[str], literals: Iterable[str]) -> List[str]:
+        """The subset of `paths` that may contain all `literals`, keeping their order."""
+        for rel_path in paths:
+            if not self._fresh(rel_path):
+                self._store(rel_path, self._index_file(rel_path))
+
+        wanted = set().union(*(trigrams(literal) for literal in literals))
+        with self.lock:
+            # Deleted files are not walked anymore, intersecting with `paths` skips their entries
+            known = set(paths)
+            if not wanted:
+                return paths
+            selected = None
+            for gram in sorted(wanted, key=lambda g: len(self.postings.get(g, ()))):
+                postings = self.postings.get(gram, set())
+                selected = postings & known if selected is None else selected & postings
+                if not selected:
+                    return []
+        return [path for path in paths if path in selected]
+
+
+def _search_file(root: str, rel_path: str, regex: re.Pattern, context: int,
+                 limit: int) -> Tuple[List[SearchMatch], int]:
+    """Matches in one file (at most `limit`) and the total number of matching lines."""
+    text = _read_text(os.path.join(root, rel_path))
+    # Whole-file search runs in C, lines are only split for files that match
+    if text is None or not regex.search(text):
+        return [], 0
+
+    lines = text.splitlines()
+    matches, total = [], 0
+    for number, line in enumerate(lines, 1):
+        if not regex.search(line):
+            continue
+        total += 1
+        if len(matches) < limit:
+            matches.append(SearchMatch(
+                path=rel_path,
+                line=number,
+                text=line,
+                before=[(n, lines[n - 1]) for n in range(max(1, number - context), number)],
+                after=[(n, lines[n - 1]) for n in range(number + 1, min(len(lines), number + context) + 1)],
+            ))
+    return matches, total
+
+
+def search(root: str, pattern: str, regex: bool = False, case_sensitive: bool = True, path_glob: str = "",
+           context: int = 2, max_results: int = 50, per_file_limit: int = 20,
+           use_index: bool = True) -> SearchResult:
+    """
+    Searches every non-ignored file under `root` on a thread pool. Results are
+    in path order and stop at `max_results` matching lines. With `use_index`,
+    the trigram index narrows the files to read once it is built; the first
+    query starts the build in the background and scans everything meanwhile.
+    """
+    flags = 0 if case_sensitive else re.IGNORECASE
+    compiled = re.compile(pattern if regex else re.escape(pattern), flags | re.MULTILINE)
+
+    paths = list(IgnoreManager.for_workspace(root).walk(pattern=path_glob or None))
+    indexed = False
+    if use_index:
+        index = TrigramIndex.for_workspace(root)
+        if index.built:
+            literals = required_literals(pattern, regex)
+            if literals:
+                paths = index.candidates(paths, literals)
+                indexed = True
+        else:
+            index.build_in_background()
+
+    matches: List[SearchMatch] = []
+    truncated = False
+    with ThreadPoolExecutor(max_workers=SEARCH_THREADS) as pool:
+        results = pool.map(lambda p: _search_file(root, p, compiled, context, per_file_limit), paths)
+        for file_matches, total in results:
+            if not total:
+                continue
+            if len(matches) >= max_results:
+                # Full and one more file matches: files already running finish, nothing new starts
+                truncated = True
+                pool.shutdown(wait=False, cancel_futures=True)
+                break
+            room = max_results - len(matches)
+            matches.extend(file_matches[:room])
+            if total > min(room, len(file_matches)):
+                truncated = True
+
+    return SearchResult(matches, len(paths), truncated, indexed)
@@ -1,4 +1,5 @@
 import os
+from typing import Dict
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -9,6 +10,68 @@ class Settings(BaseSettings):
     MODEL_NAME: str
     GH_TOKEN: str
 
+    # Webhook server job subsystem
+    JOBS_DB_PATH: str = "./workspace/jobs.sqlite3"
+    JOB_WORKERS: int = 2
+    JOB_PER_REPO_LIMIT: int = 1
+    # "process" runs JOB_WORKERS worker processes, "async" runs up to
+    # JOB_ASYNC_CONCURRENCY pipelines as asyncio tasks in the server process
+    JOB_MODE: str = "process"
+    JOB_ASYNC_CONCURRENCY: int = 32
+
+    # Git checkouts: "worktree" shares one bare mirror per repo, "off" clones from scratch
+    GIT_CACHE_MODE: str = "worktree"
+    GIT_CACHE_DIR: str = "./workspace/.mirrors"
+    GIT_CACHE_MAX_BYTES: int = 20 * 1024 ** 3
+    GIT_CLONE_DEPTH: int = 0
+    GIT_CLONE_FILTER: str = ""
+
+    # Review wait: webhook events first, conditional polling with backoff as a fallback
+    EVENTS_DB_PATH: str = "./workspace/events.sqlite3"
+    REVIEW_TIMEOUT: int = 300
+    REVIEW_TIMEOUT_OVERRIDES: Dict[str, int] = {}
+    REVIEW_POLL_INITIAL: float = 15
+    REVIEW_POLL_MAX: float = 120
+    # Server jobs suspend here after pushing instead of holding a worker during the review wait
+    PIPELINES_DB_PATH: str = "./workspace/pipelines.sqlite3"
+
+    # Reviewer: the diff is split into parts of at most REVIEW_CHUNK_TOKENS, reviewed concurrently
+    REVIEW_CHUNK_TOKENS: int = 12000
+    REVIEW_MAX_CONCURRENCY: int = 4
+
+    # GitHub API client
+    GH_POOL_SIZE: int = 10
+    GH_CACHE_TTL: float = 60
+    GH_RATE_LIMIT_RESERVE: int = 100
+
+    # Coder context window: token budget per LLM call, tool outputs above the
+    # per-output limit are compressed once they are older than the recent steps
+    CONTEXT_MAX_TOKENS: int = 24000
+    CONTEXT_TOOL_OUTPUT_TOKENS: int = 1500
+    CONTEXT_RECENT_STEPS: int = 3
+
+    # Stream coder completions and start read-only tool calls before the response ends
+    CODER_STREAMING: bool = False
+
+    # LLM response cache: "on" reads and records, "replay" only reads and fails on a miss, "off"
+    LLM_CACHE_MODE: str = "off"
+    LLM_CACHE_PATH: str = "./workspace/llm_cache.sqlite3"
+    LLM_CACHE_TTL: float = 7 * 24 * 3600
+    LLM_CACHE_MAX_BYTES: int = 512 * 1024 ** 2
+
+    # run_tests: "cold" starts pytest per call, "warm" forks it from a preloaded worker per workspace
+    TEST_RUNNER_MODE: str = "cold"
+
+    # search_code: narrow the files to scan with a per-workspace trigram index, built on first use
+    CODE_SEARCH_INDEX: bool = True
+
+    # Pipeline tracing: spans of every run go to TRACE_DIR as OTLP/JSON lines, a timing table to the log
+    TRACING: bool = True
+    TRACE_DIR: str = "./workspace/traces"
+    # Counters and histograms from the spans of every run, shared by all workers, served on /metrics
+    METRICS: bool = True
+    METRICS_DB_PATH: str = "./workspace/metrics.sqlite3"
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
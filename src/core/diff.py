@@ -0,0 +1,169 @@
+import fnmatch
+import math
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional
+
+from github import GithubException
+
+from src.core.ignore import IgnoreManager
+from src.logger import log
+
+FILE_HEADER = re.compile(r"^diff --git a/(.+?) b/(.+)$")
+LEGACY_HEADER = re.compile(r"^--- (.+) ---$")
+HUNK_RANGE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# Reviewing these costs tokens and finds nothing: lock files, vendored and built code
+GENERATED_PATTERNS = [
+    "*.lock", "package-lock.json", "pnpm-lock.yaml", "go.sum", "*.min.js", "*.min.css", "*.map",
+    "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.snap",
+    "vendor/*", "*/vendor/*", "third_party/*", "node_modules/*", "*/node_modules/*", "dist/*", "build/*",
+]
+
+
+@dataclass
+class DiffFile:
+    path: str
+    header: List[str] = field(default_factory=list)
+    hunks: List[str] = field(default_factory=list)
+    status: str = "modified"
+    additions: int = 0
+    deletions: int = 0
+    skipped: str = ""
+
+    def render(self, hunks: List[str] = None) -> str:
+        return "\n".join([f"--- {self.path} ---", *(self.hunks if hunks is None else hunks)])
+
+    def describe(self) -> str:
+        text = f"{self.path} ({self.status}, +{self.additions}/-{self.deletions})"
+        return f"{text} [not shown: {self.skipped}]" if self.skipped else text
+
+
+def _finish(diff_file: DiffFile, hunk: Optional[List[str]]) -> DiffFile:
+    if hunk is not None:
+        diff_file.hunks.append("\n".join(hunk).rstrip("\n"))
+    for line in diff_file.header:
+        if line.startswith("new file mode"):
+            diff_file.status = "added"
+        elif line.startswith("deleted file mode"):
+            diff_file.status = "removed"
+        elif line.startswith("rename from"):
+            diff_file.status = "renamed"
+        elif line.startswith(("Binary files", "GIT binary patch")):
+            diff_file.skipped = "binary"
+    return diff_file
+
+
+def iter_diff(lines: Iterable[str]) -> Iterator[DiffFile]:
+    """
+    Parses `git diff` output, or the `--- path ---` + patch blocks built from
+    the files API, line by line. Every hunk is collected in a list and joined
+    once, every file is yielded as soon as the next one starts.
+    """
+    current: Optional[DiffFile] = None
+    hunk: Optional[List[str]] = None
+    git_format = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        match = FILE_HEADER.match(line)
+        git_format = git_format or match is not None
+        if match is None and not git_format:
+            match = LEGACY_HEADER.match(line)
+        if match:
+            if current is not None:
+                yield _finish(current, hunk)
+            current, hunk = DiffFile(match.groups()[-1]), None
+        elif current is None:
+            continue
+        elif line.startswith("@@"):
+            if hunk is not None:
+                current.hunks.append("\n".join(hunk).rstrip("\n"))
+            hunk = [line]
+        elif hunk is None:
+            current.header.append(line)
+        else:
+            hunk.append(line)
+            if line.startswith("+"):
+                current.additions += 1
+            elif line.startswith("-"):
+                current.deletions += 1
+    if current is not None:
+        yield _finish(current, hunk)
+
+
+def parse_diff(text: str) -> List[DiffFile]:
+    return list(iter_diff(text.split("\n")))
+
+
+def split_hunks(patch: str) -> List[str]:
+    """Splits one file's patch at its `@@` headers, lines before the first one are dropped."""
+    return next(iter_diff(["--- file ---", *patch.split("\n")])).hunks
+
+
+class DiffFilter:
+    """Marks files the reviewer should only list: binary, generated, or ignored by the project."""
+
+    def __init__(self, project_root: Optional[str] = None):
+        self.ignore = None
+        if project_root and os.path.isdir(project_root):
+            self.ignore = IgnoreManager.for_workspace(project_root)
+
+    def reason(self, path: str) -> str:
+        if any(fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(os.path.basename(path), pattern)
+               for pattern in GENERATED_PATTERNS):
+            return "generated or vendored"
+        if self.ignore is not None and self.ignore.is_ignored_rel(path):
+            return "ignored by the project's ignore rules"
+        return ""
+
+    def apply(self, files: Iterable[DiffFile]) -> List[DiffFile]:
+        result = []
+        for diff_file in files:
+            if not diff_file.skipped:
+                diff_file.skipped = self.reason(diff_file.path)
+            if diff_file.skipped:
+                diff_file.hunks = []
+            result.append(diff_file)
+        return result
+
+
+def _from_files_api(gh, repo_name: str, pr_number: int, max_workers: int = 4) -> List[DiffFile]:
+    """Per-file patches, with all pages of the files list fetched concurrently."""
+    pr = gh.get_pull(repo_name, pr_number)
+    pages = max(1, math.ceil(pr.changed_files / gh.client.per_page))
+    paginated = pr.get_files()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        files = [f for page in pool.map(paginated.get_page, range(pages)) for f in page]
+
+    result = []
+    for f in files:
+        diff_file = DiffFile(f.filename, status=f.status, additions=f.additions, deletions=f.deletions)
+        if f.patch is None:
+            # GitHub leaves out patches of binary and very large files
+            diff_file.skipped = "binary or too large for the API"
+        else:
+            diff_file.hunks = split_hunks(f.patch)
+        result.append(diff_file)
+    return result
+
+
+def ingest_compare(gh, repo_name: str, base: str, head: str, project_root: Optional[str] = None) -> List[DiffFile]:
+    """Per-file hunks of the changes between two commits of the PR branch."""
+    files = list(iter_diff(gh.get_compare_diff(repo_name, base, head).splitlines()))
+    return DiffFilter(project_root).apply(files)
+
+
+def ingest_pull_request(gh, repo_name: str, pr_number: int, project_root: Optional[str] = None) -> List[DiffFile]:
+    """
+    The PR's changes as structured per-file hunks for the reviewer. Fetches the
+    whole diff in one request (`.diff` media type); GitHub refuses that for very
+    large PRs, then the per-file patches are used instead.
+    """
+    try:
+        files = list(iter_diff(gh.get_pull_diff(repo_name, pr_number).splitlines()))
+    except GithubException as e:
+        log.info(f"Full diff unavailable ({e.status}), fetching per-file patches")
+        files = _from_files_api(gh, repo_name, pr_number)
+    return DiffFilter(project_root).apply(files)
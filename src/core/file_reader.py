@@ -0,0 +1,215 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+SNIFF_BYTES = 8192
+CHUNK_BYTES = 1 << 20
+
+
+def is_binary(path: str) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    return b"\0" in head
+
+
+def _nth_newline(chunk: bytes, start: int, n: int, line_bytes: int) -> int:
+    """
+    Offset of the n-th newline at or after `start`, which the chunk must hold.
+    Skips ahead in windows sized for the newlines still needed at the average
+    line length, then walks back from the end of the last one over the few
+    newlines it overshot, or bisects it when it overshot by many. Every step
+    is a bytes.count or rfind in C.
+    """
+    stop = len(chunk)
+    window = (n + 16) * line_bytes
+    while True:
+        end = min(start + window, stop)
+        found = chunk.count(b"\n", start, end)
+        if found >= n or end == stop:
+            break
+        n -= found
+        start = end
+        # Lines here are longer than average: grow until the window reaches past them
+        window = (n + 16) * line_bytes if found else window * 2
+
+    if found - n <= 64:
+        offset = end
+        for _ in range(found - n + 1):
+            offset = chunk.rfind(b"\n", start, offset)
+        return offset
+
+    low, high = start, end - 1
+    while low < high:
+        middle = (low + high) // 2
+        found = chunk.count(b"\n", low, middle + 1)
+        if found >= n:
+            high = middle
+        else:
+            n -= found
+            low = middle + 1
+    return low
+
+
+class LineIndex:
+    """
+    Sparse map from line numbers to byte offsets: one checkpoint every STRIDE
+    lines. Built with a single chunked pass where newline counting happens in C,
+    so even files of hundreds of MB are indexed quickly and memory stays tiny.
+    Reading any range then costs a seek plus at most STRIDE skipped lines.
+    """
+
+    STRIDE = 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        stat = os.stat(path)
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.checkpoints: List[int] = [0]
+        self.total_lines = 0
+        self._build()
+
+    def _build(self):
+        lines = 0
+        position = 0
+        next_checkpoint = self.STRIDE
+        last_byte = b""
+
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                newlines = chunk.count(b"\n")
+                line_bytes = len(chunk) // max(newlines, 1) + 1
+                start = 0
+                # Only the newline a checkpoint falls on is looked for, the rest is just counted
+                while lines + newlines >= next_checkpoint:
+                    needed = next_checkpoint - lines
+                    offset = _nth_newline(chunk, start, needed, line_bytes)
+                    self.checkpoints.append(position + offset + 1)
+                    lines += needed
+                    newlines -= needed
+                    start = offset + 1
+                    next_checkpoint += self.STRIDE
+                lines += newlines
+                position += len(chunk)
+                last_byte = chunk[-1:]
+
+        # A last line without trailing newline still counts
+        self.total_lines = lines + (1 if last_byte and last_byte != b"\n" else 0)
+
+    def is_current(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == (self.mtime_ns, self.size)
+
+    def seek_line(self, f, line: int):
+        """Positions `f` at the start of 0-based `line`."""
+        checkpoint = min(line // self.STRIDE, len(self.checkpoints) - 1)
+        f.seek(self.checkpoints[checkpoint])
+        for _ in range(line - checkpoint * self.STRIDE):
+            if not _skip_line(f):
+                break
+
+
+_indexes: "OrderedDict[str, LineIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+MAX_CACHED_INDEXES = 256
+
+
+def get_line_index(path: str) -> LineIndex:
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is not None and index.is_current():
+            _indexes.move_to_end(path)
+            return index
+
+    index = LineIndex(path)
+    with _indexes_lock:
+        _indexes[path] = index
+        _indexes.move_to_end(path)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+@dataclass
+class LineRange:
+    content: str
+    start_line: int
+    end_line: int
+    total_lines: int
+    truncated: bool
+    next_line: Optional[int]
+
+
+def _skip_line(f) -> int:
+    """Moves past one line of any length in bounded reads, returns the bytes skipped."""
+    skipped = 0
+    while True:
+        part = f.readline(CHUNK_BYTES)
+        skipped += len(part)
+        if len(part) < CHUNK_BYTES or part.endswith(b"\n"):
+            return skipped
+
+
+def _read_line(f, max_bytes: int) -> bytes:
+    """Reads one line but keeps at most `max_bytes` of it, skipping the rest."""
+    line = f.readline(max_bytes)
+    if not line or line.endswith(b"\n"):
+        return line
+
+    rest = _skip_line(f)
+    if rest == 0:
+        return line
+    return line + f" ... [line truncated, {rest} more bytes]\n".encode()
+
+
+def read_lines(path: str, start_line: int = 1, end_line: int = -1,
+               max_lines: int = 500, max_bytes: int = 48_000) -> LineRange:
+    """
+    Reads 1-based lines [start_line, end_line] (end_line=-1 means to the end)
+    without loading the rest of the file, stopping at whichever budget is hit
+    first. `next_line` tells where to continue when the range was cut.
+    """
+    index = get_line_index(path)
+    total = index.total_lines
+    start_idx = max(0, start_line - 1)
+    end_idx = total if end_line == -1 else min(end_line, total)
+
+    chunks = []
+    used = 0
+    line = start_idx
+    truncated = False
+
+    with open(path, "rb") as f:
+        index.seek_line(f, start_idx)
+        while line < end_idx:
+            if line - start_idx >= max_lines or used >= max_bytes:
+                truncated = True
+                break
+            data = _read_line(f, max_bytes)
+            if not data:
+                break
+            if chunks and used + len(data) > max_bytes:
+                # Leave the whole line for the next call rather than cutting it
+                truncated = True
+                break
+            chunks.append(data)
+            used += len(data)
+            line += 1
+
+    return LineRange(
+        content=b"".join(chunks).decode("utf-8", errors="replace"),
+        start_line=start_idx + 1,
+        end_line=line,
+        total_lines=total,
+        truncated=truncated,
+        next_line=line + 1 if truncated else None,
+    )
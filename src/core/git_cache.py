@@ -0,0 +1,193 @@
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from git import Repo
+
+
+class MirrorCache:
+    """
+    One bare repository per remote URL, shared by all jobs on this host.
+
+    A mirror is created once and then only updated with an incremental `fetch`.
+    Jobs get a `git worktree` on top of it, so a checkout costs a local file copy
+    instead of a network clone. Remote branches live under `refs/remotes/origin/*`
+    so fetching never touches the branches jobs create locally.
+    """
+
+    LOCK_FILE = "cache.lock"
+    STAMP_FILE = "last_used"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 0, depth: int = 0, filter_spec: str = ""):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.depth = depth
+        self.filter_spec = filter_spec
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def mirror_path(self, repo_url: str) -> str:
+        readable = re.sub(r"[^A-Za-z0-9_.-]+", "_", repo_url.split("://")[-1])[-60:]
+        digest = hashlib.sha1(repo_url.encode()).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{readable}-{digest}.git")
+
+    @contextmanager
+    def _lock(self, path: str, blocking: bool = True):
+        with open(f"{path}.{self.LOCK_FILE}", "a") as lock_file:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _fetch_args(self):
+        args = ["--prune", "--tags"]
+        if self.depth:
+            args.append(f"--depth={self.depth}")
+        if self.filter_spec:
+            args.append(f"--filter={self.filter_spec}")
+        return args
+
+    def _create(self, repo_url: str, path: str) -> Repo:
+        mirror = Repo.init(path, bare=True)
+        mirror.create_remote("origin", repo_url)
+        with mirror.config_writer() as cw:
+            cw.set_value('remote "origin"', "fetch", "+refs/heads/*:refs/remotes/origin/*")
+            cw.set_value("gc", "auto", "0")
+            if self.filter_spec:
+                cw.set_value("core", "repositoryformatversion", "1")
+                cw.set_value("extensions", "partialClone", "origin")
+                cw.set_value('remote "origin"', "promisor", "true")
+                cw.set_value('remote "origin"', "partialclonefilter", self.filter_spec)
+        mirror.git.fetch("origin", *self._fetch_args())
+        mirror.git.remote("set-head", "origin", "--auto")
+        return mirror
+
+    def _touch(self, path: str):
+        with open(os.path.join(path, self.STAMP_FILE), "w") as f:
+            f.write(str(time.time()))
+
+    def ensure(self, repo_url: str) -> Repo:
+        """Returns an up-to-date mirror of `repo_url`, creating it on first use."""
+        path = self.mirror_path(repo_url)
+        with self._lock(path):
+            if os.path.isdir(path):
+                mirror = Repo(path)
+                mirror.git.fetch("origin", *self._fetch_args())
+            else:
+                mirror = self._create(repo_url, path)
+            self._touch(path)
+
+        self.evict(keep=path)
+        return mirror
+
+    @staticmethod
+    def default_branch(mirror: Repo) -> str:
+        try:
+            ref = mirror.git.symbolic_ref("refs/remotes/origin/HEAD")
+            return ref.rsplit("refs/remotes/origin/", 1)[-1]
+        except Exception:
+            return "main"
+
+    def add_worktree(self, repo_url: str, work_dir: str) -> Repo:
+        work_dir = os.path.abspath(work_dir)
+        mirror = self.ensure(repo_url)
+        path = self.mirror_path(repo_url)
+        base = f"origin/{self.default_branch(mirror)}"
+
+        with self._lock(path):
+            if os.path.exists(work_dir):
+                shutil.rmtree(work_dir)
+            mirror.git.worktree("prune")
+            mirror.git.worktree("add", "--detach", "--force", work_dir, base)
+        return Repo(work_dir)
+
+    def remove_worktree(self, repo_url: str, work_dir: str, branch: Optional[str] = None):
+        work_dir = os.path.abspath(work_dir)
+        path = self.mirror_path(repo_url)
+        if not os.path.isdir(path):
+            return
+        with self._lock(path):
+            mirror = Repo(path)
+            if os.path.exists(work_dir):
+                mirror.git.worktree("remove", "--force", work_dir)
+            mirror.git.worktree("prune")
+            if branch and branch in mirror.heads:
+                mirror.delete_head(branch, force=True)
+            self._touch(path)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    pass
+        return total
+
+    @staticmethod
+    def _has_worktrees(path: str) -> bool:
+        worktrees = os.path.join(path, "worktrees")
+        return os.path.isdir(worktrees) and bool(os.listdir(worktrees))
+
+    def _last_used(self, path: str) -> float:
+        try:
+            with open(os.path.join(path, self.STAMP_FILE)) as f:
+                return float(f.read().strip())
+        except (OSError, ValueError):
+            return 0.0
+
+    def evict(self, keep: Optional[str] = None):
+        """Drops least recently used mirrors until the cache fits into `max_bytes`."""
+        if not self.max_bytes:
+            return
+
+        mirrors = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".git") and os.path.isdir(os.path.join(self.cache_dir, name))
+        ]
+        sizes = {path: self._dir_size(path) for path in mirrors}
+        total = sum(sizes.values())
+
+        for path in sorted(mirrors, key=self._last_used):
+            if total <= self.max_bytes:
+                break
+            if path == keep or self._has_worktrees(path):
+                continue
+            with self._lock(path, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+
+
+_mirror_cache: Optional[MirrorCache] = None
+
+
+def get_mirror_cache() -> Optional[MirrorCache]:
+    """Process-wide cache built from settings, or None when GIT_CACHE_MODE is 'off'."""
+    global _mirror_cache
+    from src.core.config import settings
+
+    if settings.GIT_CACHE_MODE == "off":
+        return None
+    if _mirror_cache is None:
+        _mirror_cache = MirrorCache(
+            settings.GIT_CACHE_DIR,
+            max_bytes=settings.GIT_CACHE_MAX_BYTES,
+            depth=settings.GIT_CLONE_DEPTH,
+            filter_spec=settings.GIT_CLONE_FILTER,
+        )
+    return _mirror_cache
@@ -1,18 +1,199 @@
-from github import Github
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from github import Auth, Github, GithubRetry
+from github.PullRequestReview import PullRequestReview
 from src.core.config import settings
+from src.logger import log
+
+
+class RateLimitGuard:
+    """
+    Paces calls using the X-RateLimit-* headers of the last response, so the
+    client slows down while budget is left instead of hitting 403s. Callers
+    reserve their turn under the lock and sleep without it, so one pacing
+    call never holds up the others.
+    """
+
+    def __init__(self, client: Github, reserve: int):
+        self.client = client
+        self.reserve = reserve
+        self.lock = threading.Lock()
+        self.next_turn = 0.0
+
+    def wait(self):
+        with self.lock:
+            remaining, limit = self.client.rate_limiting
+            if limit < 0 or remaining > self.reserve:
+                return
+
+            now = time.time()
+            reset = self.client.rate_limiting_resettime
+            if remaining <= 0:
+                turn = reset
+            else:
+                # Spread what is left evenly until the window resets, one turn after another
+                turn = min(max(now, self.next_turn) + max(reset - now, 0) / remaining, reset)
+                self.next_turn = turn
+
+        delay = turn - now
+        if delay > 0:
+            log.debug(f"GitHub rate limit low ({remaining}/{limit}), sleeping {delay:.1f}s")
+            time.sleep(delay)
 
 
 class GithubClient:
-    def __init__(self):
-        self.client = Github(settings.GH_TOKEN)
+    def __init__(self, token: Optional[str] = None, ttl: Optional[float] = None):
+        self.client = Github(
+            auth=Auth.Token(token or settings.GH_TOKEN),
+            pool_size=settings.GH_POOL_SIZE,
+            retry=GithubRetry(),
+        )
+        self.ttl = settings.GH_CACHE_TTL if ttl is None else ttl
+        self.rate_limit = RateLimitGuard(self.client, settings.GH_RATE_LIMIT_RESERVE)
+        self._cache: Dict[Tuple, Tuple[Any, float]] = {}
+        self._etags: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key: Tuple, fetch: Callable[[], Any]):
+        """
+        Returns a cached object, fetching it on a miss. Once the TTL expires the
+        object is revalidated with a conditional request: a 304 answer keeps the
+        cached copy and does not count against the rate limit.
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+        now = time.time()
+
+        if entry is None:
+            self.rate_limit.wait()
+            obj = fetch()
+        else:
+            obj, fetched_at = entry
+            if now - fetched_at < self.ttl:
+                return obj
+            self.rate_limit.wait()
+            obj.update()
+
+        with self._lock:
+            self._cache[key] = (obj, now)
+        return obj
+
+    def invalidate(self, *key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def rate_limit_status(self) -> Tuple[int, int, float]:
+        """(remaining, limit, reset time) of the core API window. Asking for it is not counted."""
+        with self._lock:
+            entry = self._cache.get(("rate_limit",))
+        if entry is None or time.time() - entry[1] >= self.ttl:
+            core = self.client.get_rate_limit().resources.core
+            entry = ((core.remaining, core.limit, core.reset.timestamp()), time.time())
+            with self._lock:
+                self._cache[("rate_limit",)] = entry
+        return entry[0]
+
+    def login(self) -> str:
+        """Login of the account the token belongs to, e.g. to find the comments it wrote."""
+        return self._cached(("user",), self.client.get_user).login
 
     def get_repo(self, repo_name: str):
-        return self.client.get_repo(repo_name)
+        return self._cached(("repo", repo_name), lambda: self.client.get_repo(repo_name))
 
     def get_issue(self, repo_name: str, issue_number: int):
-        repo = self.client.get_repo(repo_name)
-        return repo.get_issue(issue_number)
+        repo = self.get_repo(repo_name)
+        return self._cached(("issue", repo_name, issue_number), lambda: repo.get_issue(issue_number))
+
+    def get_pull(self, repo_name: str, pr_number: int):
+        repo = self.get_repo(repo_name)
+        return self._cached(("pull", repo_name, pr_number), lambda: repo.get_pull(pr_number))
+
+    def get_reviews_if_changed(self, pr) -> Optional[List[PullRequestReview]]:
+        """
+        Reviews of a PR, oldest first, or None when they did not change since the
+        last call for it. The request carries the ETag of the previous answer for
+        the reviews themselves, a 304 costs no rate limit. A PR with more than one
+        page of reviews is listed in full every time, new ones land on the last page.
+        """
+        url = f"{pr.url}/reviews"
+        with self._lock:
+            etag = self._etags.get(url)
+        self.rate_limit.wait()
+        requester = self.client.requester
+        status, headers, output = requester.requestJson(
+            "GET", url, parameters={"per_page": 100}, headers={"If-None-Match": etag} if etag else None
+        )
+        if status == 304:
+            return None
+        data = json.loads(output) if output else None
+        if status >= 400:
+            raise requester.createException(status, headers, data)
+
+        if 'rel="next"' in headers.get("link", ""):
+            return list(pr.get_reviews())
+        with self._lock:
+            self._etags[url] = headers.get("etag")
+        return [PullRequestReview(requester, headers, item) for item in data]
+
+    def get_pull_diff(self, repo_name: str, pr_number: int) -> str:
+        """The whole PR as one unified diff, in a single request (`.diff` media type)."""
+        pr = self.get_pull(repo_name, pr_number)
+        self.rate_limit.wait()
+        _, data = self.client.requester.requestJsonAndCheck(
+            "GET", pr.url, headers={"Accept": "application/vnd.github.diff"}
+        )
+        # Non-JSON bodies come back wrapped as {"data": text}
+        return data["data"] if data else ""
+
+    def get_compare_diff(self, repo_name: str, base: str, head: str) -> str:
+        """Unified diff between two commits, e.g. the last reviewed head and the current one."""
+        repo = self.get_repo(repo_name)
+        self.rate_limit.wait()
+        _, data = self.client.requester.requestJsonAndCheck(
+            "GET", f"{repo.url}/compare/{base}...{head}", headers={"Accept": "application/vnd.github.diff"}
+        )
+        return data["data"] if data else ""
+
+    def is_ancestor(self, repo_name: str, base: str, head: str) -> bool:
+        """False when `head` no longer contains `base`, e.g. after a force push."""
+        repo = self.get_repo(repo_name)
+        self.rate_limit.wait()
+        return repo.compare(base, head).status in ("ahead", "identical")
+
+    def find_issues(self, repo_name: str, labels: Iterable[str] = (), state: str = "open",
+                    limit: int = 0) -> List[int]:
+        """Numbers of issues (not pull requests) matching all `labels`, oldest first."""
+        repo = self.get_repo(repo_name)
+        self.rate_limit.wait()
+        numbers = []
+        for issue in repo.get_issues(state=state, labels=list(labels), sort="created", direction="asc"):
+            if issue.pull_request is not None:
+                continue
+            numbers.append(issue.number)
+            if limit and len(numbers) >= limit:
+                break
+        return numbers
 
     def create_pull_request(self, repo_name: str, title: str, body: str, head: str, base: str):
-        repo = self.client.get_repo(repo_name)
-        return repo.create_pull(title=title, body=body, head=head, base=base)
+        repo = self.get_repo(repo_name)
+        self.rate_limit.wait()
+        pr = repo.create_pull(title=title, body=body, head=head, base=base)
+        with self._lock:
+            self._cache[("pull", repo_name, pr.number)] = (pr, time.time())
+        return pr
+
+
+_client: Optional[GithubClient] = None
+_client_lock = threading.Lock()
+
+
+def get_github_client() -> GithubClient:
+    """Long-lived client shared by everything in this process."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GithubClient()
+        return _client
@@ -0,0 +1,184 @@
+import fnmatch
+import functools
+import os
+import posixpath
+import subprocess
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pathspec
+
+
+@functools.lru_cache(maxsize=64)
+def _path_pattern(pattern: str) -> pathspec.PathSpec:
+    # gitignore syntax: `*` stays within a directory, `**/` also matches no directory at all
+    return pathspec.PathSpec.from_lines("gitwildmatch", [pattern])
+
+
+class IgnoreManager:
+    """
+    Ignore rules of a workspace: built-in patterns, `.coderignore` and every
+    `.gitignore` in the tree, each applied relative to its own directory with
+    the deepest matching rule winning, like git does.
+
+    Compiled specs are cached per workspace and reloaded only when the ignore
+    file's mtime changes, so repeated tool calls don't recompile anything.
+    """
+
+    BASE_PATTERNS = ["__pycache__", "venv", ".git", ".gitignore"]
+
+    _instances: Dict[str, "IgnoreManager"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, root_dir: str):
+        self.root_dir = os.path.abspath(str(root_dir))
+        self.lock = threading.Lock()
+        self._specs: Dict[str, Tuple[Optional[int], Optional[pathspec.PathSpec]]] = {}
+        self.spec = self._load_ignore_spec()
+
+    @classmethod
+    def for_workspace(cls, root_dir) -> "IgnoreManager":
+        root_dir = os.path.abspath(str(root_dir))
+        with cls._instances_lock:
+            manager = cls._instances.get(root_dir)
+            if manager is None or manager._coderignore_mtime() != manager._root_mtime:
+                manager = cls._instances[root_dir] = cls(root_dir)
+            return manager
+
+    def _coderignore_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(self.root_dir, ".coderignore")).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_ignore_spec(self):
+        ignores_patterns = list(self.BASE_PATTERNS)
+        self._root_mtime = self._coderignore_mtime()
+        coderignore_path = os.path.join(self.root_dir, ".coderignore")
+        if self._root_mtime is not None:
+            with open(coderignore_path, "r") as f:
+                ignores_patterns.extend(f.readlines())
+        return pathspec.PathSpec.from_lines("gitwildmatch", ignores_patterns)
+
+    def _gitignore_spec(self, rel_dir: str) -> Optional[pathspec.PathSpec]:
+        """Compiled `.gitignore` of a directory (relative to root), None if it has none."""
+        path = os.path.join(self.root_dir, rel_dir, ".gitignore")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self.lock:
+            cached = self._specs.get(rel_dir)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        spec = None
+        if mtime is not None:
+            with open(path, "r", errors="replace") as f:
+                spec = pathspec.PathSpec.from_lines("gitwildmatch", f.readlines())
+
+        with self.lock:
+            self._specs[rel_dir] = (mtime, spec)
+        return spec
+
+    def _chain(self, rel_dir: str) -> List[Tuple[str, pathspec.PathSpec]]:
+        """`.gitignore` specs that apply inside `rel_dir`, outermost first."""
+        parts = rel_dir.split("/") if rel_dir else []
+        chain = []
+        for depth in range(len(parts) + 1):
+            directory = "/".join(parts[:depth])
+            spec = self._gitignore_spec(directory)
+            if spec is not None:
+                chain.append((directory, spec))
+        return chain
+
+    def is_ignored_rel(self, rel_path: str, is_dir: bool = False,
+                       chain: Optional[List[Tuple[str, pathspec.PathSpec]]] = None) -> bool:
+        rel_path = rel_path.replace(os.sep, "/")
+        suffix = "/" if is_dir else ""
+        if self.spec.match_file(rel_path + suffix):
+            return True
+
+        if chain is None:
+            chain = self._chain(posixpath.dirname(rel_path))
+        decision = None
+        for directory, spec in chain:
+            result = spec.check_file((rel_path[len(directory) + 1:] if directory else rel_path) + suffix)
+            if result.include is not None:
+                decision = result.include
+        return bool(decision)
+
+    def is_ignored(self, filepath: str, is_dir: Optional[bool] = None) -> bool:
+        rel_path = os.path.relpath(filepath, self.root_dir)
+        if rel_path == ".":
+            return False
+        if is_dir is None:
+            is_dir = os.path.isdir(filepath)
+        return self.is_ignored_rel(rel_path, is_dir)
+
+    @staticmethod
+    def _matches(rel_path: str, pattern: Optional[str]) -> bool:
+        if not pattern:
+            return True
+        if "/" in pattern:
+            return _path_pattern(pattern).match_file(rel_path.replace(os.sep, "/"))
+        return fnmatch.fnmatch(os.path.basename(rel_path), pattern)
+
+    def _git_files(self, start: str) -> Optional[Iterator[str]]:
+        """Files under `start` as seen by git (tracked + untracked, minus .gitignore), or None."""
+        if not os.path.exists(os.path.join(self.root_dir, ".git")):
+            return None
+        try:
+            result = subprocess.run(
+                ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+                cwd=start, capture_output=True, timeout=30,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0:
+            return None
+
+        entries = sorted(set(result.stdout.decode("utf-8", "replace").split("\0")) - {""})
+        return (os.path.join(start, entry) for entry in entries)
+
+    def walk(self, start: Optional[str] = None, max_depth: Optional[int] = None,
+             pattern: Optional[str] = None, use_git: bool = True) -> Iterator[str]:
+        """
+        Yields non-ignored files under `start` as paths relative to the root, in
+        a stable order. Ignored directories are pruned and never descended into,
+        and nothing is read ahead, so callers can stop at any point.
+        """
+        start = os.path.abspath(start or self.root_dir)
+        base_depth = start.rstrip(os.sep).count(os.sep)
+
+        git_files = self._git_files(start) if use_git else None
+        if git_files is not None:
+            for full_path in git_files:
+                if max_depth is not None and full_path.count(os.sep) - base_depth > max_depth:
+                    continue
+                rel_path = os.path.relpath(full_path, self.root_dir)
+                if not self._matches(rel_path, pattern) or self.spec.match_file(rel_path.replace(os.sep, "/")):
+                    continue
+                if os.path.isfile(full_path):
+                    yield rel_path
+            return
+
+        for dirpath, dirnames, filenames in os.walk(start):
+            depth = dirpath.rstrip(os.sep).count(os.sep) - base_depth + 1
+            rel_dir = os.path.relpath(dirpath, self.root_dir)
+            rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+            chain = self._chain(rel_dir)
+
+            if max_depth is not None and depth >= max_depth:
+                dirnames[:] = []
+            else:
+                dirnames[:] = sorted(
+                    d for d in dirnames
+                    if not self.is_ignored_rel(posixpath.join(rel_dir, d), is_dir=True, chain=chain)
+                )
+
+            for filename in sorted(filenames):
+                rel_path = posixpath.join(rel_dir, filename)
+                if self._matches(rel_path, pattern) and not self.is_ignored_rel(rel_path, chain=chain):
+                    yield rel_path
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Content-addressed cache of chat model responses stored in SQLite.
+
+    The key is a hash of the serialized messages and of the model's llm_string,
+    which covers the model name, sampling parameters and the bound tool schemas.
+    Entries expire after `ttl` seconds (0 keeps them forever) and the least
+    recently used ones are evicted once the stored responses exceed `max_bytes`.
+
+    With `replay=True` the cache is read-only and a miss raises LLMCacheMiss
+    instead of reaching the network, so recorded runs are reproducible offline.
+    """
+
+    def __init__(self, db_path: str, ttl: float = 0, max_bytes: int = 0, replay: bool = False):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    llm_string TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used_idx ON responses (last_used)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        return conn
+
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self.key(prompt, llm_string)
+        conn = self._connect()
+        row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+
+        now = time.time()
+        if row is not None and self.ttl and now - row[1] > self.ttl and not self.replay:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            row = None
+
+        if row is None:
+            if self.replay:
+                raise LLMCacheMiss(f"No recorded response for request {key[:12]} in {self.db_path}")
+            return None
+
+        conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        if self.replay:
+            return
+        value = dumps(list(return_val))
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, llm_string, value, size, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.key(prompt, llm_string), llm_string, value, len(value), now, now),
+        )
+        self.evict()
+
+    def evict(self) -> int:
+        """Drops expired entries, then least recently used ones above max_bytes. Returns how many."""
+        conn = self._connect()
+        removed = 0
+        if self.ttl:
+            removed += conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+        if self.max_bytes:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    total -= size
+                    removed += 1
+        return removed
+
+    def clear(self, **kwargs: Any) -> None:
+        self._connect().execute("DELETE FROM responses")
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide cache built from settings, or None when LLM_CACHE_MODE is 'off'."""
+    global _llm_cache
+    from src.core.config import settings
+
+    if settings.LLM_CACHE_MODE == "off":
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None or _llm_cache.replay != (settings.LLM_CACHE_MODE == "replay"):
+            _llm_cache = LLMResponseCache(
+                settings.LLM_CACHE_PATH,
+                ttl=settings.LLM_CACHE_TTL,
+                max_bytes=settings.LLM_CACHE_MAX_BYTES,
+                replay=settings.LLM_CACHE_MODE == "replay",
+            )
+        return _llm_cache
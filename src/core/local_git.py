@@ -1,34 +1,136 @@
+import asyncio
 import os
 import shutil
-from git import Repo
+from typing import Optional
+from git import Actor, GitCommandError, Repo
+
+from src.core.async_proc import run_command
+from src.core.git_cache import MirrorCache
+from src.core.tracing import span, traced
 
 
 class LocalGit:
-    def __init__(self, repo_url: str, work_dir: str = "./workspace"):
+    def __init__(self, repo_url: str, work_dir: str = "./workspace", cache: Optional[MirrorCache] = None,
+                 depth: int = 0, filter_spec: str = ""):
         self.repo_url = repo_url
         self.work_dir = work_dir
+        self.cache = cache
+        self.depth = depth
+        self.filter_spec = filter_spec
         self.repo = None
         self.default_branch = "main"
+        self.branch_name = None
 
+    @traced("git.clone")
     def clone(self):
+        if self.cache:
+            self.repo = self.cache.add_worktree(self.repo_url, self.work_dir)
+            self.default_branch = MirrorCache.default_branch(self.repo)
+            return
+
         if os.path.exists(self.work_dir):
             shutil.rmtree(self.work_dir)
-        self.repo = Repo.clone_from(self.repo_url, self.work_dir)
 
+        options = {}
+        if self.depth:
+            options["depth"] = self.depth
+        if self.filter_spec:
+            options["filter"] = self.filter_spec
+        self.repo = Repo.clone_from(self.repo_url, self.work_dir, **options)
+        self.default_branch = self.repo.active_branch.name
+
+    @traced("git.create_branch")
     def create_branch(self, name: str):
         if not self.repo:
             raise RuntimeError("Repository not cloned")
-        current = self.repo.create_head(name)
-        current.checkout()
+        if self.cache:
+            # Branches are shared by all worktrees of a mirror, reset a leftover one
+            self.repo.git.checkout("-B", name)
+        else:
+            current = self.repo.create_head(name)
+            current.checkout()
+        self.branch_name = name
+
+    @traced("git.checkout_branch")
+    def checkout_branch(self, name: str):
+        """Continues a branch pushed earlier, possibly from another worker."""
+        if not self.repo:
+            raise RuntimeError("Repository not cloned")
+        # Shallow clones only know the default branch, fetch this one explicitly
+        self.repo.git.fetch("origin", f"+refs/heads/{name}:refs/remotes/origin/{name}")
+        self.repo.git.checkout("-B", name, f"origin/{name}")
+        self.branch_name = name
 
+    @traced("git.commit_all")
     def commit_all(self, message: str):
         if not self.repo:
             raise RuntimeError("Repository not cloned")
         self.repo.git.add(A=True)
         self.repo.index.commit(message)
 
+    @traced("git.push")
     def push(self, branch_name: str):
         if not self.repo:
             raise RuntimeError("Repository not cloned")
         origin = self.repo.remote(name='origin')
         origin.push(branch_name)
+
+    @traced("git.cleanup")
+    def cleanup(self):
+        """Releases the worktree so its mirror can be evicted. Plain clones are left on disk."""
+        if self.cache and self.repo:
+            self.cache.remove_worktree(self.repo_url, self.work_dir, self.branch_name)
+            self.repo = None
+
+    # Async variants for the asyncio pipeline: network and commit work runs in git
+    # subprocesses awaited on the event loop instead of blocking a thread.
+
+    async def _agit(self, *args: str, env: Optional[dict] = None) -> str:
+        command = ["git", *args]
+        result = await run_command(command, cwd=self.work_dir, env=env)
+        if result.returncode != 0:
+            raise GitCommandError(command, result.returncode, result.stderr, result.stdout)
+        return result.stdout
+
+    async def aclone(self):
+        if self.cache:
+            # Mirror updates are serialized with file locks, keep those waits off the loop
+            await asyncio.to_thread(self.clone)
+            return
+
+        with span("git.clone"):
+            if os.path.exists(self.work_dir):
+                await asyncio.to_thread(shutil.rmtree, self.work_dir)
+
+            command = ["git", "clone"]
+            if self.depth:
+                command.append(f"--depth={self.depth}")
+            if self.filter_spec:
+                command.append(f"--filter={self.filter_spec}")
+            command += [self.repo_url, self.work_dir]
+            result = await run_command(command)
+            if result.returncode != 0:
+                raise GitCommandError(command, result.returncode, result.stderr, result.stdout)
+
+            self.repo = Repo(self.work_dir)
+            self.default_branch = self.repo.active_branch.name
+
+    @traced("git.commit_all")
+    async def acommit_all(self, message: str):
+        if not self.repo:
+            raise RuntimeError("Repository not cloned")
+        # Same identity fallback as index.commit, so commits do not depend on git config
+        reader = self.repo.config_reader()
+        author, committer = Actor.author(reader), Actor.committer(reader)
+        env = {
+            "GIT_AUTHOR_NAME": author.name, "GIT_AUTHOR_EMAIL": author.email,
+            "GIT_COMMITTER_NAME": committer.name, "GIT_COMMITTER_EMAIL": committer.email,
+        }
+        await self._agit("add", "-A")
+        await self._agit("commit", "--allow-empty", "--no-verify", "-m", message, env=env)
+
+    @traced("git.push")
+    async def apush(self, branch_name: str):
+        if not self.repo:
+            raise RuntimeError("Repository not cloned")
+        await self._agit("push", "origin", branch_name)
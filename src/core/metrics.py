@@ -0,0 +1,186 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Buckets in seconds
+STAGE_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+LLM_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TOOL_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+# Span names that make up the stages of a pipeline run
+STAGES = {
+    "git.clone": "clone",
+    "coder.run": "agent",
+    "tool.run_tests": "tests",
+    "git.push": "push",
+    "github.create_pr": "create_pr",
+    "review.wait": "review_wait",
+}
+
+METRICS: Dict[str, Tuple[str, str]] = {
+    "agent_pipeline_runs_total": ("counter", "Pipeline runs by entry point and outcome."),
+    "agent_pipeline_duration_seconds": ("histogram", "Duration of pipeline runs."),
+    "agent_stage_duration_seconds": ("histogram", "Duration of pipeline stages."),
+    "agent_llm_calls_total": ("counter", "Coder LLM calls by outcome."),
+    "agent_llm_call_duration_seconds": ("histogram", "Latency of coder LLM calls."),
+    "agent_llm_tokens_total": ("counter", "Coder LLM tokens by kind (input includes cached)."),
+    "agent_tool_calls_total": ("counter", "Tool calls by outcome."),
+    "agent_tool_call_duration_seconds": ("histogram", "Duration of tool calls."),
+    "agent_jobs": ("gauge", "Jobs in the queue by status."),
+    "agent_suspended_pipelines": ("gauge", "Pipelines saved between review rounds by status."),
+    "agent_github_rate_limit_remaining": ("gauge", "Requests left in the GitHub core API window."),
+    "agent_github_rate_limit": ("gauge", "Size of the GitHub core API window."),
+    "agent_github_rate_limit_reset_timestamp_seconds": ("gauge", "When the GitHub core API window resets."),
+}
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def histogram(name: str, labels: Dict[str, str], value: float, buckets: Sequence[float]) -> List[Sample]:
+    """Increments for one observation. Every bucket is written, so none is missing from the output."""
+    samples = [(f"{name}_bucket", {**labels, "le": _number(b)}, 1 if value <= b else 0) for b in buckets]
+    samples.append((f"{name}_bucket", {**labels, "le": "+Inf"}, 1))
+    samples.append((f"{name}_sum", labels, value))
+    samples.append((f"{name}_count", labels, 1))
+    return samples
+
+
+def span_samples(spans: Iterable) -> List[Sample]:
+    """Counter and histogram increments for the finished spans of one trace."""
+    samples: List[Sample] = []
+    for span in spans:
+        status = "error" if span.error else "ok"
+        if span.parent_id is None:
+            entry = str(span.attributes.get("entry", span.name))
+            samples.append(("agent_pipeline_runs_total", {"entry": entry, "status": status}, 1))
+            samples += histogram("agent_pipeline_duration_seconds", {"entry": entry}, span.duration, STAGE_BUCKETS)
+        elif span.name in STAGES:
+            samples += histogram("agent_stage_duration_seconds", {"stage": STAGES[span.name]}, span.duration,
+                                 STAGE_BUCKETS)
+
+        if span.name == "llm.call":
+            model = str(span.attributes.get("model", ""))
+            samples.append(("agent_llm_calls_total", {"model": model, "status": status}, 1))
+            samples += histogram("agent_llm_call_duration_seconds", {"model": model}, span.duration, LLM_BUCKETS)
+            for kind in ("input", "cached", "output"):
+                samples.append(("agent_llm_tokens_total", {"model": model, "kind": kind},
+                                span.attributes.get(f"llm.{kind}_tokens", 0)))
+        elif span.name.startswith("tool."):
+            tool = span.name[len("tool."):]
+            samples.append(("agent_tool_calls_total", {"tool": tool, "status": status}, 1))
+            samples += histogram("agent_tool_call_duration_seconds", {"tool": tool}, span.duration, TOOL_BUCKETS)
+    return samples
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _family(sample_name: str) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        if sample_name.endswith(suffix) and sample_name[:-len(suffix)] in METRICS:
+            return sample_name[:-len(suffix)]
+    return sample_name
+
+
+def render(samples: Iterable[Sample]) -> str:
+    """
+    Prometheus text exposition format, one HELP/TYPE block per metric. Samples
+    with the same name and labels are summed; buckets come in ascending order.
+    """
+    families: Dict[str, Dict[Tuple, float]] = {}
+    for name, labels, value in samples:
+        le = labels.get("le")
+        rest = tuple(sorted((k, str(v)) for k, v in labels.items() if k != "le"))
+        key = (rest, name, float(le) if le is not None else 0.0, le)
+        series = families.setdefault(_family(name), {})
+        series[key] = series.get(key, 0) + value
+
+    lines = []
+    for family in sorted(families):
+        kind, help_text = METRICS.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        for (rest, name, _, le), value in sorted(families[family].items()):
+            labels = list(rest) + ([("le", le)] if le is not None else [])
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(f"{name}{{{label_text}}} {_number(value)}" if label_text else f"{name} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsStore:
+    """
+    Counters and histograms in SQLite, so the server and its worker processes
+    add to the same totals. Each finished trace is written in one transaction.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS samples (
+                    name TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (name, labels)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add(self, samples: Iterable[Sample]):
+        rows = [(name, json.dumps(labels, sort_keys=True), value) for name, labels, value in samples]
+        if not rows:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def record_spans(self, spans: Iterable):
+        self.add(span_samples(spans))
+
+    def samples(self) -> List[Sample]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT name, labels, value FROM samples").fetchall()
+        return [(r["name"], json.loads(r["labels"]), r["value"]) for r in rows]
+
+
+_store: Optional[MetricsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_metrics_store() -> MetricsStore:
+    global _store
+    from src.core.config import settings
+
+    with _store_lock:
+        if _store is None or _store.db_path != settings.METRICS_DB_PATH:
+            _store = MetricsStore(settings.METRICS_DB_PATH)
+        return _store
@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional
+
+
+class PipelineStatus:
+    WAITING = "waiting"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    TIMED_OUT = "timed_out"
+
+
+@dataclass
+class SuspendedPipeline:
+    repo_name: str
+    issue_number: int
+    branch: str
+    pr_number: int
+    iteration: int
+    feedback: str
+    cursor: int
+    since: float
+    deadline: float
+    status: str = PipelineStatus.WAITING
+    agent_state: str = ""
+    worker: Optional[str] = None
+    updated_at: float = 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("agent_state")
+        return data
+
+
+class PipelineStore:
+    """
+    Pipelines suspended while their pull request waits for a review.
+
+    After pushing, a pipeline saves what it needs to continue (branch, PR,
+    iteration, review cursor and the coder's graph state) and releases its
+    worker and workspace. A review event later lets any worker claim the record
+    and resume from it. One record per `repo#issue`.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pipelines (
+                    repo_name TEXT NOT NULL,
+                    issue_number INTEGER NOT NULL,
+                    branch TEXT NOT NULL,
+                    pr_number INTEGER NOT NULL,
+                    iteration INTEGER NOT NULL,
+                    feedback TEXT NOT NULL DEFAULT '',
+                    cursor INTEGER NOT NULL,
+                    since REAL NOT NULL,
+                    deadline REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    agent_state TEXT NOT NULL DEFAULT '',
+                    worker TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (repo_name, issue_number)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS pipelines_pr_idx ON pipelines (repo_name, pr_number)")
+            conn.execute("CREATE INDEX IF NOT EXISTS pipelines_status_idx ON pipelines (status, deadline)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def save(self, pipeline: SuspendedPipeline):
+        pipeline.updated_at = time.time()
+        data = asdict(pipeline)
+        columns = ", ".join(data)
+        placeholders = ", ".join("?" for _ in data)
+        with closing(self._connect()) as conn:
+            conn.execute(f"INSERT OR REPLACE INTO pipelines ({columns}) VALUES ({placeholders})", list(data.values()))
+
+    def get(self, repo_name: str, issue_number: int) -> Optional[SuspendedPipeline]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM pipelines WHERE repo_name = ? AND issue_number = ?", (repo_name, issue_number)
+            ).fetchone()
+        return SuspendedPipeline(**dict(row)) if row else None
+
+    def find_by_pr(self, repo_name: str, pr_number: int) -> Optional[SuspendedPipeline]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM pipelines WHERE repo_name = ? AND pr_number = ?", (repo_name, pr_number)
+            ).fetchone()
+        return SuspendedPipeline(**dict(row)) if row else None
+
+    def claim(self, repo_name: str, issue_number: int, worker: str,
+              statuses: Iterable[str] = (PipelineStatus.WAITING,)) -> Optional[SuspendedPipeline]:
+        """Takes a pipeline in one of `statuses` for resuming, None if it is in another one (anymore)."""
+        statuses = list(statuses)
+        placeholders = ", ".join("?" for _ in statuses)
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f"UPDATE pipelines SET status = ?, worker = ?, updated_at = ? "
+                f"WHERE repo_name = ? AND issue_number = ? AND status IN ({placeholders})",
+                (PipelineStatus.RUNNING, worker, time.time(), repo_name, issue_number, *statuses),
+            )
+        return self.get(repo_name, issue_number) if cursor.rowcount == 1 else None
+
+    def requeue_running(self, worker: Optional[str] = None) -> int:
+        """
+        Puts pipelines left `running` by a dead worker (or by all workers) back
+        to waiting, so the requeued job for the issue can claim them again.
+        """
+        where = "status = ?"
+        params = [PipelineStatus.RUNNING]
+        if worker is not None:
+            where += " AND worker = ?"
+            params.append(worker)
+
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f"UPDATE pipelines SET status = ?, worker = NULL, updated_at = ? WHERE {where}",
+                [PipelineStatus.WAITING, time.time(), *params],
+            )
+        return cursor.rowcount
+
+    def finish(self, repo_name: str, issue_number: int, status: str):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE pipelines SET status = ?, agent_state = '', updated_at = ? "
+                "WHERE repo_name = ? AND issue_number = ?",
+                (status, time.time(), repo_name, issue_number),
+            )
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Marks pipelines whose review never came as timed out."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE pipelines SET status = ?, agent_state = '', updated_at = ? WHERE status = ? AND deadline < ?",
+                (PipelineStatus.TIMED_OUT, time.time(), PipelineStatus.WAITING, now or time.time()),
+            )
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM pipelines GROUP BY status").fetchall()
+        counts = {s: 0 for s in (PipelineStatus.WAITING, PipelineStatus.RUNNING, PipelineStatus.DONE,
+                                 PipelineStatus.FAILED, PipelineStatus.TIMED_OUT)}
+        counts.update({r["status"]: r["n"] for r in rows})
+        return counts
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[SuspendedPipeline]:
+        with closing(self._connect()) as conn:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM pipelines WHERE status = ? ORDER BY updated_at DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM pipelines ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+        return [SuspendedPipeline(**dict(r)) for r in rows]
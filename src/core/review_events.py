@@ -0,0 +1,135 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Iterable, Optional, Set, Tuple
+
+REVIEW_VERDICTS = ("APPROVED", "CHANGES_REQUESTED")
+
+# Shared by every bus in the process so a publish wakes local waiters at once.
+# Waiters in other processes see the event on their next local read.
+_condition = threading.Condition()
+# Event loops with an `await_event` in progress, woken through call_soon_threadsafe
+_async_waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+
+@dataclass
+class ReviewEvent:
+    id: int
+    repo_name: str
+    pr_number: int
+    state: str
+    body: str
+    created_at: float
+
+
+class ReviewBus:
+    """
+    Local pub/sub channel for pull request reviews.
+
+    The webhook server publishes `pull_request_review` events, pipelines wait on
+    them. Events are stored in SQLite, so publisher and waiter may live in
+    different processes on the same host.
+    """
+
+    def __init__(self, db_path: str, poll_interval: float = 1.0):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS review_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    repo_name TEXT NOT NULL,
+                    pr_number INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    body TEXT NOT NULL DEFAULT '',
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS review_events_pr_idx ON review_events (repo_name, pr_number, id)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def publish(self, repo_name: str, pr_number: int, state: str, body: str = "") -> ReviewEvent:
+        state = state.upper()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "INSERT INTO review_events (repo_name, pr_number, state, body, created_at) VALUES (?, ?, ?, ?, ?)",
+                (repo_name, pr_number, state, body or "", time.time()),
+            )
+            event_id = cursor.lastrowid
+
+        with _condition:
+            _condition.notify_all()
+            for loop, wakeup in list(_async_waiters):
+                try:
+                    loop.call_soon_threadsafe(wakeup.set)
+                except RuntimeError:
+                    # Loop already closed
+                    _async_waiters.discard((loop, wakeup))
+        return ReviewEvent(event_id, repo_name, pr_number, state, body or "", time.time())
+
+    def cursor(self) -> int:
+        """Id of the newest event, wait for events after it to skip older reviews."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT MAX(id) AS id FROM review_events").fetchone()
+        return row["id"] or 0
+
+    def next_event(self, repo_name: str, pr_number: int, after_id: int,
+                   states: Iterable[str] = REVIEW_VERDICTS) -> Optional[ReviewEvent]:
+        states = list(states)
+        placeholders = ", ".join("?" for _ in states)
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT * FROM review_events WHERE repo_name = ? AND pr_number = ? AND id > ? "
+                f"AND state IN ({placeholders}) ORDER BY id LIMIT 1",
+                (repo_name, pr_number, after_id, *states),
+            ).fetchone()
+        return ReviewEvent(**dict(row)) if row else None
+
+    def wait(self, repo_name: str, pr_number: int, after_id: int, timeout: float,
+             states: Iterable[str] = REVIEW_VERDICTS) -> Optional[ReviewEvent]:
+        deadline = time.time() + timeout
+        with _condition:
+            while True:
+                event = self.next_event(repo_name, pr_number, after_id, states)
+                if event:
+                    return event
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                _condition.wait(min(self.poll_interval, remaining))
+
+    async def await_event(self, repo_name: str, pr_number: int, after_id: int, timeout: float,
+                          states: Iterable[str] = REVIEW_VERDICTS) -> Optional[ReviewEvent]:
+        """Like `wait`, but suspends the coroutine instead of blocking a thread."""
+        deadline = time.time() + timeout
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with _condition:
+            _async_waiters.add(waiter)
+        try:
+            while True:
+                waiter[1].clear()
+                event = self.next_event(repo_name, pr_number, after_id, states)
+                if event:
+                    return event
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), min(self.poll_interval, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with _condition:
+                _async_waiters.discard(waiter)
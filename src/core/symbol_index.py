@@ -0,0 +1,178 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.core.ignore import IgnoreManager
+from src.core.syntax_analyzer import Definition, SyntaxAnalyzer
+
+
+@dataclass
+class FileSymbols:
+    path: str
+    language: str
+    content_hash: str
+    mtime_ns: int
+    size: int
+    total_lines: int
+    definitions: List[Definition]
+
+
+def _parse_file(root: str, rel_path: str) -> Optional[FileSymbols]:
+    full_path = os.path.join(root, rel_path)
+    try:
+        stat = os.stat(full_path)
+        with open(full_path, "rb") as f:
+            raw = f.read()
+        code = raw.decode("utf-8")
+        definitions = SyntaxAnalyzer.get_definitions(code, rel_path)
+    except (OSError, UnicodeDecodeError, ValueError):
+        return None
+    if definitions is None:
+        return None
+
+    return FileSymbols(
+        path=rel_path,
+        language=SyntaxAnalyzer.get_language_name(rel_path),
+        content_hash=hashlib.sha1(raw).hexdigest(),
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        total_lines=len(code.splitlines()),
+        definitions=definitions,
+    )
+
+
+def _parse_batch(root: str, rel_paths: List[str]) -> List[FileSymbols]:
+    return [entry for entry in (_parse_file(root, p) for p in rel_paths) if entry]
+
+
+class SymbolIndex:
+    """
+    Definitions of every supported source file in a workspace, keyed by path.
+
+    Entries are checked against the file's mtime and size on every lookup and
+    re-parsed only when the content hash actually changed, so edits made by the
+    agent (or anyone else) never return stale symbols.
+    """
+
+    PARALLEL_THRESHOLD = 64
+    BATCH_SIZE = 32
+
+    _instances: Dict[str, "SymbolIndex"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files: Dict[str, FileSymbols] = {}
+        self.built = False
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+
+    @classmethod
+    def for_workspace(cls, root) -> "SymbolIndex":
+        root = os.path.abspath(str(root))
+        with cls._instances_lock:
+            if root not in cls._instances:
+                cls._instances[root] = cls(root)
+            return cls._instances[root]
+
+    @classmethod
+    def notify_changed(cls, root, rel_path: str):
+        """Called by tools that write files, refreshes the entry if the workspace is indexed."""
+        index = cls._instances.get(os.path.abspath(str(root)))
+        if index is not None:
+            index.refresh(rel_path)
+
+    @classmethod
+    def drop(cls, root):
+        with cls._instances_lock:
+            cls._instances.pop(os.path.abspath(str(root)), None)
+
+    def _source_files(self) -> List[str]:
+        manager = IgnoreManager.for_workspace(self.root)
+        return [path for path in manager.walk() if SyntaxAnalyzer.get_language_name(path)]
+
+    def build(self):
+        """Parses the whole workspace, spreading files over all cores when there are many."""
+        paths = self._source_files()
+
+        # Daemon processes, like the job queue's workers, cannot start a process pool
+        if len(paths) < self.PARALLEL_THRESHOLD or multiprocessing.current_process().daemon:
+            entries = _parse_batch(self.root, paths)
+        else:
+            batches = [paths[i:i + self.BATCH_SIZE] for i in range(0, len(paths), self.BATCH_SIZE)]
+            with ProcessPoolExecutor() as pool:
+                entries = [e for batch in pool.map(_parse_batch, [self.root] * len(batches), batches) for e in batch]
+
+        with self.lock:
+            # Entries refreshed while the build was running are newer, keep them
+            for entry in entries:
+                self.files.setdefault(entry.path, entry)
+            self.built = True
+
+    def ensure_built(self):
+        with self.build_lock:
+            if not self.built:
+                self.build()
+
+    def refresh(self, rel_path: str) -> Optional[FileSymbols]:
+        rel_path = os.path.normpath(rel_path)
+        full_path = os.path.join(self.root, rel_path)
+
+        with self.lock:
+            current = self.files.get(rel_path)
+            if not os.path.exists(full_path):
+                self.files.pop(rel_path, None)
+                return None
+
+            if current is not None:
+                with open(full_path, "rb") as f:
+                    raw = f.read()
+                if hashlib.sha1(raw).hexdigest() == current.content_hash:
+                    stat = os.stat(full_path)
+                    current.mtime_ns, current.size = stat.st_mtime_ns, stat.st_size
+                    return current
+
+            entry = _parse_file(self.root, rel_path)
+            if entry is None:
+                self.files.pop(rel_path, None)
+            else:
+                self.files[rel_path] = entry
+            return entry
+
+    def get(self, rel_path: str) -> Optional[FileSymbols]:
+        rel_path = os.path.normpath(rel_path)
+        with self.lock:
+            entry = self.files.get(rel_path)
+            if entry is not None:
+                try:
+                    stat = os.stat(os.path.join(self.root, rel_path))
+                except OSError:
+                    self.files.pop(rel_path, None)
+                    return None
+                if (stat.st_mtime_ns, stat.st_size) == (entry.mtime_ns, entry.size):
+                    return entry
+            return self.refresh(rel_path)
+
+    def find(self, name: str, limit: int = 50) -> List[Tuple[str, Definition]]:
+        """Exact (qualified) name matches first, then case-insensitive substring matches."""
+        self.ensure_built()
+        needle = name.lower()
+        exact, partial = [], []
+
+        with self.lock:
+            paths = list(self.files)
+        for path in sorted(paths):
+            entry = self.get(path)
+            if entry is None:
+                continue
+            for definition in entry.definitions:
+                if name in (definition.name, definition.qualified_name):
+                    exact.append((path, definition))
+                elif needle in definition.qualified_name.lower():
+                    partial.append((path, definition))
+
+        return (exact + partial)[:limit]
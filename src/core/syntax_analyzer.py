@@ -1,8 +1,72 @@
 from tree_sitter_languages import get_language, get_parser
 import re
+import threading
+from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 
 
+@dataclass
+class Definition:
+    name: str
+    kind: str
+    start_line: int
+    end_line: int
+    signature: str
+    container: Optional[str] = None
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.container}.{self.name}" if self.container else self.name
+
+
+# Languages and compiled queries are immutable and shared. Parsers keep state
+# between calls, so every thread gets its own.
+_languages: Dict[str, object] = {}
+_queries: Dict[str, object] = {}
+_cache_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_language(lang_name: str):
+    with _cache_lock:
+        if lang_name not in _languages:
+            _languages[lang_name] = get_language(lang_name)
+        return _languages[lang_name]
+
+
+def _get_query(lang_name: str):
+    language = _get_language(lang_name)
+    with _cache_lock:
+        if lang_name not in _queries:
+            _queries[lang_name] = language.query(SyntaxAnalyzer.QUERIES[lang_name])
+        return _queries[lang_name]
+
+
+def _get_parser(lang_name: str):
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    if lang_name not in parsers:
+        parsers[lang_name] = get_parser(lang_name)
+    return parsers[lang_name]
+
+
+def _first(captured):
+    # Newer tree-sitter bindings return a list of nodes per capture name
+    if isinstance(captured, list):
+        return captured[0] if captured else None
+    return captured
+
+
+def _node_kind(node_type: str) -> str:
+    for kind in ("class", "interface", "struct", "trait", "impl", "method"):
+        if kind in node_type:
+            return kind
+    if node_type.startswith("type_"):
+        return "type"
+    return "function"
+
+
 class SyntaxAnalyzer:
     EXT_TO_LANG = {
         ".py": "python",
@@ -21,7 +85,6 @@ class SyntaxAnalyzer:
         "python": """
             (function_definition name: (identifier) @name) @def
             (class_definition name: (identifier) @name) @def
-            (async_function_definition name: (identifier) @name) @def
         """,
         "javascript": """
             (function_declaration name: (identifier) @name) @def
@@ -78,79 +141,25 @@ class SyntaxAnalyzer:
 
         return None
 
+    @staticmethod
+    def _fallback_head(code: str, count: int = 20) -> str:
+        lines = code.splitlines()[:count]
+        if len(lines) == count:
+            lines.append("...")
+        return "\n".join(lines)
+
     @staticmethod
     def get_backbone(code: str, filename: str) -> str:
         lang_name = SyntaxAnalyzer.get_language_name(filename)
 
         if not lang_name:
-            lines = code.splitlines()[:20]
-            if len(lines) == 20:
-                lines.append("...")
-            return "\n".join(lines)
-
-        try:
-            language = get_language(lang_name)
-            if not language:
-                return f"Language {lang_name} not supported by tree-sitter"
-
-            parser = get_parser(lang_name)
-            if not parser:
-                return f"Parser for {lang_name} not available"
-
-            tree = parser.parse(bytes(code, "utf8"))
-
-            query_scm = SyntaxAnalyzer.QUERIES.get(lang_name)
-            if not query_scm:
-                return f"Parsed as {lang_name}, but no skeleton query defined."
-
-            query = language.query(query_scm)
-            captures = query.captures(tree.root_node)
-
-            signatures = []
-            seen_nodes = set()
-
-            for node, tag in captures:
-                if tag == "def":
-                    node_id = (node.start_byte, node.end_byte)
-                    if node_id in seen_nodes:
-                        continue
-                    seen_nodes.add(node_id)
+            return SyntaxAnalyzer._fallback_head(code)
 
-                    start_line = node.start_point[0]
-                    end_line = min(node.start_point[0] + 3, node.end_point[0])
-
-                    code_lines = code.splitlines()
-                    if start_line < len(code_lines):
-                        signature_lines = []
-                        for i in range(start_line, min(start_line + 3, len(code_lines), end_line + 1)):
-                            line = code_lines[i].rstrip()
-                            if line:
-                                signature_lines.append(line)
-                            if i == end_line or '}' in line or '):' in line or line.endswith('{'):
-                                break
-
-                        signature = " ".join(signature_lines[:3])
-                        if len(signature) > 150:
-                            signature = signature[:147] + "..."
-
-                        signatures.append(f"L{start_line + 1}: {signature}")
-
-            if not signatures:
-                lines = code.splitlines()[:10]
-                if lines:
-                    return f"No structural definitions found. First lines:\n" + "\n".join(lines)
-                return "File is empty"
-
-            signatures.sort(key=lambda x: int(x.split(':')[0][1:]))
-
-            result = [f"=== {filename} ({lang_name}) ==="]
-            result.extend(signatures)
-
-            result.append(f"\nTotal definitions: {len(signatures)}")
-            result.append(f"Total lines: {len(code.splitlines())}")
-
-            return "\n".join(result)
+        if lang_name not in SyntaxAnalyzer.QUERIES:
+            return f"Parsed as {lang_name}, but no skeleton query defined."
 
+        try:
+            definitions = SyntaxAnalyzer.get_definitions(code, filename)
         except Exception as e:
             error_msg = f"Error parsing {filename} as {lang_name}: {str(e)[:100]}"
 
@@ -162,20 +171,108 @@ class SyntaxAnalyzer:
             else:
                 return f"{error_msg}\n\nFile is empty"
 
+        if not definitions:
+            lines = code.splitlines()[:10]
+            if lines:
+                return f"No structural definitions found. First lines:\n" + "\n".join(lines)
+            return "File is empty"
+
+        return SyntaxAnalyzer.render_backbone(filename, lang_name, definitions, len(code.splitlines()))
+
+    @staticmethod
+    def get_definitions(code: str, filename: str) -> Optional[List[Definition]]:
+        """
+        Structured skeleton: definitions ordered by position in the file.
+        Returns None when the language is unsupported.
+
+        Runs in linear time: the source is split into lines once and every
+        capture is resolved through byte offsets and tree-sitter row numbers.
+        """
+        lang_name = SyntaxAnalyzer.get_language_name(filename)
+        if not lang_name or lang_name not in SyntaxAnalyzer.QUERIES:
+            return None
+
+        query = _get_query(lang_name)
+        source = bytes(code, "utf8")
+        tree = _get_parser(lang_name).parse(source)
+
+        nodes = {}
+        for _, captured in query.matches(tree.root_node):
+            node = _first(captured["def"])
+            name_node = _first(captured.get("name"))
+            key = (node.start_byte, node.end_byte)
+            if key not in nodes or nodes[key][1] is None:
+                nodes[key] = (node, name_node)
+
+        # tree-sitter rows only count "\n", so split the same way
+        source_lines = source.split(b"\n")
+        definitions = []
+        stack = []  # enclosing class-like definitions as (end_byte, name)
+
+        for (start_byte, end_byte), (node, name_node) in sorted(nodes.items(), key=lambda item: (item[0][0], -item[0][1])):
+            while stack and stack[-1][0] <= start_byte:
+                stack.pop()
+
+            if name_node is not None:
+                name = source[name_node.start_byte:name_node.end_byte].decode("utf8", "replace")
+            else:
+                name = "<anonymous>"
+            kind = _node_kind(node.type)
+            container = stack[-1][1] if stack else None
+            if kind == "function" and container:
+                kind = "method"
+
+            start_line = node.start_point[0]
+            end_line = node.end_point[0]
+            signature_lines = []
+            for i in range(start_line, min(start_line + 3, len(source_lines), end_line + 1)):
+                line = source_lines[i].decode("utf8", "replace").rstrip()
+                if line:
+                    signature_lines.append(line)
+                if i == end_line or '}' in line or '):' in line or line.endswith('{'):
+                    break
+            signature = " ".join(signature_lines)
+            if len(signature) > 150:
+                signature = signature[:147] + "..."
+
+            definitions.append(Definition(name, kind, start_line + 1, end_line + 1, signature, container))
+            if kind in ("class", "interface", "struct", "trait", "impl"):
+                stack.append((end_byte, name))
+
+        return definitions
+
+    @staticmethod
+    def render_backbone(filename: str, lang_name: str, definitions: List[Definition], total_lines: int) -> str:
+        result = [f"=== {filename} ({lang_name}) ==="]
+        result.extend(f"L{d.start_line}: {d.signature}" for d in definitions)
+        result.append(f"\nTotal definitions: {len(definitions)}")
+        result.append(f"Total lines: {total_lines}")
+        return "\n".join(result)
+
     @staticmethod
     def get_file_summary(code: str, filename: str) -> Dict:
-        backbone = SyntaxAnalyzer.get_backbone(code, filename)
+        language = SyntaxAnalyzer.get_language_name(filename)
+        try:
+            definitions = SyntaxAnalyzer.get_definitions(code, filename) or []
+        except Exception:
+            definitions = []
 
         lines = code.splitlines()
         non_empty_lines = [line for line in lines if line.strip()]
 
+        if definitions:
+            backbone = SyntaxAnalyzer.render_backbone(filename, language, definitions, len(lines))
+        else:
+            backbone = SyntaxAnalyzer.get_backbone(code, filename)
+
         return {
             "filename": filename,
-            "language": SyntaxAnalyzer.get_language_name(filename),
+            "language": language,
             "total_lines": len(lines),
             "non_empty_lines": len(non_empty_lines),
             "backbone": backbone,
-            "has_definitions": "L" in backbone,
+            "has_definitions": bool(definitions),
+            "definitions": definitions,
         }
 
     @staticmethod
@@ -0,0 +1,161 @@
+import ast
+import os
+import subprocess
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.core.ignore import IgnoreManager
+
+SOURCE_ROOTS = ("", "src", "lib")
+# Changes to these never affect a test run
+DOC_EXTENSIONS = (".md", ".rst")
+
+_imports_cache: Dict[str, Tuple[int, Set[str]]] = {}
+_imports_lock = threading.Lock()
+
+
+def is_test_file(rel_path: str) -> bool:
+    name = os.path.basename(rel_path)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def _git(root: str, *args) -> Optional[str]:
+    try:
+        result = subprocess.run(["git", *args], cwd=root, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def changed_files(root: str) -> Optional[List[str]]:
+    """
+    Files changed in the workspace since the branch left the default branch,
+    including uncommitted and untracked ones. None when this is not a git checkout.
+    """
+    base = _git(root, "merge-base", "HEAD", "origin/HEAD")
+    base = base.strip() if base else "HEAD"
+
+    diff = _git(root, "diff", "--name-only", base)
+    if diff is None:
+        return None
+    untracked = _git(root, "ls-files", "--others", "--exclude-standard") or ""
+
+    return sorted({line for line in (diff + untracked).splitlines() if line})
+
+
+def module_names(rel_path: str) -> List[str]:
+    """Dotted names a file can be imported as, one per possible source root."""
+    if not rel_path.endswith(".py"):
+        return []
+    parts = rel_path[:-3].replace(os.sep, "/").split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+
+    names = []
+    for source_root in SOURCE_ROOTS:
+        if source_root and parts[:1] != [source_root]:
+            continue
+        name = ".".join(parts[1:] if source_root else parts)
+        if name:
+            names.append(name)
+    return names
+
+
+def _imports(full_path: str, package: str) -> Set[str]:
+    """Modules imported by a file, `from a import b` yields both `a` and `a.b`. Cached by mtime."""
+    try:
+        mtime = os.stat(full_path).st_mtime_ns
+    except OSError:
+        return set()
+
+    with _imports_lock:
+        cached = _imports_cache.get(full_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    try:
+        with open(full_path, "rb") as f:
+            tree = ast.parse(f.read())
+    except (SyntaxError, ValueError, OSError):
+        tree = None
+
+    found = set()
+    for node in ast.walk(tree) if tree else []:
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            if node.level:
+                anchor = package.split(".")[:len(package.split(".")) - node.level + 1] if package else []
+                module = ".".join([*anchor, module] if module else anchor)
+            if module:
+                found.add(module)
+                found.update(f"{module}.{alias.name}" for alias in node.names)
+
+    with _imports_lock:
+        _imports_cache[full_path] = (mtime, found)
+    return found
+
+
+def impacted_tests(root: str, changed: List[str]) -> Optional[List[str]]:
+    """
+    Test files that import a changed file directly or through other project
+    modules. None means "run everything": a conftest or config file changed,
+    or a non-Python file that tests may load as data or fixtures.
+    """
+    root = os.path.abspath(root)
+    if any(os.path.basename(p) in ("conftest.py", "pytest.ini", "tox.ini", "setup.cfg", "pyproject.toml")
+           for p in changed):
+        return None
+    if any(not p.endswith(".py") and not p.endswith(DOC_EXTENSIONS) for p in changed):
+        return None
+
+    python_files = [p for p in IgnoreManager.for_workspace(root).walk() if p.endswith(".py")]
+    module_to_file = {}
+    for rel_path in python_files:
+        for name in module_names(rel_path):
+            module_to_file.setdefault(name, rel_path)
+
+    # Reverse import graph: file -> project files importing it
+    importers: Dict[str, Set[str]] = {}
+    for rel_path in python_files:
+        names = module_names(rel_path)
+        package = names[-1].rsplit(".", 1)[0] if names and "." in names[-1] else ""
+        if rel_path.endswith("__init__.py") and names:
+            package = names[-1]
+        for module in _imports(os.path.join(root, rel_path), package):
+            target = module_to_file.get(module)
+            if target and target != rel_path:
+                importers.setdefault(target, set()).add(rel_path)
+
+    reached = set()
+    pending = [p for p in changed if p.endswith(".py")]
+    while pending:
+        current = pending.pop()
+        if current in reached:
+            continue
+        reached.add(current)
+        pending.extend(importers.get(current, ()))
+
+    return sorted(p for p in reached if is_test_file(p) and os.path.exists(os.path.join(root, p)))
+
+
+def all_tests(root: str) -> List[str]:
+    return [p for p in IgnoreManager.for_workspace(root).walk() if is_test_file(p)]
+
+
+def third_party_imports(root: str) -> List[str]:
+    """Top-level modules imported by tests and conftests that are not part of the project."""
+    root = os.path.abspath(root)
+    files = list(IgnoreManager.for_workspace(root).walk())
+    project = {name.split(".")[0] for rel_path in files for name in module_names(rel_path)}
+    project.update(p.split("/")[0] for p in files)
+
+    found = set()
+    for rel_path in files:
+        if is_test_file(rel_path) or os.path.basename(rel_path) == "conftest.py":
+            for module in _imports(os.path.join(root, rel_path), ""):
+                top = module.split(".")[0]
+                if top and top not in project:
+                    found.add(top)
+    return sorted(found)
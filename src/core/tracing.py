@@ -0,0 +1,229 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.core.config import settings
+from src.core.metrics import get_metrics_store
+from src.logger import log
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, **attributes):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def add(self, **counters):
+        """Adds to numeric attributes, e.g. token counts over several calls."""
+        for key, value in counters.items():
+            self.attributes[key] = self.attributes.get(key, 0) + (value or 0)
+
+    def to_otlp(self) -> dict:
+        """One span in the OTLP/JSON shape, so the files load into OpenTelemetry tooling."""
+        def value(v):
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        return data
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+
+    def record(self, span: Span):
+        with self.lock:
+            self.spans.append(span)
+
+    def export(self, directory: str) -> str:
+        """Writes finished spans as JSON lines, oldest start first."""
+        os.makedirs(directory, exist_ok=True)
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in self.name)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{self.trace_id[:8]}.jsonl")
+        with self.lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+        with open(path, "w") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_otlp()) + "\n")
+        return path
+
+    def summary(self) -> str:
+        """Time per span name (count, total, mean, max, share of the run) and token totals."""
+        with self.lock:
+            spans = list(self.spans)
+        root = next((s for s in spans if s.parent_id is None), None)
+        total = root.duration if root else sum(s.duration for s in spans)
+
+        groups: Dict[str, List[Span]] = {}
+        for span in spans:
+            if span is not root:
+                groups.setdefault(span.name, []).append(span)
+
+        rows = [("span", "count", "total s", "mean s", "max s", "share")]
+        for name, group in sorted(groups.items(), key=lambda item: -sum(s.duration for s in item[1])):
+            durations = [s.duration for s in group]
+            errors = sum(1 for s in group if s.error)
+            rows.append((
+                name + (f" ({errors} failed)" if errors else ""),
+                str(len(group)),
+                f"{sum(durations):.2f}",
+                f"{sum(durations) / len(durations):.2f}",
+                f"{max(durations):.2f}",
+                f"{sum(durations) / total:.0%}" if total else "-",
+            ))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = [f"Trace {self.name}: {total:.2f}s"]
+        for row in rows:
+            lines.append("  ".join(cell.ljust(w) if i == 0 else cell.rjust(w) for i, (cell, w) in enumerate(zip(row, widths))))
+
+        tokens = {key: sum(s.attributes.get(key, 0) for s in spans if s.name == "llm.call")
+                  for key in ("llm.input_tokens", "llm.cached_tokens", "llm.output_tokens")}
+        if any(tokens.values()):
+            lines.append(
+                f"LLM tokens: {tokens['llm.input_tokens']} input ({tokens['llm.cached_tokens']} cached), "
+                f"{tokens['llm.output_tokens']} output"
+            )
+        return "\n".join(lines)
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Times a block as a child of the current span. Outside of a trace it does
+    nothing and yields None, so instrumented code costs nothing in tests and tools.
+    Context variables carry the parent into threads started with a copied context.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(trace.trace_id, secrets.token_hex(8), parent.span_id if parent else None, name, time.time_ns())
+    current.set(**attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        trace.record(current)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def record_span(name: str, start: float, end: float, **attributes) -> Optional[Span]:
+    """
+    Adds a finished child of the current span for something timed elsewhere,
+    e.g. a wait during which no process held the pipeline. Times are Unix seconds.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+
+    parent = _current_span.get()
+    recorded = Span(trace.trace_id, secrets.token_hex(8), parent.span_id if parent else None, name,
+                    int(start * 1e9), int(end * 1e9))
+    recorded.set(**attributes)
+    trace.record(recorded)
+    return recorded
+
+
+def traced(name: str):
+    """Decorator form of `span` for plain and async functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Starts a trace with a root span. When it ends the spans are written to
+    TRACE_DIR and the summary table is logged, and they are added to the
+    metrics. Nested calls join the outer trace.
+    """
+    if not (settings.TRACING or settings.METRICS) or _current_trace.get() is not None:
+        with span(name, **attributes) as root:
+            yield root
+        return
+
+    current = Trace(name)
+    trace_token = _current_trace.set(current)
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        _current_trace.reset(trace_token)
+        if settings.TRACING:
+            try:
+                path = current.export(settings.TRACE_DIR)
+                log.info(f"{current.summary()}\nSpans written to {path}")
+            except OSError as e:
+                log.error(f"Could not export trace: {e}")
+        if settings.METRICS:
+            try:
+                get_metrics_store().record_spans(current.spans)
+            except sqlite3.Error as e:
+                log.error(f"Could not record metrics: {e}")
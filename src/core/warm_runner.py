@@ -0,0 +1,240 @@
+"""
+Warm pytest runner: one long-lived interpreter per workspace that has pytest
+and the project's heavy third-party dependencies already imported, and forks
+a fresh child for every test run.
+
+The parent never imports project code, so every forked child sees the current
+sources on disk. If a module the parent did import lives inside the workspace
+(or a dependency manifest changes), its copy would be stale: the worker then
+exits and is restarted on the next run.
+
+This file is also the worker's entry point and therefore imports only stdlib.
+"""
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MANIFESTS = ("requirements.txt", "setup.py", "setup.cfg", "pyproject.toml", "Pipfile.lock", "poetry.lock")
+STARTUP_TIMEOUT = 120
+
+
+def warm_supported() -> bool:
+    return hasattr(os, "fork")
+
+
+# --- worker side ---
+
+def _watched_files(root: str) -> Dict[str, int]:
+    """Files whose change makes the preloaded state stale, with their mtimes."""
+    root = os.path.abspath(root) + os.sep
+    paths = {os.path.join(root, name) for name in MANIFESTS}
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.abspath(path).startswith(root):
+            paths.add(os.path.abspath(path))
+
+    watched = {}
+    for path in paths:
+        try:
+            watched[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            watched[path] = -1
+    return watched
+
+
+def _is_stale(watched: Dict[str, int]) -> bool:
+    for path, mtime in watched.items():
+        try:
+            current = os.stat(path).st_mtime_ns
+        except OSError:
+            current = -1
+        if current != mtime:
+            return True
+    return False
+
+
+def _run_forked(args: List[str], timeout: float) -> dict:
+    with tempfile.TemporaryFile() as output:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 3
+            try:
+                os.setsid()
+                devnull = os.open(os.devnull, os.O_RDONLY)
+                os.dup2(devnull, 0)
+                os.dup2(output.fileno(), 1)
+                os.dup2(output.fileno(), 2)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+                import pytest
+                code = int(pytest.main(args))
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+
+        deadline = time.monotonic() + timeout
+        timed_out = False
+        status = 0
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            if time.monotonic() > deadline:
+                timed_out = True
+                os.killpg(pid, signal.SIGKILL)
+                _, status = os.waitpid(pid, 0)
+                break
+            time.sleep(0.02)
+
+        output.seek(0)
+        text = output.read().decode("utf-8", errors="replace")
+
+    returncode = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status >> 8
+    return {"returncode": -1 if timed_out else returncode, "output": text, "timed_out": timed_out}
+
+
+def serve(preload: Iterable[str]):
+    # Behave like the `pytest` script: the runner's own directory must not shadow project modules
+    if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+        del sys.path[0]
+
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+
+    import pytest  # noqa: F401
+    from importlib.metadata import entry_points
+
+    # Third-party pytest plugins are imported on every pytest.main otherwise
+    for plugin in entry_points(group="pytest11"):
+        try:
+            plugin.load()
+        except BaseException:
+            pass
+    for name in preload:
+        try:
+            __import__(name)
+        except BaseException:
+            pass
+
+    watched = _watched_files(os.getcwd())
+    protocol.write(json.dumps({"ready": True, "pid": os.getpid()}) + "\n")
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        if _is_stale(watched):
+            protocol.write(json.dumps({"stale": True}) + "\n")
+            return
+        protocol.write(json.dumps(_run_forked(request["args"], request["timeout"])) + "\n")
+
+
+# --- client side ---
+
+class WarmRunner:
+    """Client for the worker of one workspace. Runs are serialized."""
+
+    _instances: Dict[str, "WarmRunner"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, root_dir: str, preload: Iterable[str] = ()):
+        self.root_dir = os.path.abspath(root_dir)
+        self.preload = sorted(set(preload))
+        self.lock = threading.Lock()
+        self.process: Optional[subprocess.Popen] = None
+
+    @classmethod
+    def for_workspace(cls, root_dir: str, preload: Iterable[str] = ()) -> "WarmRunner":
+        root_dir = os.path.abspath(str(root_dir))
+        with cls._instances_lock:
+            runner = cls._instances.get(root_dir)
+            if runner is None:
+                runner = cls._instances[root_dir] = cls(root_dir, preload)
+            elif set(preload) - set(runner.preload):
+                # New heavy imports appeared in the tests: warm them up on the next start
+                runner.preload = sorted(set(runner.preload) | set(preload))
+                runner.stop()
+            return runner
+
+    @classmethod
+    def drop(cls, root_dir: str):
+        with cls._instances_lock:
+            runner = cls._instances.pop(os.path.abspath(str(root_dir)), None)
+        if runner:
+            runner.stop()
+
+    def _readline(self, timeout: float) -> Optional[dict]:
+        stdout = self.process.stdout
+        ready, _, _ = select.select([stdout], [], [], timeout)
+        if not ready:
+            return None
+        line = stdout.readline()
+        return json.loads(line) if line else None
+
+    def _start(self) -> bool:
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), json.dumps(self.preload)],
+            cwd=self.root_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        reply = self._readline(STARTUP_TIMEOUT)
+        if not reply or not reply.get("ready"):
+            self.stop()
+            return False
+        return True
+
+    def stop(self):
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+    def run(self, args: List[str], timeout: float) -> Optional[Tuple[int, str, bool]]:
+        """
+        Runs `pytest args` in a forked child. Returns (returncode, output, timed_out),
+        or None when the worker is unavailable and the caller should run cold.
+        """
+        with self.lock:
+            for _ in range(2):
+                if (self.process is None or self.process.poll() is not None) and not self._start():
+                    return None
+                try:
+                    self.process.stdin.write(json.dumps({"args": args, "timeout": timeout}) + "\n")
+                    self.process.stdin.flush()
+                except OSError:
+                    self.stop()
+                    continue
+
+                reply = self._readline(timeout + 30)
+                if reply is None:
+                    # Worker hung or died mid-run
+                    self.stop()
+                    return None
+                if reply.get("stale"):
+                    self.stop()
+                    continue
+                return reply["returncode"], reply["output"], reply["timed_out"]
+            return None
+
+
+if __name__ == "__main__":
+    serve(json.loads(sys.argv[1]) if len(sys.argv) > 1 else [])
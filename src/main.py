@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 from dotenv import load_dotenv
@@ -16,7 +17,51 @@ def fix(repo_name: str, issue_number: int, feedback: str = ""):
     runner.run(feedback=feedback)
 
 
+def batch(argv):
+    from src.batch import BatchRunner, load_issue_file, parse_issue_ref, search_issues
+
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main batch",
+        description="Fix many issues in parallel worker processes.",
+    )
+    parser.add_argument("issues", nargs="*", help="issue references: owner/repo#number")
+    parser.add_argument("-f", "--file", help="file with one owner/repo#number per line")
+    parser.add_argument("--repo", help="repository for --label")
+    parser.add_argument("--label", action="append", default=[], help="open issues of --repo with this label")
+    parser.add_argument("--limit", type=int, default=0, help="maximum number of issues taken from --label")
+    parser.add_argument("-j", "--workers", type=int, default=4, help="pipelines running at once")
+    parser.add_argument("--per-repo", type=int, default=1, help="pipelines per repository at once, 0 = no limit")
+    parser.add_argument("--feedback", default="", help="feedback passed to every pipeline")
+    parser.add_argument("--log-dir", default="./workspace/batch-logs", help="per-issue logs")
+    args = parser.parse_args(argv)
+
+    issues = [parse_issue_ref(ref) for ref in args.issues]
+    if args.file:
+        issues += load_issue_file(args.file)
+    if args.label:
+        if not args.repo:
+            parser.error("--label needs --repo")
+        issues += search_issues(args.repo, args.label, limit=args.limit)
+    if not issues:
+        parser.error("no issues given")
+
+    runner = BatchRunner(
+        issues,
+        workers=args.workers,
+        per_repo_limit=args.per_repo,
+        feedback=args.feedback,
+        log_dir=args.log_dir,
+    )
+    log.info(f"Batch: {len(runner.issues)} issues, {args.workers} workers, {args.per_repo or 'no'} per-repo limit")
+    runner.run()
+    log.info(runner.summary())
+    return 0 if all(r.ok for r in runner.results) else 1
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(batch(sys.argv[2:]))
+
     while True:
         try:
             log.info("\nВведите данные (формат: repo_name issue_number [feedback])")
@@ -1,7 +1,11 @@
 import os
 import sys
-from src.core.github_client import GithubClient
-from src.agents.reviewer import ReviewerAgent
+from typing import Optional
+from github import GithubException
+from src.core.github_client import get_github_client
+from src.agents.reviewer import ReviewerAgent, ReviewResult
+from src.agents.review_state import ReviewState, latest_state, review_increment
+from src.core.diff import ingest_compare, ingest_pull_request
 from src.logger import log
 
 
@@ -24,7 +28,7 @@ def get_ci_status(pr):
             return [f"CI status: {status.state}"]
 
     except Exception as e:
-        log.warning(f"Could not fetch CI status: {e}")
+        log.error(f"Could not fetch CI status: {e}")
         return []
 
 
@@ -37,9 +41,8 @@ def main():
         sys.exit(1)
 
     log.debug(f"Reviewing PR #{pr_number} in {repo_name}...")
-    gh = GithubClient()
-    repo = gh.get_repo(repo_name)
-    pr = repo.get_pull(pr_number)
+    gh = get_github_client()
+    pr = gh.get_pull(repo_name, pr_number)
 
     failed_ci = get_ci_status(pr)
     if failed_ci:
@@ -48,22 +51,54 @@ def main():
         sys.exit(1)
 
     task_description = f"{pr.title}\n{pr.body}"
+    head_sha = pr.head.sha
+    previous = latest_state(((c.user.login, c.body) for c in pr.get_issue_comments()), author=gh.login())
 
-    diff_text = ""
-    for file in pr.get_files():
-        diff_text += f"\n--- {file.filename} ---\n{file.patch}\n"
+    if previous and previous.sha == head_sha:
+        # Re-run on an already reviewed commit: nothing new to say
+        log.info(f"{head_sha[:7]} was already reviewed, verdict: {previous.action}")
+        sys.exit(1 if previous.action == "REQUEST_CHANGES" else 0)
 
-    reviewer = ReviewerAgent()
-    result = reviewer.review_pr(task_description, diff_text)
+    result = review(gh, repo_name, pr_number, head_sha, task_description, previous)
 
     log.info(f"Verdict: {result.action}")
     log.info(f"Summary: {result.general_summary}")
 
+    pr.create_issue_comment(format_review(result, ReviewState.from_result(head_sha, result)))
     if result.action == "REQUEST_CHANGES":
-        pr.create_issue_comment(f"##AI Review: Changes Requested\n\n{result.general_summary}")
         sys.exit(1)
-    else:
-        pr.create_issue_comment(f"##AI Review: Approved\n\n{result.general_summary}")
+
+
+def review(gh, repo_name: str, pr_number: int, head_sha: str, task_description: str,
+           previous: Optional[ReviewState]) -> ReviewResult:
+    """Reviews the whole PR, or only the changes since `previous` when its commit is still in the branch."""
+    # The checkout of the reviewed project provides its ignore rules
+    project_root = os.getenv("TARGET_PROJECT_PATH")
+    files = ingest_pull_request(gh, repo_name, pr_number, project_root=project_root)
+    skipped = [f for f in files if f.skipped]
+    log.info(f"Diff: {len(files)} files, {len(skipped)} listed without content")
+
+    reviewer = ReviewerAgent()
+    if previous is not None:
+        try:
+            if gh.is_ancestor(repo_name, previous.sha, head_sha):
+                increment = ingest_compare(gh, repo_name, previous.sha, head_sha, project_root=project_root)
+                log.info(f"Incremental review of {previous.sha[:7]}..{head_sha[:7]}: {len(increment)} files changed")
+                return review_increment(reviewer, task_description, files, increment, previous)
+            log.info(f"{previous.sha[:7]} is no longer in the branch, reviewing the whole PR")
+        except GithubException as e:
+            log.info(f"Could not compare with {previous.sha[:7]} ({e.status}), reviewing the whole PR")
+
+    return reviewer.review_pr(task_description, files)
+
+
+def format_review(result: ReviewResult, state: ReviewState) -> str:
+    title = "Changes Requested" if result.action == "REQUEST_CHANGES" else "Approved"
+    body = f"##AI Review: {title}\n\n{result.general_summary}"
+    if result.comments:
+        body += "\n\n" + "\n".join(f"- `{c.path}:{c.line}` {c.body}" for c in result.comments)
+    # Hidden from readers, lets the next run review only what changed
+    return f"{body}\n\n{state.marker()}"
 
 
 if __name__ == "__main__":
@@ -1,48 +1,152 @@
+import asyncio
+import functools
+import inspect
 import os
+import threading
 import time
-from src.core.github_client import GithubClient
+from typing import Optional
+from langgraph.checkpoint.memory import InMemorySaver
+from src.core.github_client import get_github_client
 from src.core.local_git import LocalGit
+from src.core.git_cache import get_mirror_cache
+from src.core.config import settings
+from src.core.pipeline_store import PipelineStatus, PipelineStore, SuspendedPipeline
+from src.core.review_events import ReviewBus, REVIEW_VERDICTS
+from src.core.code_search import TrigramIndex
+from src.core.symbol_index import SymbolIndex
+from src.core.warm_runner import WarmRunner
 from src.agents.coder import CoderAgent
 from src.core.context import work_dir_context
+from src.core.tracing import record_span, trace, traced
 from src.logger import log
 
 
+def _pipeline_trace(method):
+    """Runs a pipeline entry point as one trace, exported with its timing table when it returns."""
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            with trace("pipeline", repo=self.repo_name, issue=self.issue_number, entry=method.__name__):
+                return await method(self, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with trace("pipeline", repo=self.repo_name, issue=self.issue_number, entry=method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class PipelineRunner:
-    def __init__(self, repo_name: str, issue_number: int):
+    MAX_ITERATIONS = 5
+
+    def __init__(self, repo_name: str, issue_number: int, store: Optional[PipelineStore] = None):
         self.repo_name = repo_name
         self.issue_number = issue_number
         self.workspace_path = os.path.abspath(f"./workspace/{repo_name.replace('/', '_')}_{issue_number}")
-        self.gh = GithubClient()
+        self.gh = get_github_client()
         self.local_git = None
-        self.agent = CoderAgent()
+        # Review rounds continue the coder's conversation on this thread
+        self.thread_id = f"{repo_name}#{issue_number}"
+        self.agent = CoderAgent(checkpointer=InMemorySaver())
+        self.review_bus = ReviewBus(settings.EVENTS_DB_PATH)
+        self.store = store or PipelineStore(settings.PIPELINES_DB_PATH)
 
+    @traced("pipeline.setup")
     def _setup(self):
         issue = self.gh.get_issue(self.repo_name, self.issue_number)
 
-        self.local_git = LocalGit(issue.repository.clone_url, self.workspace_path)
+        self.local_git = self._make_local_git(issue)
         self.local_git.clone()
 
         branch_name = f"fix/issue-{self.issue_number}"
         self.local_git.create_branch(branch_name)
 
+        # Index symbols in the background while the agent starts its first turn
+        index = SymbolIndex.for_workspace(self.workspace_path)
+        threading.Thread(target=index.ensure_built, daemon=True).start()
+
         return issue, branch_name
 
+    def _make_local_git(self, issue) -> LocalGit:
+        return LocalGit(
+            issue.repository.clone_url,
+            self.workspace_path,
+            cache=get_mirror_cache(),
+            depth=settings.GIT_CLONE_DEPTH,
+            filter_spec=settings.GIT_CLONE_FILTER,
+        )
+
+    @traced("pipeline.teardown")
     def _teardown(self, issue, branch_name):
         log.debug("--- Tearing down environment ---")
 
         self.local_git.commit_all(f"Automated fix for #{self.issue_number}")
         self.local_git.push(branch_name)
 
-        pr = self.gh.create_pull_request(
+        pr = self._create_pull_request(issue, branch_name)
+        log.info(f"PR Created: {pr.html_url}")
+        return pr
+
+    @traced("github.create_pr")
+    def _create_pull_request(self, issue, branch_name):
+        return self.gh.create_pull_request(
             repo_name=self.repo_name,
             title=f"Fix: {issue.title}",
             body=f"Fixes #{self.issue_number}",
             head=branch_name,
             base=self.local_git.default_branch,
         )
-        log.info(f"PR Created: {pr.html_url}")
-        return pr
 
+    def _review_timeout(self) -> int:
+        return settings.REVIEW_TIMEOUT_OVERRIDES.get(self.repo_name, settings.REVIEW_TIMEOUT)
+
+    def _poll_review(self, pr, since: float):
+        # A review need not change the PR's own ETag, so the conditional request goes to
+        # the reviews: a 304 means none was added and costs no rate limit
+        reviews = self.gh.get_reviews_if_changed(pr)
+        if not reviews:
+            return None
+
+        for review in reversed(reviews):
+            if review.submitted_at and review.submitted_at.timestamp() < since:
+                break
+            if review.state in REVIEW_VERDICTS:
+                return review.state, review.body
+        return None
+
+    @traced("review.wait")
+    def _wait_for_review(self, pr, cursor: int, since: float):
+        """Returns (state, body) of the first verdict after `cursor`, or None on timeout."""
+        deadline = time.time() + self._review_timeout()
+        poll_interval = settings.REVIEW_POLL_INITIAL
+        next_poll = time.time() + poll_interval
+
+        while time.time() < deadline:
+            wait_for = min(deadline, next_poll) - time.time()
+            event = self.review_bus.wait(self.repo_name, pr.number, cursor, timeout=max(wait_for, 0))
+            if event:
+                return event.state, event.body
+
+            if time.time() >= next_poll:
+                log.debug("No review event yet, polling GitHub...")
+                review = self._poll_review(pr, since)
+                if review:
+                    return review
+                poll_interval = min(poll_interval * 2, settings.REVIEW_POLL_MAX)
+                next_poll = time.time() + poll_interval
+
+        return None
+
+    @traced("pipeline.release")
+    def _release(self):
+        if self.local_git:
+            self.local_git.cleanup()
+        SymbolIndex.drop(self.workspace_path)
+        TrigramIndex.drop(self.workspace_path)
+        WarmRunner.drop(self.workspace_path)
+
+    @_pipeline_trace
     def run(self, feedback=""):
         log.debug("--- Starting environment ---")
         token = work_dir_context.set(self.workspace_path)
@@ -53,39 +157,262 @@ class PipelineRunner:
             task_description = f"Title: {issue.title}\nBody: {issue.body}"
             current_feedback = feedback
 
-            for iteration in range(5):
+            for iteration in range(self.MAX_ITERATIONS):
                 log.info(f"Iteration {iteration + 1} started")
-                self.agent.run(task_description, feedback=current_feedback)
+                self.agent.run(task_description, feedback=current_feedback, thread_id=self.thread_id)
+
+                # Reviews that arrive from now on belong to this iteration
+                cursor = self.review_bus.cursor()
+                since = time.time()
 
                 # Push changes and get PR
                 pr = self._teardown(issue, branch_name)
 
-                # Polling for reviewer with 5 min timeout
-                start_wait = time.time()
-                review_received = False
+                log.debug("Waiting for AI Reviewer...")
+                review = self._wait_for_review(pr, cursor, since)
 
-                while time.time() - start_wait < 300:
-                    pr.update()
-                    reviews = list(pr.get_reviews())
+                if review is None:
+                    log.error(f"Reviewer timeout ({self._review_timeout()}s reached). Shutting down.")
+                    break
 
-                    if reviews:
-                        last_review = reviews[-1]
-                        if last_review.state == "APPROVED":
-                            log.info("PR Approved by reviewer.")
-                            return
+                state, body = review
+                if state == "APPROVED":
+                    log.info("PR Approved by reviewer.")
+                    return
 
-                        if last_review.state == "CHANGES_REQUESTED":
-                            log.info(f"Changes requested: {last_review.body}")
-                            current_feedback = last_review.body
-                            review_received = True
-                            break
+                log.info(f"Changes requested: {body}")
+                current_feedback = body
+
+        finally:
+            self._release()
+            work_dir_context.reset(token)
+
+    # Suspendable pipeline: instead of waiting for the review inside `run`, `start`
+    # and `resume` push one iteration, save a SuspendedPipeline and return, so
+    # the worker and workspace are free during the review. The review webhook
+    # then queues a job that resumes the pipeline on whichever worker takes it.
+
+    def _suspend(self, branch_name: str, pr_number: int, iteration: int, feedback: str,
+                 cursor: int, since: float) -> SuspendedPipeline:
+        pipeline = SuspendedPipeline(
+            repo_name=self.repo_name,
+            issue_number=self.issue_number,
+            branch=branch_name,
+            pr_number=pr_number,
+            iteration=iteration,
+            feedback=feedback,
+            cursor=cursor,
+            since=since,
+            deadline=since + self._review_timeout(),
+            agent_state=self.agent.export_state(self.thread_id),
+        )
+        self.store.save(pipeline)
+        log.info(f"{self.thread_id}: suspended after iteration {iteration}, waiting for review of PR #{pr_number}")
+        return pipeline
+
+    @staticmethod
+    def _record_review_wait(pipeline: SuspendedPipeline):
+        # No worker held the pipeline while it waited: the wait runs from the push to the claim
+        record_span("review.wait", pipeline.since, pipeline.updated_at, pr=pipeline.pr_number)
+
+    @_pipeline_trace
+    def start(self, feedback="") -> SuspendedPipeline:
+        """First iteration: fix, push, open the PR and suspend."""
+        token = work_dir_context.set(self.workspace_path)
+        try:
+            issue, branch_name = self._setup()
+            self.agent.run(f"Title: {issue.title}\nBody: {issue.body}", feedback=feedback, thread_id=self.thread_id)
+
+            cursor = self.review_bus.cursor()
+            since = time.time()
+            pr = self._teardown(issue, branch_name)
+            return self._suspend(branch_name, pr.number, 1, feedback, cursor, since)
+        finally:
+            self._release()
+            work_dir_context.reset(token)
+
+    @_pipeline_trace
+    def resume(self, pipeline: SuspendedPipeline, feedback: str) -> Optional[SuspendedPipeline]:
+        """
+        Next iteration after a review requested changes: restores the coder's
+        state, continues on the pushed branch and suspends again. Returns None
+        once the iteration limit is reached.
+        """
+        self._record_review_wait(pipeline)
+        if pipeline.iteration >= self.MAX_ITERATIONS:
+            log.error(f"{self.thread_id}: no approval after {pipeline.iteration} iterations, giving up")
+            self.store.finish(self.repo_name, self.issue_number, PipelineStatus.FAILED)
+            return None
+
+        token = work_dir_context.set(self.workspace_path)
+        try:
+            issue = self.gh.get_issue(self.repo_name, self.issue_number)
+            self.local_git = self._make_local_git(issue)
+            self.local_git.clone()
+            self.local_git.checkout_branch(pipeline.branch)
+
+            index = SymbolIndex.for_workspace(self.workspace_path)
+            threading.Thread(target=index.ensure_built, daemon=True).start()
+
+            if pipeline.agent_state:
+                self.agent.import_state(self.thread_id, pipeline.agent_state)
+            log.info(f"{self.thread_id}: iteration {pipeline.iteration + 1} resumed, changes requested: {feedback}")
+            self.agent.run(f"Title: {issue.title}\nBody: {issue.body}", feedback=feedback, thread_id=self.thread_id)
+
+            cursor = self.review_bus.cursor()
+            since = time.time()
+            # The PR already exists, pushing the branch updates it
+            self.local_git.commit_all(f"Automated fix for #{self.issue_number}")
+            self.local_git.push(pipeline.branch)
+            return self._suspend(pipeline.branch, pipeline.pr_number, pipeline.iteration + 1, feedback, cursor, since)
+        except Exception:
+            self.store.finish(self.repo_name, self.issue_number, PipelineStatus.FAILED)
+            raise
+        finally:
+            self._release()
+            work_dir_context.reset(token)
 
-                    log.debug("Waiting for AI Reviewer...")
-                    time.sleep(30)
+    # Async pipeline: same flow as `run`, but git and tests run as awaited subprocesses,
+    # LLM calls use the async client and the review wait suspends instead of blocking.
+    # Blocking PyGithub calls go to worker threads; they are few and mostly cached.
 
-                if not review_received:
-                    log.error("Reviewer timeout (5 minutes reached). Shutting down.")
+    @traced("pipeline.setup")
+    async def _asetup(self):
+        issue = await asyncio.to_thread(self.gh.get_issue, self.repo_name, self.issue_number)
+
+        self.local_git = self._make_local_git(issue)
+        await self.local_git.aclone()
+
+        branch_name = f"fix/issue-{self.issue_number}"
+        await asyncio.to_thread(self.local_git.create_branch, branch_name)
+
+        index = SymbolIndex.for_workspace(self.workspace_path)
+        threading.Thread(target=index.ensure_built, daemon=True).start()
+
+        return issue, branch_name
+
+    @traced("pipeline.teardown")
+    async def _ateardown(self, issue, branch_name):
+        log.debug("--- Tearing down environment ---")
+
+        await self.local_git.acommit_all(f"Automated fix for #{self.issue_number}")
+        await self.local_git.apush(branch_name)
+
+        pr = await asyncio.to_thread(self._create_pull_request, issue, branch_name)
+        log.info(f"PR Created: {pr.html_url}")
+        return pr
+
+    @traced("review.wait")
+    async def _await_review(self, pr, cursor: int, since: float):
+        deadline = time.time() + self._review_timeout()
+        poll_interval = settings.REVIEW_POLL_INITIAL
+        next_poll = time.time() + poll_interval
+
+        while time.time() < deadline:
+            wait_for = min(deadline, next_poll) - time.time()
+            event = await self.review_bus.await_event(self.repo_name, pr.number, cursor, timeout=max(wait_for, 0))
+            if event:
+                return event.state, event.body
+
+            if time.time() >= next_poll:
+                log.debug("No review event yet, polling GitHub...")
+                review = await asyncio.to_thread(self._poll_review, pr, since)
+                if review:
+                    return review
+                poll_interval = min(poll_interval * 2, settings.REVIEW_POLL_MAX)
+                next_poll = time.time() + poll_interval
+
+        return None
+
+    @_pipeline_trace
+    async def arun(self, feedback=""):
+        # Each asyncio task has its own context, so concurrent pipelines keep separate workspaces
+        token = work_dir_context.set(self.workspace_path)
+        log.debug(f"Environment Started: {self.workspace_path}")
+
+        try:
+            issue, branch_name = await self._asetup()
+            task_description = f"Title: {issue.title}\nBody: {issue.body}"
+            current_feedback = feedback
+
+            for iteration in range(self.MAX_ITERATIONS):
+                log.info(f"{self.repo_name}#{self.issue_number}: iteration {iteration + 1} started")
+                await self.agent.arun(task_description, feedback=current_feedback, thread_id=self.thread_id)
+
+                cursor = self.review_bus.cursor()
+                since = time.time()
+                pr = await self._ateardown(issue, branch_name)
+
+                review = await self._await_review(pr, cursor, since)
+                if review is None:
+                    log.error(f"Reviewer timeout ({self._review_timeout()}s reached). Shutting down.")
                     break
 
+                state, body = review
+                if state == "APPROVED":
+                    log.info("PR Approved by reviewer.")
+                    return
+
+                log.info(f"Changes requested: {body}")
+                current_feedback = body
+
+        finally:
+            await asyncio.to_thread(self._release)
+            work_dir_context.reset(token)
+
+    # Suspendable async pipeline, for the asyncio job runner: `start` and `resume`
+    # with the awaited git subprocesses and LLM calls of `arun`.
+
+    @_pipeline_trace
+    async def astart(self, feedback="") -> SuspendedPipeline:
+        token = work_dir_context.set(self.workspace_path)
+        try:
+            issue, branch_name = await self._asetup()
+            await self.agent.arun(f"Title: {issue.title}\nBody: {issue.body}", feedback=feedback,
+                                  thread_id=self.thread_id)
+
+            cursor = self.review_bus.cursor()
+            since = time.time()
+            pr = await self._ateardown(issue, branch_name)
+            return await asyncio.to_thread(self._suspend, branch_name, pr.number, 1, feedback, cursor, since)
+        finally:
+            await asyncio.to_thread(self._release)
+            work_dir_context.reset(token)
+
+    @_pipeline_trace
+    async def aresume(self, pipeline: SuspendedPipeline, feedback: str) -> Optional[SuspendedPipeline]:
+        self._record_review_wait(pipeline)
+        if pipeline.iteration >= self.MAX_ITERATIONS:
+            log.error(f"{self.thread_id}: no approval after {pipeline.iteration} iterations, giving up")
+            await asyncio.to_thread(self.store.finish, self.repo_name, self.issue_number, PipelineStatus.FAILED)
+            return None
+
+        token = work_dir_context.set(self.workspace_path)
+        try:
+            issue = await asyncio.to_thread(self.gh.get_issue, self.repo_name, self.issue_number)
+            self.local_git = self._make_local_git(issue)
+            await self.local_git.aclone()
+            await asyncio.to_thread(self.local_git.checkout_branch, pipeline.branch)
+
+            index = SymbolIndex.for_workspace(self.workspace_path)
+            threading.Thread(target=index.ensure_built, daemon=True).start()
+
+            if pipeline.agent_state:
+                self.agent.import_state(self.thread_id, pipeline.agent_state)
+            log.info(f"{self.thread_id}: iteration {pipeline.iteration + 1} resumed, changes requested: {feedback}")
+            await self.agent.arun(f"Title: {issue.title}\nBody: {issue.body}", feedback=feedback,
+                                  thread_id=self.thread_id)
+
+            cursor = self.review_bus.cursor()
+            since = time.time()
+            await self.local_git.acommit_all(f"Automated fix for #{self.issue_number}")
+            await self.local_git.apush(pipeline.branch)
+            return await asyncio.to_thread(
+                self._suspend, pipeline.branch, pipeline.pr_number, pipeline.iteration + 1, feedback, cursor, since
+            )
+        except Exception:
+            await asyncio.to_thread(self.store.finish, self.repo_name, self.issue_number, PipelineStatus.FAILED)
+            raise
         finally:
-            work_dir_context.reset(token)
\ No newline at end of file
+            await asyncio.to_thread(self._release)
+            work_dir_context.reset(token)
@@ -1,35 +1,154 @@
+import asyncio
 import os
-from fastapi import FastAPI, Request, BackgroundTasks
+from contextlib import asynccontextmanager
+from typing import Optional
 
-from src.agents.coder import CoderAgent
-from src.core.github_client import GithubClient
-from src.core.local_git import LocalGit
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
+from github import GithubException
 
-app = FastAPI()
+from src.core.config import settings
+from src.core.github_client import get_github_client
+from src.core.metrics import get_metrics_store, render
+from src.core.pipeline_store import PipelineStatus, PipelineStore, SuspendedPipeline
+from src.core.review_events import ReviewBus
+from src.runner import PipelineRunner
+from src.server.jobs import AsyncJobRunner, JobQueue, WorkerPool
+
+job_queue = JobQueue(settings.JOBS_DB_PATH)
+review_bus = ReviewBus(settings.EVENTS_DB_PATH)
+pipeline_store = PipelineStore(settings.PIPELINES_DB_PATH)
 
 
 def run_agent_job(repo_full_name: str, issue_number: int, feedback: str = ""):
     print(f"Worker started for {repo_full_name}#{issue_number}")
 
-    gh = GithubClient()
-    issue = gh.get_issue(repo_full_name, issue_number)
-    repo_url = issue.repository.clone_url
-    branch_name = f"fix/issue-{issue_number}"
+    # Pipelines suspend after pushing, so the worker is free while the PR waits for
+    # review. A job for a suspended pipeline carries the review and resumes it here.
+    # Claimed under the worker loop's name, so a dead worker's pipeline is requeued with its job.
+    known = pipeline_store.get(repo_full_name, issue_number)
+    pipeline = known and _claim_pipeline(known, feedback, worker=f"worker-{os.getpid()}")
+    if known and pipeline is None:
+        print(f"Pipeline for {repo_full_name}#{issue_number} is {known.status}, nothing to resume")
+        return
+
+    runner = PipelineRunner(repo_full_name, issue_number, store=pipeline_store)
+    if pipeline:
+        suspended = runner.resume(pipeline, feedback or pipeline.feedback)
+    else:
+        suspended = runner.start(feedback)
+    _deliver_missed_review(suspended)
+
+
+def _claim_pipeline(known: SuspendedPipeline, feedback: str, worker: str) -> Optional[SuspendedPipeline]:
+    """
+    A known pipeline already has its branch and PR, so it is resumed, never
+    started over. Waiting ones always resume, finished ones only for new
+    feedback such as a comment on their PR. A running one belongs to another
+    worker; a dead worker's is put back to waiting when its job is requeued.
+    """
+    statuses = [PipelineStatus.WAITING]
+    if feedback:
+        statuses += [PipelineStatus.DONE, PipelineStatus.FAILED, PipelineStatus.TIMED_OUT]
+    return pipeline_store.claim(known.repo_name, known.issue_number, worker, statuses)
+
+
+def _deliver_review(pipeline: SuspendedPipeline, state: str, body: str) -> Optional[dict]:
+    """Finishes a waiting pipeline on approval or queues it to resume on requested changes."""
+    if state == "APPROVED":
+        pipeline_store.finish(pipeline.repo_name, pipeline.issue_number, PipelineStatus.DONE)
+        return {"status": "accepted", "msg": "Pipeline finished, PR approved"}
+    if state == "CHANGES_REQUESTED":
+        job, created = job_queue.enqueue(pipeline.repo_name, pipeline.issue_number, feedback=body)
+        return {"status": "accepted", "msg": "Suspended pipeline queued to resume", "job_id": job.id}
+    return None
+
+
+def _deliver_missed_review(pipeline: Optional[SuspendedPipeline]):
+    """
+    The webhook drops a review that comes while the pipeline is still running,
+    before it is saved as waiting. A verdict published after the pipeline's
+    cursor is delivered here instead. Delivering twice is harmless: the job
+    for this issue is still running, so a second enqueue merges into the first.
+    """
+    if pipeline is None:
+        return
+    event = review_bus.next_event(pipeline.repo_name, pipeline.pr_number, pipeline.cursor)
+    if event:
+        print(f"Review of PR #{pipeline.pr_number} came before the pipeline suspended, delivering it")
+        _deliver_review(pipeline, event.state, event.body)
+
+
+async def arun_agent_job(repo_full_name: str, issue_number: int, feedback: str = ""):
+    """`run_agent_job` for the asyncio job runner: many of these share one event loop."""
+    print(f"Task started for {repo_full_name}#{issue_number}")
+
+    # Claimed under the AsyncJobRunner's name, which requeues it if the server stops mid-job
+    known = await asyncio.to_thread(pipeline_store.get, repo_full_name, issue_number)
+    pipeline = known and await asyncio.to_thread(_claim_pipeline, known, feedback, f"async-{os.getpid()}")
+    if known and pipeline is None:
+        print(f"Pipeline for {repo_full_name}#{issue_number} is {known.status}, nothing to resume")
+        return
+
+    # Building the runner opens its stores and the coder's client, keep that off the loop
+    runner = await asyncio.to_thread(PipelineRunner, repo_full_name, issue_number, pipeline_store)
+    if pipeline:
+        suspended = await runner.aresume(pipeline, feedback or pipeline.feedback)
+    else:
+        suspended = await runner.astart(feedback)
+    await asyncio.to_thread(_deliver_missed_review, suspended)
+
+
+async def _supervise(pool: Optional[WorkerPool] = None):
+    while True:
+        await asyncio.sleep(5)
+        if pool:
+            pool.reap()
+        expired = pipeline_store.expire()
+        if expired:
+            print(f"{expired} suspended pipelines timed out waiting for review")
+
 
-    local = LocalGit(repo_url)
-    local.clone()
-    local.create_branch(branch_name)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.JOB_MODE == "async":
+        runner = AsyncJobRunner(
+            job_queue,
+            arun_agent_job,
+            concurrency=settings.JOB_ASYNC_CONCURRENCY,
+            per_repo_limit=settings.JOB_PER_REPO_LIMIT,
+            on_worker_lost=pipeline_store.requeue_running,
+        )
+        runner.start()
+        supervisor = asyncio.create_task(_supervise())
+        try:
+            yield
+        finally:
+            supervisor.cancel()
+            await runner.stop()
+        return
 
-    agent = CoderAgent()
-    task_text = f"{issue.title}\n{issue.body}"
-    agent.run(task_text, feedback=feedback)
+    pool = WorkerPool(
+        job_queue,
+        run_agent_job,
+        workers=settings.JOB_WORKERS,
+        per_repo_limit=settings.JOB_PER_REPO_LIMIT,
+        on_worker_lost=pipeline_store.requeue_running,
+    )
+    pool.start()
+    supervisor = asyncio.create_task(_supervise(pool))
+    try:
+        yield
+    finally:
+        supervisor.cancel()
+        pool.stop()
 
-    local.commit_all("AI Fixes")
-    local.push(branch_name)
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.post("/webhook")
-async def github_webhook(request: Request, background_tasks: BackgroundTasks):
+async def github_webhook(request: Request):
     payload = await request.json()
     event = request.headers.get("X-GitHub-Event")
 
@@ -37,8 +156,9 @@ async def github_webhook(request: Request, background_tasks: BackgroundTasks):
         repo_name = payload["repository"]["full_name"]
         issue_num = payload["issue"]["number"]
 
-        background_tasks.add_task(run_agent_job, repo_name, issue_num)
-        return {"status": "accepted", "msg": "Agent started for new issue"}
+        job, created = job_queue.enqueue(repo_name, issue_num)
+        msg = "Agent queued for new issue" if created else "Merged into pending job"
+        return {"status": "accepted", "msg": msg, "job_id": job.id}
 
     if event == "issue_comment" and payload["action"] == "created":
         if "pull_request" in payload["issue"]:
@@ -47,7 +167,69 @@ async def github_webhook(request: Request, background_tasks: BackgroundTasks):
             comment_body = payload["comment"]["body"]
 
             if payload["sender"]["type"] != "Bot":
-                background_tasks.add_task(run_agent_job, repo_name, issue_num, feedback=comment_body)
-                return {"status": "accepted", "msg": "Agent started for feedback"}
+                # Comments on a pipeline's PR go to the pipeline's issue
+                pipeline = pipeline_store.find_by_pr(repo_name, issue_num)
+                if pipeline:
+                    issue_num = pipeline.issue_number
+                job, created = job_queue.enqueue(repo_name, issue_num, feedback=comment_body)
+                msg = "Agent queued for feedback" if created else "Feedback merged into pending job"
+                return {"status": "accepted", "msg": msg, "job_id": job.id}
+
+    if event == "pull_request_review" and payload["action"] == "submitted":
+        repo_name = payload["repository"]["full_name"]
+        pr_num = payload["pull_request"]["number"]
+        review = payload["review"]
+        # Webhook payloads spell states in lowercase, the REST API in uppercase
+        state = review["state"].upper()
+        body = review.get("body") or ""
+
+        review_bus.publish(repo_name, pr_num, state, body)
+
+        pipeline = pipeline_store.find_by_pr(repo_name, pr_num)
+        if not pipeline or pipeline.status != PipelineStatus.WAITING:
+            # A running pipeline picks the review up from the bus when it suspends
+            return {"status": "accepted", "msg": "Review recorded, no waiting pipeline"}
+
+        response = _deliver_review(pipeline, state, body)
+        return response or {"status": "accepted", "msg": "Review recorded, pipeline keeps waiting for a verdict"}
 
     return {"status": "ignored"}
+
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 100):
+    return {
+        "counts": job_queue.counts(),
+        "jobs": [job.to_dict() for job in job_queue.list(status=status, limit=limit)],
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+def collect_metrics() -> str:
+    """Totals recorded by all workers plus the current state of the queue and the GitHub quota."""
+    samples = get_metrics_store().samples() if settings.METRICS else []
+    samples += [("agent_jobs", {"status": s}, n) for s, n in job_queue.counts().items()]
+    samples += [("agent_suspended_pipelines", {"status": s}, n) for s, n in pipeline_store.counts().items()]
+    try:
+        remaining, limit, reset = get_github_client().rate_limit_status()
+        samples += [
+            ("agent_github_rate_limit_remaining", {}, remaining),
+            ("agent_github_rate_limit", {}, limit),
+            ("agent_github_rate_limit_reset_timestamp_seconds", {}, reset),
+        ]
+    except (GithubException, OSError) as e:
+        print(f"Could not read the GitHub rate limit: {e}")
+    return render(samples)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    text = await asyncio.to_thread(collect_metrics)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,349 @@
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: int
+    key: str
+    repo_name: str
+    issue_number: int
+    feedback: str
+    status: str
+    attempts: int
+    worker: Optional[str]
+    error: Optional[str]
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def job_key(repo_name: str, issue_number: int) -> str:
+    return f"{repo_name}#{issue_number}"
+
+
+class JobQueue:
+    """
+    Durable FIFO of agent jobs stored in SQLite.
+
+    A `repo#issue` key has at most one pending job: new events for the same key
+    are merged into it. A pending job is never claimed while another job with
+    the same key is running, so one issue is never worked on twice at once.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL,
+                    repo_name TEXT NOT NULL,
+                    issue_number INTEGER NOT NULL,
+                    feedback TEXT NOT NULL DEFAULT '',
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_key_idx ON jobs (key, status)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Job:
+        return Job(**dict(row))
+
+    def enqueue(self, repo_name: str, issue_number: int, feedback: str = "") -> Tuple[Job, bool]:
+        """Returns the job and whether a new one was created (False means merged)."""
+        key = job_key(repo_name, issue_number)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE key = ? AND status = ? ORDER BY id LIMIT 1",
+                (key, JobStatus.PENDING),
+            ).fetchone()
+
+            if row:
+                merged = row["feedback"]
+                if feedback and feedback not in merged:
+                    merged = f"{merged}\n\n{feedback}" if merged else feedback
+                conn.execute("UPDATE jobs SET feedback = ? WHERE id = ?", (merged, row["id"]))
+                job_id, created = row["id"], False
+            else:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (key, repo_name, issue_number, feedback, status, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, repo_name, issue_number, feedback, JobStatus.PENDING, time.time()),
+                )
+                job_id, created = cursor.lastrowid, True
+
+            conn.execute("COMMIT")
+            return self.get(job_id), created
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def claim(self, worker: str, per_repo_limit: int = 1) -> Optional[Job]:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            running = conn.execute(
+                "SELECT key, repo_name FROM jobs WHERE status = ?", (JobStatus.RUNNING,)
+            ).fetchall()
+            busy_keys = {r["key"] for r in running}
+            repo_load = {}
+            for r in running:
+                repo_load[r["repo_name"]] = repo_load.get(r["repo_name"], 0) + 1
+
+            candidates = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id", (JobStatus.PENDING,)
+            )
+            chosen = None
+            for row in candidates:
+                if row["key"] in busy_keys:
+                    continue
+                if per_repo_limit > 0 and repo_load.get(row["repo_name"], 0) >= per_repo_limit:
+                    continue
+                chosen = row
+                break
+
+            if chosen is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (JobStatus.RUNNING, worker, time.time(), chosen["id"]),
+            )
+            conn.execute("COMMIT")
+            return self.get(chosen["id"])
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def complete(self, job_id: int, error: Optional[str] = None):
+        status = JobStatus.FAILED if error else JobStatus.DONE
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+
+    def requeue_running(self, worker: Optional[str] = None, max_attempts: int = 3) -> int:
+        """
+        Puts jobs left `running` by a dead worker (or by all workers) back into the queue.
+        Jobs that already crashed a worker `max_attempts` times are failed instead.
+        """
+        where = "status = ?"
+        params = [JobStatus.RUNNING]
+        if worker is not None:
+            where += " AND worker = ?"
+            params.append(worker)
+
+        with closing(self._connect()) as conn:
+            conn.execute(
+                f"UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE {where} AND attempts >= ?",
+                [JobStatus.FAILED, "Worker died too many times", time.time(), *params, max_attempts],
+            )
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = ?, worker = NULL WHERE {where}",
+                [JobStatus.PENDING, *params],
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        with closing(self._connect()) as conn:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def counts(self) -> dict:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {s: 0 for s in (JobStatus.PENDING, JobStatus.RUNNING, JobStatus.DONE, JobStatus.FAILED)}
+        counts.update({r["status"]: r["n"] for r in rows})
+        return counts
+
+
+def _worker_loop(db_path: str, handler: Callable, per_repo_limit: int, poll_interval: float):
+    queue = JobQueue(db_path)
+    worker = f"worker-{os.getpid()}"
+
+    while True:
+        job = queue.claim(worker, per_repo_limit)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            handler(job.repo_name, job.issue_number, feedback=job.feedback)
+            queue.complete(job.id)
+        except Exception as e:
+            queue.complete(job.id, error=f"{type(e).__name__}: {e}"[:2000])
+
+
+class WorkerPool:
+    """
+    Fixed set of worker processes draining a JobQueue.
+
+    `handler(repo_name, issue_number, feedback=...)` must be importable at module
+    level so it can be sent to the child processes. `on_worker_lost(worker)` is
+    called whenever the jobs of a worker (None: of all workers) are requeued,
+    to release whatever else the worker held.
+    """
+
+    def __init__(self, queue: JobQueue, handler: Callable, workers: int = 2,
+                 per_repo_limit: int = 1, poll_interval: float = 0.5,
+                 on_worker_lost: Optional[Callable[[Optional[str]], Any]] = None):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.per_repo_limit = per_repo_limit
+        self.poll_interval = poll_interval
+        self.on_worker_lost = on_worker_lost
+        self.processes: List[multiprocessing.Process] = []
+
+    def _requeue(self, worker: Optional[str] = None):
+        self.queue.requeue_running(worker)
+        if self.on_worker_lost:
+            self.on_worker_lost(worker)
+
+    def start(self):
+        # Nothing can be running before the pool starts, leftovers come from a previous crash.
+        self._requeue()
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self):
+        process = multiprocessing.Process(
+            target=_worker_loop,
+            args=(self.queue.db_path, self.handler, self.per_repo_limit, self.poll_interval),
+            daemon=True,
+        )
+        process.start()
+        self.processes.append(process)
+
+    def reap(self):
+        """Restarts dead workers and returns their claimed jobs to the queue."""
+        alive = []
+        for process in self.processes:
+            if process.is_alive():
+                alive.append(process)
+            else:
+                self._requeue(f"worker-{process.pid}")
+        missing = self.workers - len(alive)
+        self.processes = alive
+        for _ in range(missing):
+            self._spawn()
+
+    def stop(self, timeout: float = 5.0):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(timeout)
+            self._requeue(f"worker-{process.pid}")
+        self.processes = []
+
+
+class AsyncJobRunner:
+    """
+    Drains a JobQueue with asyncio tasks in the server's own event loop, up to
+    `concurrency` jobs at a time. `handler(repo_name, issue_number, feedback=...)`
+    is a coroutine function; jobs interleave on awaits instead of each holding
+    a process or a thread. `on_worker_lost` works as in WorkerPool.
+    """
+
+    def __init__(self, queue: JobQueue, handler: Callable[..., Awaitable], concurrency: int = 32,
+                 per_repo_limit: int = 1, poll_interval: float = 0.5,
+                 on_worker_lost: Optional[Callable[[Optional[str]], Any]] = None):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.per_repo_limit = per_repo_limit
+        self.poll_interval = poll_interval
+        self.on_worker_lost = on_worker_lost
+        self.worker = f"async-{os.getpid()}"
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def _requeue(self, worker: Optional[str] = None):
+        self.queue.requeue_running(worker)
+        if self.on_worker_lost:
+            self.on_worker_lost(worker)
+
+    def start(self):
+        self._requeue()
+        self._loop_task = asyncio.create_task(self._claim_loop())
+
+    async def _run(self, job: Job):
+        try:
+            await self.handler(job.repo_name, job.issue_number, feedback=job.feedback)
+            await asyncio.to_thread(self.queue.complete, job.id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await asyncio.to_thread(self.queue.complete, job.id, f"{type(e).__name__}: {e}"[:2000])
+        finally:
+            self.tasks.pop(job.id, None)
+
+    async def _claim_loop(self):
+        while True:
+            if len(self.tasks) >= self.concurrency:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            job = await asyncio.to_thread(self.queue.claim, self.worker, self.per_repo_limit)
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            self.tasks[job.id] = asyncio.create_task(self._run(job))
+
+    async def stop(self):
+        tasks = [t for t in (self._loop_task, *self.tasks.values()) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks.clear()
+        # Interrupted jobs go back to the queue for the next start
+        self._requeue(self.worker)
@@ -1,6 +1,10 @@
+import os
+from typing import List
+
 from src.tools.filesystem_tool import list_files
-from src.tools.analysis_tool import get_file_structure, read_file
-from src.tools.edit_tool import replace_code_block, create_file
+from src.tools.analysis_tool import get_file_structure, find_symbol, read_file
+from src.tools.search_tool import search_code
+from src.tools.edit_tool import apply_edits, replace_code_block, create_file, edited_paths
 from src.tools.test_tool import run_tests
 from src.tools.end_tool import end_tool
 from src.tools.docker_tool import collect_docker_containers, collect_docker_images, collect_docker_info
@@ -8,12 +12,49 @@ from src.tools.docker_tool import collect_docker_containers, collect_docker_imag
 TOOLS = [
     list_files,
     get_file_structure,
+    find_symbol,
+    search_code,
     read_file,
-    replace_code_block,
+    apply_edits,
     create_file,
     run_tests,
     end_tool,
     collect_docker_containers,
     collect_docker_images,
     collect_docker_info,
-]
\ No newline at end of file
+]
+
+# Tools that never change the workspace, ToolExecutorNode runs them concurrently
+READ_ONLY_TOOLS = {
+    "list_files",
+    "get_file_structure",
+    "find_symbol",
+    "search_code",
+    "read_file",
+    "end_tool",
+    "collect_docker_containers",
+    "collect_docker_images",
+    "collect_docker_info",
+}
+
+# Tools that only change the file in their `filepath` argument
+FILE_WRITE_TOOLS = {
+    "replace_code_block",
+    "create_file",
+}
+
+# Tools that change several files, listed in their arguments
+MULTI_FILE_WRITE_TOOLS = {
+    "apply_edits": edited_paths,
+}
+
+
+def written_paths(tool_name: str, tool_args) -> List[str]:
+    """Normalized paths a write tool call changes, empty for other tools."""
+    if not isinstance(tool_args, dict):
+        return []
+    if tool_name in MULTI_FILE_WRITE_TOOLS:
+        return MULTI_FILE_WRITE_TOOLS[tool_name](tool_args)
+    if tool_name in FILE_WRITE_TOOLS and tool_args.get("filepath"):
+        return [os.path.normpath(tool_args["filepath"])]
+    return []
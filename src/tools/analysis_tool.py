@@ -4,6 +4,8 @@ from langchain_core.tools import tool
 
 
 from src.core.syntax_analyzer import SyntaxAnalyzer
+from src.core.symbol_index import SymbolIndex
+from src.core.file_reader import is_binary, read_lines
 from src.core.context import get_current_work_dir
 
 
@@ -25,6 +27,10 @@ def get_file_structure(filepath: str):
         return f"Error: File {filepath} does not exist."
 
     try:
+        entry = SymbolIndex.for_workspace(base_path).get(os.path.relpath(full_path, base_path))
+        if entry is not None and entry.definitions:
+            return SyntaxAnalyzer.render_backbone(filepath, entry.language, entry.definitions, entry.total_lines)
+
         with open(full_path, "r", encoding="utf-8") as f:
             content = f.read()
         return SyntaxAnalyzer.get_backbone(content, filepath)
@@ -34,6 +40,33 @@ def get_file_structure(filepath: str):
         return f"Error analyzing file: {e}"
 
 
+@tool
+def find_symbol(name: str):
+    """
+    Finds where a class, function, method or type is defined anywhere in the repository.
+    Returns file paths, line ranges and signatures without reading any file.
+
+    Use this instead of `list_files` + `get_file_structure` when you already know the name.
+    Accepts plain names ("run") or qualified ones ("PipelineRunner.run"); partial names also match.
+
+    Args:
+        name: Symbol name to look up.
+    """
+    try:
+        index = SymbolIndex.for_workspace(get_current_work_dir())
+        matches = index.find(name)
+    except Exception as e:
+        return f"Error searching symbols: {e}"
+
+    if not matches:
+        return f"No definitions matching '{name}' found."
+
+    return "\n".join(
+        f"{path}:L{d.start_line}-L{d.end_line} {d.kind} {d.qualified_name}: {d.signature.strip()}"
+        for path, d in matches
+    )
+
+
 @tool
 def read_file(filepath: str, start_line: int = 1, end_line: int = -1):
     """
@@ -47,6 +80,9 @@ def read_file(filepath: str, start_line: int = 1, end_line: int = -1):
     Example: If a function starts at line 50 and ends at line 75, call this as:
     `read_file(filepath="src/logic.py", start_line=50, end_line=75)`
 
+    At most 500 lines (about 48KB) are returned per call. If the range is cut, the output ends
+    with the `start_line` to use in the next call.
+
     Args:
         filepath: Relative path to the file.
         start_line: (Optional) The line number to start reading from (1-based).
@@ -59,20 +95,18 @@ def read_file(filepath: str, start_line: int = 1, end_line: int = -1):
         return f"Error: File {filepath} does not exist."
 
     try:
-        with open(full_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        total_lines = len(lines)
-        start_idx = max(0, start_line - 1)
-
-        if end_line == -1:
-            end_idx = total_lines
-        else:
-            end_idx = min(end_line, total_lines)
-
-        content = "".join(lines[start_idx:end_idx])
-
-        return f"--- {filepath} (Lines {start_idx + 1}-{end_idx} of {total_lines}) ---\n{content}"
+        if is_binary(str(full_path)):
+            return f"Error: {filepath} is a binary file. Cannot read it as text."
+
+        chunk = read_lines(str(full_path), start_line, end_line)
+        result = f"--- {filepath} (Lines {chunk.start_line}-{chunk.end_line} of {chunk.total_lines}) ---\n{chunk.content}"
+
+        if chunk.truncated:
+            result += (
+                f"\n[Output limit reached. Continue with "
+                f"read_file(filepath=\"{filepath}\", start_line={chunk.next_line}, end_line={end_line})]"
+            )
+        return result
 
     except Exception as e:
         return f"Error reading file: {e}"
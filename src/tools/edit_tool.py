@@ -1,43 +1,294 @@
 import os
+import re
+import stat
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from langchain_core.tools import tool
+from pydantic import BaseModel, Field
 from src.core.context import get_current_work_dir
+from src.core.symbol_index import SymbolIndex
 
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@")
 
-@tool
-def replace_code_block(filepath: str, old_code: str, new_code: str):
+
+class FileEdit(BaseModel):
+    filepath: str = Field(description="path to file")
+    old_code: str = Field(description="EXACT code to replace (copy-paste from read_file), must occur once in the file")
+    new_code: str = Field(description="the new code to insert")
+
+
+@dataclass
+class _Edit:
+    filepath: str
+    old: str
+    new: str
+    label: str
+    create: bool = False
+
+
+def _normalize(text: str) -> str:
+    return text.replace("\r\n", "\n")
+
+
+def _clean_path(path: str) -> str:
+    path = path.strip().split("\t")[0]
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+
+def parse_unified_diff(diff: str) -> Tuple[List[_Edit], List[str]]:
     """
-    Replace a specific block of code in a file.
-    Args:
-        filepath: path to file
-        old_code: EXACT code block to be replaced (copy-paste from read_file)
-        new_code: The new code to insert
+    Turns unified-diff hunks into edits: context and `-` lines are the old code,
+    context and `+` lines the new one. Hunks are located by content, line
+    numbers in `@@` headers are ignored. `--- /dev/null` creates a file.
     """
+    edits: List[_Edit] = []
+    errors: List[str] = []
+    lines = _normalize(diff).split("\n")
+    source = target = None
+    hunk_count = 0
+    i = 0
 
-    base_path = Path(get_current_work_dir())
-    full_path = (base_path / filepath).resolve()
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            source, target = line[4:].strip(), lines[i + 1][4:].strip()
+            hunk_count = 0
+            i += 2
+            continue
+        if not HUNK_HEADER.match(line):
+            i += 1
+            continue
 
-    old_code = old_code.replace("\r\n", "\n")
+        i += 1
+        hunk_count += 1
+        old_lines, new_lines = [], []
+        while i < len(lines) and not HUNK_HEADER.match(lines[i]):
+            body = lines[i]
+            if body.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+                break
+            if body.startswith("-"):
+                old_lines.append(body[1:])
+            elif body.startswith("+"):
+                new_lines.append(body[1:])
+            elif body.startswith(" ") or body == "":
+                # Models often drop the leading space of empty context lines
+                old_lines.append(body[1:])
+                new_lines.append(body[1:])
+            elif not body.startswith("\\"):
+                break
+            i += 1
 
-    if not os.path.exists(full_path):
-        return "Error: File not found."
+        # The split leaves an empty context line for the diff's final newline
+        while old_lines and new_lines and old_lines[-1] == "" and new_lines[-1] == "":
+            old_lines.pop()
+            new_lines.pop()
 
-    with open(full_path, "r", encoding="utf-8") as f:
-        content = f.read()
+        if target is None:
+            errors.append(f"hunk {hunk_count}: no '--- a/path' / '+++ b/path' header before it")
+            continue
+        if target == "/dev/null":
+            errors.append(f"{_clean_path(source)}: deleting files is not supported")
+            continue
 
-    content = content.replace("\r\n", "\n")
-    old_code = old_code.replace("\r\n", "\n")
-    new_code = new_code.replace("\r\n", "\n")
+        path = _clean_path(target)
+        label = f"hunk {hunk_count} of {path}"
+        old = "\n".join(old_lines) + "\n" if old_lines else ""
+        new = "\n".join(new_lines) + "\n" if new_lines else ""
+        edits.append(_Edit(path, old, new, label, create=source == "/dev/null"))
 
-    if old_code not in content:
-        return "Error: Could not find the exact 'old_code' block in the file. Please ensure exact match."
+    if not edits and not errors:
+        errors.append("diff: no hunks found")
+    return edits, errors
 
-    new_content = content.replace(old_code, new_code, 1)
 
-    with open(full_path, "w", encoding="utf-8") as f:
-        f.write(new_content)
+def _find_all(content: str, needle: str) -> List[int]:
+    positions = []
+    start = content.find(needle)
+    while start != -1:
+        positions.append(start)
+        start = content.find(needle, start + 1)
+    return positions
+
+
+def _line_of(content: str, position: int) -> int:
+    return content.count("\n", 0, position) + 1
+
+
+def _locate(content: str, edit: _Edit) -> Tuple[Optional[Tuple[int, int, str]], Optional[str]]:
+    """Returns ((start, end, new), None) for a unique match, else (None, error)."""
+    old, new = edit.old, edit.new
+    positions = _find_all(content, old)
+    if not positions and old.endswith("\n") and content.endswith(old[:-1]):
+        # Hunk at the end of a file without a trailing newline
+        old, new = old[:-1], new[:-1] if new.endswith("\n") else new
+        positions = _find_all(content, old)
+
+    if len(positions) == 1:
+        return (positions[0], positions[0] + len(old), new), None
+    if positions:
+        lines = ", ".join(str(_line_of(content, p)) for p in positions[:10])
+        return None, (f"{edit.label}: old code matches {len(positions)} places (lines {lines}), "
+                      f"include more surrounding lines to make it unique")
+
+    first = old.strip().split("\n")[0].strip()
+    hint = ""
+    if first:
+        candidates = [n for n, line in enumerate(content.split("\n"), 1) if line.strip() == first]
+        if candidates:
+            hint = f" Its first line appears at line(s) {', '.join(map(str, candidates[:5]))}, re-read the file " \
+                   f"and copy the block exactly (indentation, blank lines)."
+    return None, f"{edit.label}: old code not found in {edit.filepath}.{hint}"
+
+
+def _plan_file(content: str, edits: List[_Edit]) -> Tuple[Optional[str], List[str]]:
+    """Applies all edits of a file to its content in memory, or returns why they can't be."""
+    errors, spans = [], []
+    for edit in edits:
+        if not edit.old:
+            errors.append(f"{edit.label}: old code is empty, use create_file for new files")
+            continue
+        span, error = _locate(content, edit)
+        if error:
+            errors.append(error)
+        else:
+            spans.append((*span, edit.label))
+
+    # All edits are located in the original content, so they must not overlap
+    spans.sort()
+    for previous, current in zip(spans, spans[1:]):
+        if current[0] < previous[1]:
+            errors.append(f"{current[3]}: overlaps with {previous[3]}, merge them into one edit")
+    if errors:
+        return None, errors
+
+    parts, position = [], 0
+    for start, end, new, _ in spans:
+        parts.append(content[position:start])
+        parts.append(new)
+        position = end
+    parts.append(content[position:])
+    return "".join(parts), []
+
 
-    return f"Successfully updated {filepath}"
+def _write_atomic(full_path: Path, text: str):
+    """Writes through a temp file in the same directory and renames it over the target."""
+    fd, tmp_path = tempfile.mkstemp(dir=full_path.parent, prefix=f".{full_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        if full_path.exists():
+            os.chmod(tmp_path, stat.S_IMODE(full_path.stat().st_mode))
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _apply(edits: List[_Edit], errors: List[str]) -> str:
+    """
+    Applies the edits file by file: every file is read once, all of its edits
+    are applied in memory and the result is written once. If anything fails,
+    nothing is written and all failures are reported together.
+    """
+    base_path = Path(get_current_work_dir()).resolve()
+    by_file: Dict[str, List[_Edit]] = {}
+    for edit in edits:
+        by_file.setdefault(os.path.normpath(edit.filepath), []).append(edit)
+
+    results: Dict[str, Tuple[Path, str]] = {}
+    for filepath, file_edits in by_file.items():
+        full_path = (base_path / filepath).resolve()
+        if not full_path.is_relative_to(base_path):
+            errors.append(f"{filepath}: path is outside the workspace")
+            continue
+
+        if any(edit.create for edit in file_edits):
+            if full_path.exists():
+                errors.append(f"{filepath}: diff creates the file, but it already exists")
+            elif len(file_edits) > 1:
+                errors.append(f"{filepath}: a new file must come as a single hunk")
+            else:
+                results[filepath] = (full_path, file_edits[0].new)
+            continue
+
+        if not full_path.is_file():
+            errors.append(f"{filepath}: file not found")
+            continue
+        with open(full_path, "r", encoding="utf-8", newline="") as f:
+            raw = f.read()
+        new_content, file_errors = _plan_file(_normalize(raw), file_edits)
+        if file_errors:
+            errors.extend(file_errors)
+            continue
+        # Keep the file's line endings
+        if "\r\n" in raw:
+            new_content = new_content.replace("\n", "\r\n")
+        results[filepath] = (full_path, new_content)
+
+    if errors:
+        return f"Error: no changes were made, {len(errors)} problem(s):\n" + "\n".join(f"- {e}" for e in errors)
+
+    for filepath, (full_path, content) in results.items():
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(full_path, content)
+        SymbolIndex.notify_changed(base_path, filepath)
+
+    counts = ", ".join(f"{filepath} ({len(by_file[filepath])})" for filepath in results)
+    return f"Successfully applied {len(edits)} edit(s) to {len(results)} file(s): {counts}"
+
+
+def edited_paths(args: dict) -> List[str]:
+    """Files an `apply_edits` call writes, for callers tracking stale reads."""
+    paths = [e.get("filepath", "") if isinstance(e, dict) else e.filepath for e in args.get("edits") or []]
+    if args.get("diff"):
+        paths += [edit.filepath for edit in parse_unified_diff(args["diff"])[0]]
+    return list(dict.fromkeys(os.path.normpath(p) for p in paths if p))
+
+
+@tool
+def apply_edits(edits: Optional[List[FileEdit]] = None, diff: str = "") -> str:
+    """
+    Apply many code edits at once, across one or more files.
+    Prefer one call with all the edits of a change over many separate calls.
+    Args:
+        edits: list of {filepath, old_code, new_code}; every old_code must match EXACTLY ONE place in the
+            file as it is before this call (copy-paste from read_file)
+        diff: alternatively, a unified diff (`--- a/path`, `+++ b/path`, `@@` hunks with context lines);
+            hunks are located by their content, line numbers are ignored
+    All edits are checked first: if any is not found, ambiguous or overlapping, no file is changed
+    and every problem is reported.
+    """
+    all_edits: List[_Edit] = []
+    errors: List[str] = []
+    for number, edit in enumerate(edits or [], 1):
+        all_edits.append(_Edit(edit.filepath, _normalize(edit.old_code), _normalize(edit.new_code),
+                               f"edit {number} ({edit.filepath})"))
+    if diff:
+        diff_edits, diff_errors = parse_unified_diff(diff)
+        all_edits.extend(diff_edits)
+        errors.extend(diff_errors)
+
+    if not all_edits and not errors:
+        return "Error: pass `edits` or `diff`."
+    return _apply(all_edits, errors)
+
+
+@tool
+def replace_code_block(filepath: str, old_code: str, new_code: str):
+    """
+    Replace a specific block of code in a file.
+    Args:
+        filepath: path to file
+        old_code: EXACT code block to be replaced (copy-paste from read_file)
+        new_code: The new code to insert
+    """
+    edit = _Edit(filepath, _normalize(old_code), _normalize(new_code), f"old_code ({filepath})")
+    return _apply([edit], [])
 
 
 @tool
@@ -50,11 +301,12 @@ def create_file(filepath: str, content: str) -> str:
     full_path = (base_path / filepath).resolve()
 
     if os.path.exists(full_path):
-        return f"Error: File {filepath} already exists. Use replace_code_block instead."
+        return f"Error: File {filepath} already exists. Use apply_edits instead."
 
     os.makedirs(os.path.dirname(full_path), exist_ok=True)
 
     with open(full_path, "w", encoding="utf-8") as f:
         f.write(content)
+    SymbolIndex.notify_changed(base_path, filepath)
 
     return f"Successfully created file {filepath}"
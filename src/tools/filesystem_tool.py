@@ -1,37 +1,23 @@
-import os
-import pathspec
+from itertools import islice
 from pathlib import Path
 from langchain_core.tools import tool
 from src.core.context import get_current_work_dir
+from src.core.ignore import IgnoreManager
 
 
-
-class IgnoreManager:
-    def __init__(self, root_dir: str):
-        self.root_dir = root_dir
-        self.spec = self._load_ignore_spec()
-
-    def _load_ignore_spec(self):
-        ignores_patterns = ["__pycache__", "venv", ".git", ".gitignore"]
-        coderignore_path = os.path.join(self.root_dir, ".coderignore")
-        if os.path.exists(coderignore_path):
-            with open(coderignore_path, "r") as f:
-                ignores_patterns.extend(f.readlines())
-        return pathspec.PathSpec.from_lines("gitwildmatch", ignores_patterns)
-
-    def is_ignored(self, filepath: str) -> bool:
-        rel_path = os.path.relpath(filepath, self.root_dir)
-        return self.spec.match_file(rel_path)
-
 @tool
-def list_files(directory: str = "./"):
+def list_files(directory: str = "./", pattern: str = "", max_depth: int = -1, offset: int = 0, limit: int = 1000):
     """
-    List all files in the repository, respecting .coderignore.
+    List all files in the repository, respecting .coderignore and .gitignore.
     Use this to understand the project structure.
     To understand the file structure, use `get_file_structure`.
 
     Args:
         directory: path to the root directory
+        pattern: (Optional) glob filter, e.g. "*.py" (file name) or "src/**/test_*.py" (path)
+        max_depth: (Optional) how many directory levels to descend, 1 = only `directory` itself. -1 = unlimited
+        offset: (Optional) skip this many files, use it to get the next page
+        limit: (Optional) maximum number of files to return
     """
 
     try:
@@ -47,15 +33,19 @@ def list_files(directory: str = "./"):
     if not target_dir.exists():
         return f"Error: Directory '{directory}' does not exist."
 
-    manager = IgnoreManager(root)
-    results = []
-
-    for dirpath, _, filenames in os.walk(target_dir):
-        if manager.is_ignored(dirpath):
-            continue
-        for filename in filenames:
-            full_path = os.path.join(dirpath, filename)
-            if not manager.is_ignored(full_path):
-                results.append(os.path.relpath(full_path, root))
-    return "\n".join(results[:1000])
-
+    manager = IgnoreManager.for_workspace(root)
+    files = manager.walk(
+        str(target_dir),
+        max_depth=max_depth if max_depth > 0 else None,
+        pattern=pattern or None,
+    )
+
+    # Read one entry past the page to know whether there is more, then stop walking
+    page = list(islice(files, offset, offset + limit + 1))
+    results = page[:limit]
+
+    if len(page) > limit:
+        results.append(f"... more files available, call list_files with offset={offset + limit}")
+    elif not results:
+        return "No files found."
+    return "\n".join(results)
@@ -0,0 +1,77 @@
+import re
+from langchain_core.tools import tool
+from src.core.code_search import search
+from src.core.config import settings
+from src.core.context import get_current_work_dir
+
+MAX_LINE_CHARS = 300
+
+
+def _line(text: str) -> str:
+    text = text.rstrip()
+    return text if len(text) <= MAX_LINE_CHARS else text[:MAX_LINE_CHARS] + " ..."
+
+
+@tool
+def search_code(query: str, regex: bool = False, case_sensitive: bool = True, path_glob: str = "",
+                context_lines: int = 2, max_results: int = 50):
+    """
+    Searches the contents of all files in the repository (respecting .coderignore and .gitignore),
+    like `grep -rn`. Use it to find where an identifier, string or error message is used,
+    instead of opening files one by one.
+
+    Output: `path` headers, then `line:text` for matches and `line-text` for context lines.
+
+    Args:
+        query: text to find (literal by default)
+        regex: (Optional) treat `query` as a Python regular expression
+        case_sensitive: (Optional) False to ignore case
+        path_glob: (Optional) only search matching files, e.g. "*.py" (file name) or "src/**/*.py" (path)
+        context_lines: (Optional) lines shown before and after each match
+        max_results: (Optional) maximum number of matching lines
+    """
+    if not query:
+        return "Error: empty query."
+    try:
+        result = search(
+            get_current_work_dir(),
+            query,
+            regex=regex,
+            case_sensitive=case_sensitive,
+            path_glob=path_glob,
+            context=max(0, min(context_lines, 10)),
+            max_results=max(1, min(max_results, 200)),
+            use_index=settings.CODE_SEARCH_INDEX,
+        )
+    except re.error as e:
+        return f"Error: invalid regex: {e}"
+    except Exception as e:
+        return f"Error searching code: {e}"
+
+    if not result.matches:
+        return f"No matches for '{query}' in {result.files_searched} files."
+
+    # Line -> (text, is_match) per file, overlapping context of nearby matches merges
+    blocks = {}
+    for match in result.matches:
+        lines = blocks.setdefault(match.path, {})
+        for number, text in match.before + match.after:
+            lines.setdefault(number, (text, False))
+        lines[match.line] = (match.text, True)
+
+    output = []
+    for path, lines in blocks.items():
+        output.append(path)
+        previous = None
+        for number in sorted(lines):
+            if previous is not None and number > previous + 1:
+                output.append("--")
+            text, is_match = lines[number]
+            output.append(f"{number}{':' if is_match else '-'}{_line(text)}")
+            previous = number
+        output.append("")
+
+    summary = f"{len(result.matches)} matches in {len(blocks)} files"
+    if result.truncated:
+        summary += " (more exist: narrow the query or path_glob, or raise max_results)"
+    return "\n".join(output) + f"\n{summary}"
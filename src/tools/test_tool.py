@@ -1,16 +1,147 @@
-import subprocess
+import importlib.util
 import os
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import List, Optional
 from langchain_core.tools import tool
+from src.core.config import settings
 from src.core.context import get_current_work_dir
+from src.core.test_impact import all_tests, changed_files, impacted_tests, third_party_imports
+from src.core.warm_runner import WarmRunner, warm_supported
 from pathlib import Path
 
+MAX_FAILURES_SHOWN = 10
+XDIST_MIN_FILES = 4
+# Cold runs use the interpreter the warm worker is started with, so both modes test
+# against the same environment. -P keeps the working directory off sys.path, like
+# the `pytest` script and the warm worker.
+PYTEST_COMMAND = [sys.executable, "-P", "-m", "pytest"]
+
+
+@dataclass
+class TestCaseResult:
+    nodeid: str
+    outcome: str
+    duration: float
+    message: str = ""
+
+
+@dataclass
+class TestRunResult:
+    returncode: int
+    cases: List[TestCaseResult]
+    duration: float
+    output: str
+    timed_out: bool = False
+
+    def count(self, outcome: str) -> int:
+        return sum(1 for case in self.cases if case.outcome == outcome)
+
+    @property
+    def passed(self) -> bool:
+        # 5 = nothing collected, which is not a failure of the change
+        return not self.timed_out and self.returncode in (0, 5)
+
+
+def parse_junit(path: str) -> List[TestCaseResult]:
+    try:
+        tree = ET.parse(path)
+    except (ET.ParseError, OSError):
+        return []
+
+    cases = []
+    for case in tree.iter("testcase"):
+        classname = case.get("classname", "")
+        nodeid = f"{classname}::{case.get('name')}" if classname else case.get("name", "")
+        outcome, message = "passed", ""
+        for child in case:
+            if child.tag in ("failure", "error"):
+                outcome = "failed" if child.tag == "failure" else "error"
+                message = (child.get("message") or "") + "\n" + (child.text or "")
+                break
+            if child.tag == "skipped":
+                outcome = "skipped"
+                message = child.get("message") or ""
+        cases.append(TestCaseResult(nodeid, outcome, float(case.get("time") or 0), message.strip()))
+    return cases
+
+
+def run_pytest(root: Path, targets: List[str], timeout: int) -> TestRunResult:
+    with tempfile.TemporaryDirectory() as tmp:
+        report = os.path.join(tmp, "report.xml")
+        args = ["-q", "-p", "no:cacheprovider", f"--junitxml={report}", *targets]
+        # PYTEST_COMMAND runs this interpreter, so this checks the environment the tests run in
+        if len(targets) >= XDIST_MIN_FILES and importlib.util.find_spec("xdist"):
+            args[0:0] = ["-n", "auto"]
+
+        started = time.perf_counter()
+        # xdist starts its own interpreters, so a warm parent buys nothing there
+        if settings.TEST_RUNNER_MODE == "warm" and warm_supported() and "-n" not in args:
+            runner = WarmRunner.for_workspace(str(root), third_party_imports(str(root)))
+            warm = runner.run(args, timeout)
+            if warm is not None:
+                returncode, output, timed_out = warm
+                return TestRunResult(returncode, parse_junit(report), time.perf_counter() - started,
+                                     output, timed_out=timed_out)
+
+        try:
+            result = subprocess.run([*PYTEST_COMMAND, *args], cwd=str(root), capture_output=True, text=True,
+                                    timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            output = (e.stdout or "") if isinstance(e.stdout, str) else (e.stdout or b"").decode(errors="replace")
+            return TestRunResult(-1, parse_junit(report), time.perf_counter() - started, output, timed_out=True)
+
+        return TestRunResult(
+            result.returncode,
+            parse_junit(report),
+            time.perf_counter() - started,
+            result.stdout + "\n" + result.stderr,
+        )
+
+
+def format_run(title: str, run: TestRunResult, selection: str = "") -> str:
+    lines = [
+        f"{title}: {run.count('passed')} passed, {run.count('failed')} failed, {run.count('error')} errors, "
+        f"{run.count('skipped')} skipped in {run.duration:.1f}s"
+    ]
+    if selection:
+        lines.append(selection)
+    if run.timed_out:
+        lines.append("Timed out before the run finished. Narrow `test_path` or raise `timeout`.")
+
+    failures = [case for case in run.cases if case.outcome in ("failed", "error")]
+    for case in failures[:MAX_FAILURES_SHOWN]:
+        lines.append(f"\nFAILED {case.nodeid} ({case.duration:.2f}s)\n{case.message[:800]}")
+    if len(failures) > MAX_FAILURES_SHOWN:
+        lines.append(f"\n... and {len(failures) - MAX_FAILURES_SHOWN} more failures")
+
+    if not run.cases and not run.passed:
+        # Collection or import errors never reach the junit report
+        lines.append(run.output[-1500:])
+
+    slowest = sorted(run.cases, key=lambda case: case.duration, reverse=True)[:5]
+    if slowest and slowest[0].duration >= 1:
+        lines.append("\nSlowest: " + ", ".join(f"{c.nodeid} {c.duration:.1f}s" for c in slowest))
+    return "\n".join(lines)
+
 
 @tool
-def run_tests(test_path: str = "."):
+def run_tests(test_path: str = "", mode: str = "impact", timeout: int = 300):
     """
     Run pytest to verify changes.
+
+    By default only the tests affected by your changes (test files that import changed modules,
+    directly or indirectly) are run; when no test imports them, or a non-Python file changed, the
+    full suite runs. Results list each failing test with its error and duration.
+
     Args:
-        test_path: Path to a specific test file or directory (default is root).
+        test_path: (Optional) Path to a specific test file or directory. Overrides `mode`.
+        mode: "impact" (default) runs tests affected by the changed files, "all" runs them first and then the rest.
+        timeout: (Optional) Seconds before the run is aborted.
     """
 
     try:
@@ -23,26 +154,43 @@ def run_tests(test_path: str = "."):
 
     has_tests_dir = (root / "tests").exists()
 
-
-
     if not (has_pytest_config or has_tests_dir):
         return "Info: No tests detected in this repository. You MUST skip this step. Run end_tool."
 
     try:
-        result = subprocess.run(
-            ["pytest", test_path],
-            cwd=str(root),
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
+        if test_path:
+            run = run_pytest(root, [test_path], timeout)
+            return _report(run)
 
-        output = result.stdout + "\n" + result.stderr
+        changed = changed_files(str(root))
+        impacted: Optional[List[str]] = impacted_tests(str(root), changed) if changed else None
 
-        if result.returncode == 0:
-            return f"Tests Passed:\n{output[-500:]}"
-        else:
-            return f"Tests Failed:\n{output[-1000:]}\n\nHint: Analyze the failure and fix the code."
+        if impacted is None:
+            return _report(run_pytest(root, ["."], timeout))
+        if not impacted:
+            # The change may still be reached through fixtures, data files or dynamic imports
+            return _report(run_pytest(root, ["."], timeout),
+                           "None of the tests import the changed files, ran the full suite.")
+
+        started = time.perf_counter()
+        first = run_pytest(root, impacted, timeout)
+        selection = f"Selected {len(impacted)} test files affected by {len(changed)} changed files."
+        if not first.passed or mode != "all":
+            return _report(first, selection)
+
+        selected = set(impacted)
+        rest = [p for p in all_tests(str(root)) if p not in selected]
+        if not rest:
+            return _report(first, selection)
+        remaining_timeout = max(int(timeout - (time.perf_counter() - started)), 1)
+        second = run_pytest(root, rest, remaining_timeout)
+        return _report(first, selection) + "\n\n" + _report(second, f"Remaining {len(rest)} test files.")
 
     except Exception as e:
         return f"Error running tests: {str(e)}"
+
+
+def _report(run: TestRunResult, selection: str = "") -> str:
+    if run.passed:
+        return format_run("Tests Passed", run, selection)
+    return format_run("Tests Failed", run, selection) + "\n\nHint: Analyze the failure and fix the code."
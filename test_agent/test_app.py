@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.server.app as app_module
+from src.core.pipeline_store import PipelineStatus, PipelineStore, SuspendedPipeline
+from src.core.review_events import ReviewBus
+from src.server.jobs import JobQueue, JobStatus
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "job_queue", JobQueue(str(tmp_path / "jobs.sqlite3")))
+    monkeypatch.setattr(app_module, "review_bus", ReviewBus(str(tmp_path / "events.sqlite3")))
+    monkeypatch.setattr(app_module, "pipeline_store", PipelineStore(str(tmp_path / "pipelines.sqlite3")))
+    # Без контекстного менеджера lifespan не запускается, воркеры не стартуют
+    return TestClient(app_module.app)
+
+
+def review_webhook(client: TestClient, pr_number: int, state: str, body: str = ""):
+    payload = {
+        "action": "submitted",
+        "repository": {"full_name": "org/repo"},
+        "pull_request": {"number": pr_number},
+        "review": {"state": state, "body": body},
+    }
+    return client.post("/webhook", json=payload, headers={"X-GitHub-Event": "pull_request_review"}).json()
+
+
+class RacingRunner:
+    """Ревью приходит, пока пайплайн ещё пушит и не сохранён как ожидающий."""
+
+    client: TestClient = None
+
+    def __init__(self, repo_name, issue_number, store):
+        self.repo_name = repo_name
+        self.issue_number = issue_number
+        self.store = store
+
+    def start(self, feedback=""):
+        cursor = app_module.review_bus.cursor()
+        response = review_webhook(self.client, 7, "changes_requested", "add a test")
+        assert "job_id" not in response
+
+        pipeline = SuspendedPipeline(
+            repo_name=self.repo_name, issue_number=self.issue_number, branch="fix/issue-1", pr_number=7,
+            iteration=1, feedback=feedback, cursor=cursor, since=0.0, deadline=10**10,
+        )
+        self.store.save(pipeline)
+        return pipeline
+
+
+# Тест 1: ревью, пришедшее до сохранения пайплайна, всё равно ставит задачу на продолжение
+def test_review_before_suspend_is_delivered(server, monkeypatch):
+    RacingRunner.client = server
+    monkeypatch.setattr(app_module, "PipelineRunner", RacingRunner)
+
+    app_module.run_agent_job("org/repo", 1)
+
+    [job] = app_module.job_queue.list(status=JobStatus.PENDING)
+    assert (job.issue_number, job.feedback) == (1, "add a test")
+    assert app_module.pipeline_store.get("org/repo", 1).status == PipelineStatus.WAITING
+
+    # Тот же вердикт от вебхука после сохранения сливается с уже поставленной задачей
+    review_webhook(server, 7, "changes_requested", "add a test")
+    assert app_module.job_queue.counts()[JobStatus.PENDING] == 1
+
+
+class RecordingRunner:
+    calls = []
+
+    def __init__(self, repo_name, issue_number, store):
+        pass
+
+    def start(self, feedback=""):
+        self.calls.append(("start", feedback))
+
+    def resume(self, pipeline, feedback):
+        self.calls.append(("resume", feedback))
+
+    async def astart(self, feedback=""):
+        self.start(feedback)
+
+    async def aresume(self, pipeline, feedback):
+        self.resume(pipeline, feedback)
+
+
+# Тест 2: известный пайплайн никогда не начинается заново, завершённый продолжается только по замечаниям
+def test_known_pipeline_is_never_restarted(server, monkeypatch):
+    monkeypatch.setattr(app_module, "PipelineRunner", RecordingRunner)
+    RecordingRunner.calls = []
+    store = app_module.pipeline_store
+    store.save(SuspendedPipeline(
+        repo_name="org/repo", issue_number=1, branch="fix/issue-1", pr_number=7,
+        iteration=1, feedback="", cursor=0, since=0.0, deadline=10**10,
+    ))
+
+    store.finish("org/repo", 1, PipelineStatus.DONE)
+    app_module.run_agent_job("org/repo", 1)
+    assert RecordingRunner.calls == []
+
+    app_module.run_agent_job("org/repo", 1, feedback="one more thing")
+    assert RecordingRunner.calls == [("resume", "one more thing")]
+
+    # Пайплайн занят другим воркером, пока тот не умрёт
+    assert store.get("org/repo", 1).status == PipelineStatus.RUNNING
+    app_module.run_agent_job("org/repo", 1, feedback="again")
+    assert len(RecordingRunner.calls) == 1
+
+    store.requeue_running()
+    app_module.run_agent_job("org/repo", 1)
+    app_module.run_agent_job("org/repo", 2)
+    assert RecordingRunner.calls[1:] == [("resume", ""), ("start", "")]
+
+
+# Тест 3: асинхронный обработчик тоже продолжает ожидающий пайплайн, а не начинает заново
+def test_async_job_resumes_waiting_pipeline(server, monkeypatch):
+    monkeypatch.setattr(app_module, "PipelineRunner", RecordingRunner)
+    RecordingRunner.calls = []
+    app_module.pipeline_store.save(SuspendedPipeline(
+        repo_name="org/repo", issue_number=1, branch="fix/issue-1", pr_number=7,
+        iteration=1, feedback="", cursor=0, since=0.0, deadline=10**10,
+    ))
+
+    asyncio.run(app_module.arun_agent_job("org/repo", 1, feedback="add a test"))
+    asyncio.run(app_module.arun_agent_job("org/repo", 2))
+
+    assert RecordingRunner.calls == [("resume", "add a test"), ("start", "")]
+    assert app_module.pipeline_store.get("org/repo", 1).worker.startswith("async-")
+
+
+# Тест 4: ответ вебхука ревью говорит, дошло ли ревью до ожидающего пайплайна
+def test_review_webhook_message(server):
+    assert review_webhook(server, 7, "approved")["msg"] == "Review recorded, no waiting pipeline"
+
+    app_module.pipeline_store.save(SuspendedPipeline(
+        repo_name="org/repo", issue_number=1, branch="fix/issue-1", pr_number=7,
+        iteration=1, feedback="", cursor=0, since=0.0, deadline=10**10,
+    ))
+    assert review_webhook(server, 7, "commented")["msg"] == "Review recorded, pipeline keeps waiting for a verdict"
+    response = review_webhook(server, 7, "changes_requested", "add a test")
+    assert response["msg"] == "Suspended pipeline queued to resume" and "job_id" in response
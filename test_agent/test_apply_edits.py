@@ -0,0 +1,73 @@
+import pytest
+
+from src.core.context import work_dir_context
+from src.tools.edit_tool import apply_edits
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    token = work_dir_context.set(str(tmp_path))
+    yield tmp_path
+    work_dir_context.reset(token)
+
+
+# Тест 1: много правок в нескольких файлах за один вызов, CRLF файла сохраняется
+def test_batched_edits(workspace):
+    (workspace / "a.py").write_text("def f():\n    return g(1) + g(2)\n\ndef g(x):\n    return x\n")
+    (workspace / "b.py").write_bytes(b"x = 1\r\ny = 2\r\n")
+
+    result = apply_edits.invoke({"edits": [
+        {"filepath": "a.py", "old_code": "g(1)", "new_code": "h(1)"},
+        {"filepath": "a.py", "old_code": "g(2)", "new_code": "h(2)"},
+        {"filepath": "a.py", "old_code": "def g(x):", "new_code": "def h(x):"},
+        {"filepath": "b.py", "old_code": "y = 2\n", "new_code": "y = 3\n"},
+    ]})
+
+    assert result == "Successfully applied 4 edit(s) to 2 file(s): a.py (3), b.py (1)"
+    assert (workspace / "a.py").read_text() == "def f():\n    return h(1) + h(2)\n\ndef h(x):\n    return x\n"
+    assert (workspace / "b.py").read_bytes() == b"x = 1\r\ny = 3\r\n"
+    assert sorted(p.name for p in workspace.iterdir()) == ["a.py", "b.py"]
+
+
+# Тест 2: неоднозначные, ненайденные и пересекающиеся правки — ничего не пишется, ошибки вместе
+def test_failures_reported_together(workspace):
+    original = "x = 1\nx = 1\nvalue = 2\n"
+    (workspace / "a.py").write_text(original)
+    (workspace / "b.py").write_text("ok = True\n")
+
+    result = apply_edits.invoke({"edits": [
+        {"filepath": "b.py", "old_code": "ok = True", "new_code": "ok = False"},
+        {"filepath": "a.py", "old_code": "x = 1", "new_code": "x = 2"},
+        {"filepath": "a.py", "old_code": "  value = 2", "new_code": "value = 3"},
+        {"filepath": "a.py", "old_code": "value", "new_code": "v"},
+        {"filepath": "a.py", "old_code": "value = 2", "new_code": "v = 2"},
+        {"filepath": "missing.py", "old_code": "a", "new_code": "b"},
+    ]})
+
+    assert result.startswith("Error: no changes were made, 4 problem(s):")
+    assert "edit 2 (a.py): old code matches 2 places (lines 1, 2)" in result
+    assert "edit 3 (a.py): old code not found in a.py. Its first line appears at line(s) 3" in result
+    assert "overlaps with" in result
+    assert "missing.py: file not found" in result
+    assert (workspace / "a.py").read_text() == original
+    assert (workspace / "b.py").read_text() == "ok = True\n"
+
+
+# Тест 3: правки в виде unified diff, включая новый файл
+def test_unified_diff(workspace):
+    (workspace / "calc.py").write_text("def divide(a, b):\n    return a * b\n\n\ndef add(a, b):\n    return a + b\n")
+    diff = (
+        "--- a/calc.py\n+++ b/calc.py\n"
+        "@@ -1,2 +1,2 @@\n def divide(a, b):\n-    return a * b\n+    return a / b\n"
+        "@@ -5,2 +5,2 @@\n def add(a, b):\n-    return a + b\n+    return b + a\n"
+        "--- /dev/null\n+++ b/tests/test_calc.py\n"
+        "@@ -0,0 +1,2 @@\n+def test_divide():\n+    assert divide(10, 2) == 5\n"
+    )
+
+    result = apply_edits.invoke({"diff": diff})
+
+    assert result.startswith("Successfully applied 3 edit(s) to 2 file(s)")
+    assert (workspace / "calc.py").read_text() == (
+        "def divide(a, b):\n    return a / b\n\n\ndef add(a, b):\n    return b + a\n"
+    )
+    assert (workspace / "tests" / "test_calc.py").read_text() == "def test_divide():\n    assert divide(10, 2) == 5\n"
@@ -1,6 +1,11 @@
+import asyncio
+import itertools
+import time
 import pytest
 from src.agents.coder import CoderAgent, CoderState, ToolExecutorNode
-from langchain_core.messages import SystemMessage, HumanMessage
+from src.core.config import settings
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, SystemMessage, HumanMessage
 
 
 class MockTool:
@@ -11,10 +16,14 @@ class MockTool:
 
 
 @pytest.fixture
-def agent_with_mock_tool(monkeypatch):
+def agent_with_mock_tool(monkeypatch, tmp_path):
+    # Пустой кэш в режиме replay: любой запрос мимо заглушки падает, а не уходит в сеть
+    monkeypatch.setattr(settings, "LLM_CACHE_MODE", "replay")
+    monkeypatch.setattr(settings, "LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3"))
     agent = CoderAgent()
-    # Подмена инструментов
+    # Подмена инструментов и модели
     agent.tools = [MockTool()]
+    agent.llm = GenericFakeChatModel(messages=itertools.repeat(AIMessage(content="DONE")))
 
     agent.graph = agent._build_graph()
     return agent
@@ -63,4 +72,219 @@ def test_message_trimming(agent_with_mock_tool):
 
     messages = result["messages"]
     # Должны оставить максимум 15 сообщений: система и первый user + последние 13
-    assert len(messages) <= 15
\ No newline at end of file
+    assert len(messages) <= 15
+
+class SleepyTool:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def invoke(self, args):
+        target = args.get("filepath") or ",".join(edit["filepath"] for edit in args["edits"])
+        self.log.append(("start", self.name, target))
+        time.sleep(0.2)
+        self.log.append(("end", self.name, target))
+        return f"{self.name} {target}"
+
+
+# Тест 4: чтения выполняются параллельно, порядок ToolMessage сохраняется
+def test_tool_executor_runs_reads_in_parallel():
+    events = []
+    node = ToolExecutorNode([SleepyTool("read_file", events)])
+    message = HumanMessage(content="Run tools")
+    message.tool_calls = [
+        {"id": str(i), "name": "read_file", "args": {"filepath": f"f{i}.py"}} for i in range(4)
+    ]
+
+    started = time.time()
+    output = node(CoderState(task="t", messages=[message], iterations=0))
+
+    assert time.time() - started < 0.6
+    assert [m.content for m in output["messages"]] == [f"read_file f{i}.py" for i in range(4)]
+    assert all(m.response_metadata["duration"] >= 0.2 for m in output["messages"])
+
+
+# Тест 5: запись в файл ждёт предыдущих вызовов по тому же файлу
+def test_tool_executor_serializes_writes_per_file():
+    events = []
+    node = ToolExecutorNode([SleepyTool("read_file", events), SleepyTool("replace_code_block", events)])
+    message = HumanMessage(content="Run tools")
+    message.tool_calls = [
+        {"id": "1", "name": "read_file", "args": {"filepath": "a.py"}},
+        {"id": "2", "name": "replace_code_block", "args": {"filepath": "./a.py"}},
+        {"id": "3", "name": "read_file", "args": {"filepath": "b.py"}},
+    ]
+
+    node(CoderState(task="t", messages=[message], iterations=0))
+
+    assert events.index(("end", "read_file", "a.py")) < events.index(("start", "replace_code_block", "./a.py"))
+    assert events.index(("start", "read_file", "b.py")) < events.index(("end", "read_file", "a.py"))
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, messages):
+        self.calls.append(messages)
+        usage = {"input_tokens": 1000, "output_tokens": 10, "total_tokens": 1010,
+                 "input_token_details": {"cache_read": 768 if len(self.calls) > 1 else 0}}
+        if len(self.calls) == 1:
+            return AIMessage(content="", tool_calls=[{"id": "c1", "name": "mock_tool", "args": {"x": 1}}],
+                             usage_metadata=usage)
+        return AIMessage(content="DONE", usage_metadata=usage)
+
+
+# Тест 6: системный промпт и задача — одинаковый префикс на каждом ходу, кэш токенов учитывается
+def test_stable_prompt_prefix(agent_with_mock_tool):
+    agent = agent_with_mock_tool
+    agent.llm = RecordingLLM()
+    final_state = agent.graph.invoke({
+        "task": "Task: fix bug",
+        "messages": [SystemMessage(content="Task: fix bug")],
+        "iterations": 0,
+        "is_complete": False,
+    })
+
+    first, second = agent.llm.calls
+    assert first[:2] == second[:2]
+    assert first[1].content == "ACTUAL TASK: Task: fix bug"
+    assert [type(m).__name__ for m in second[2:]] == ["AIMessage", "ToolMessage"]
+    assert [u["cached"] for u in final_state["usage"]] == [0, 768]
+    assert final_state["usage"][1]["uncached"] == 232
+
+
+class StreamingLLM:
+    def __init__(self, events):
+        self.events = events
+        self.closed = False
+
+    def stream(self, messages):
+        try:
+            if isinstance(messages[-1], HumanMessage):
+                for i, name in enumerate(["read_file", "replace_code_block"]):
+                    yield AIMessageChunk(content="", tool_call_chunks=[
+                        {"index": i, "id": f"c{i}", "name": name, "args": '{"filepath": "a.py"}'}
+                    ])
+                    time.sleep(0.3)
+                    self.events.append(("generated", i))
+            else:
+                yield AIMessageChunk(content="All good. DO")
+                yield AIMessageChunk(content="NE")
+        finally:
+            self.closed = True
+
+
+# Тест 7: стриминг — чтение стартует до конца ответа, запись ждёт
+def test_streaming_dispatches_reads_early(agent_with_mock_tool):
+    events = []
+    agent = agent_with_mock_tool
+    agent.tools = [SleepyTool("read_file", events), SleepyTool("replace_code_block", events)]
+    agent.graph = agent._build_graph()
+    agent.llm = StreamingLLM(events)
+    agent.streaming = True
+
+    final_state = agent.graph.invoke({
+        "task": "Task: fix",
+        "messages": [SystemMessage(content="Task: fix")],
+        "iterations": 0,
+        "is_complete": False,
+    })
+
+    assert events.index(("start", "read_file", "a.py")) < events.index(("generated", 1))
+    assert events.index(("end", "read_file", "a.py")) < events.index(("start", "replace_code_block", "a.py"))
+    assert events.count(("start", "read_file", "a.py")) == 1
+    assert final_state["messages"][-1].content == "All good. DONE"
+    assert agent.llm.closed
+
+
+class ProseThenToolLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def stream(self, messages):
+        self.calls += 1
+        if self.calls == 1:
+            yield AIMessageChunk(content="Plan: read a.py, then say DONE")
+            yield AIMessageChunk(content="", tool_call_chunks=[
+                {"index": 0, "id": "c0", "name": "read_file", "args": '{"filepath": "a.py"}'}
+            ])
+        else:
+            yield AIMessageChunk(content="DONE")
+
+
+# Тест 8: стриминг — DONE в тексте не обрывает поток, вызов инструмента после текста выполняется
+def test_streaming_keeps_tool_calls_after_done_text(agent_with_mock_tool):
+    events = []
+    agent = agent_with_mock_tool
+    agent.tools = [SleepyTool("read_file", events)]
+    agent.graph = agent._build_graph()
+    agent.llm = ProseThenToolLLM()
+    agent.streaming = True
+
+    final_state = agent.graph.invoke({
+        "task": "Task: fix",
+        "messages": [SystemMessage(content="Task: fix")],
+        "iterations": 0,
+        "is_complete": False,
+    })
+
+    assert [call["name"] for call in final_state["messages"][1].tool_calls] == ["read_file"]
+    assert ("end", "read_file", "a.py") in events
+    assert final_state["messages"][-1].content == "DONE"
+
+
+class AsyncLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        if self.calls == 1:
+            return AIMessage(content="", tool_calls=[
+                {"id": f"c{i}", "name": "read_file", "args": {"filepath": f"f{i}.py"}} for i in range(3)
+            ])
+        return AIMessage(content="DONE")
+
+
+# Тест 9: асинхронный прогон графа — несколько агентов в одном event loop
+def test_agents_run_concurrently_with_ainvoke():
+    events = []
+
+    def make_agent():
+        agent = CoderAgent()
+        agent.tools = [SleepyTool("read_file", events)]
+        agent.graph = agent._build_graph()
+        agent.llm = AsyncLLM()
+        return agent
+
+    agents = [make_agent() for _ in range(3)]
+
+    async def main():
+        return await asyncio.gather(*(agent.arun("Task") for agent in agents))
+
+    started = time.time()
+    assert asyncio.run(main()) == ["Finished"] * 3
+    assert time.time() - started < 0.6
+    assert events.count(("end", "read_file", "f0.py")) == 3
+
+
+# Тест 10: пакетная правка ждёт только вызовов по своим файлам, чтения других файлов идут параллельно
+def test_tool_executor_apply_edits_conflicts_on_its_files():
+    events = []
+    node = ToolExecutorNode([SleepyTool("read_file", events), SleepyTool("apply_edits", events)])
+    edits = [{"filepath": "a.py", "old_code": "x", "new_code": "y"}, {"filepath": "./b.py", "old_code": "x", "new_code": "y"}]
+    message = HumanMessage(content="Run tools")
+    message.tool_calls = [
+        {"id": "1", "name": "read_file", "args": {"filepath": "c.py"}},
+        {"id": "2", "name": "apply_edits", "args": {"edits": edits}},
+        {"id": "3", "name": "read_file", "args": {"filepath": "d.py"}},
+        {"id": "4", "name": "read_file", "args": {"filepath": "b.py"}},
+    ]
+
+    node(CoderState(task="t", messages=[message], iterations=0))
+
+    batch = "a.py,./b.py"
+    assert events.index(("start", "apply_edits", batch)) < events.index(("end", "read_file", "c.py"))
+    assert events.index(("start", "read_file", "d.py")) < events.index(("end", "apply_edits", batch))
+    assert events.index(("end", "apply_edits", batch)) < events.index(("start", "read_file", "b.py"))
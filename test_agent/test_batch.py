@@ -0,0 +1,46 @@
+import os
+import time
+import pytest
+
+from src.batch import BatchRunner, IssueRef, load_issue_file, parse_issue_ref
+
+
+def fake_pipeline(repo_name, issue_number, feedback="", log_dir=""):
+    # Records start/end so the test can check how many ran at once per repository
+    path = os.path.join(log_dir, f"{repo_name.replace('/', '_')}_{issue_number}")
+    with open(path, "w") as f:
+        f.write(f"{time.time()}\n")
+    time.sleep(0.3)
+    with open(path, "a") as f:
+        f.write(f"{time.time()}\n")
+    if issue_number == 13:
+        raise RuntimeError("unlucky")
+    return issue_number != 4, "" if issue_number != 4 else "ValueError: no fix"
+
+
+# Тест 1: разбор ссылок на задачи из аргументов и файла
+def test_issue_refs(tmp_path):
+    assert parse_issue_ref("org/repo#12") == IssueRef("org/repo", 12)
+    assert parse_issue_ref(" org/my.repo 7 ") == IssueRef("org/my.repo", 7)
+    with pytest.raises(ValueError):
+        parse_issue_ref("org/repo")
+
+    issues = tmp_path / "issues.txt"
+    issues.write_text("# backlog\norg/a#1\n\norg/b#2\n")
+    assert load_issue_file(str(issues)) == [IssueRef("org/a", 1), IssueRef("org/b", 2)]
+
+
+# Тест 2: пул процессов соблюдает лимит на репозиторий и собирает ошибки
+def test_batch_runner_limits_and_failures(tmp_path):
+    issues = [IssueRef("org/a", n) for n in (1, 2, 3)] + [IssueRef("org/b", 4), IssueRef("org/c", 13)]
+    runner = BatchRunner(issues, workers=3, per_repo_limit=1, log_dir=str(tmp_path), worker_fn=fake_pipeline)
+    results = runner.run()
+
+    assert {str(r.issue) for r in results} == {str(i) for i in issues}
+    spans = sorted(tuple(map(float, (tmp_path / f"org_a_{n}").read_text().split())) for n in (1, 2, 3))
+    assert all(prev[1] <= nxt[0] for prev, nxt in zip(spans, spans[1:]))
+
+    summary = runner.summary()
+    assert "3 succeeded, 2 failed" in summary
+    assert "org/b#4: ValueError: no fix" in summary
+    assert "org/c#13: RuntimeError: unlucky" in summary
@@ -0,0 +1,70 @@
+import os
+import pytest
+
+from src.core.code_search import TrigramIndex, required_literals, search
+from src.core.context import work_dir_context
+from src.tools.search_tool import search_code
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / ".coderignore").write_text("build/\n")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("import os\n\ndef load_config(path):\n    return open(path)\n\n\nx = load_config('a')\n")
+    (tmp_path / "src" / "b.py").write_text("from a import load_config\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "a.py").write_text("def load_config(): pass\n")
+    (tmp_path / "data.bin").write_bytes(b"load_config\0\0\0")
+    token = work_dir_context.set(str(tmp_path))
+    yield tmp_path
+    work_dir_context.reset(token)
+    TrigramIndex.drop(tmp_path)
+
+
+# Тест 1: поиск с контекстом, ignore-правила, бинарные файлы пропускаются
+def test_search_code_output(workspace):
+    result = search_code.invoke({"query": "load_config", "context_lines": 1})
+
+    assert result == (
+        "src/a.py\n"
+        "2-\n"
+        "3:def load_config(path):\n"
+        "4-    return open(path)\n"
+        "--\n"
+        "6-\n"
+        "7:x = load_config('a')\n"
+        "\n"
+        "src/b.py\n"
+        "1:from a import load_config\n"
+        "\n"
+        "3 matches in 2 files"
+    )
+    assert "No matches" in search_code.invoke({"query": "LOAD_CONFIG"})
+    assert "src/b.py" in search_code.invoke({"query": r"import \w+_config", "regex": True, "case_sensitive": False})
+    assert search_code.invoke({"query": "(", "regex": True}).startswith("Error: invalid regex")
+
+    # `**/` совпадает и с файлами прямо в src/
+    result = search(str(workspace), "load_config", path_glob="src/**/*.py", use_index=False)
+    assert {m.path for m in result.matches} == {"src/a.py", "src/b.py"}
+
+
+# Тест 2: триграммный индекс сужает набор файлов и следит за изменениями
+def test_trigram_index_follows_changes(workspace):
+    assert required_literals(r"def load_\w+\(", regex=True) == ["def load_"]
+    assert required_literals("a|b", regex=True) == []
+    # Вложенные группы пропускаются целиком, литералы из опциональной группы не требуются
+    assert required_literals("(a(b)cdef)?ghi", regex=True) == ["ghi"]
+    assert required_literals(r"x[)\]]yz(q[(]r)?abc", regex=True) == ["abc"]
+
+    TrigramIndex.for_workspace(workspace).ensure_built()
+    first = search(str(workspace), "return open", max_results=10)
+    assert first.indexed and [m.path for m in first.matches] == ["src/a.py"]
+
+    (workspace / "src" / "b.py").write_text("def f():\n    return open('x')\n")
+    os.utime(workspace / "src" / "b.py", ns=(1, 1))
+    (workspace / "src" / "c.py").write_text("return opened\n")
+    second = search(str(workspace), "return open", max_results=10)
+    assert [m.path for m in second.matches] == ["src/a.py", "src/b.py", "src/c.py"]
+
+    limited = search(str(workspace), "return open", max_results=2)
+    assert len(limited.matches) == 2 and limited.truncated
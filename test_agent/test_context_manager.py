@@ -0,0 +1,66 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.agents.context_manager import ContextManager, count_message_tokens
+
+
+def _step(call_id, name, args, output):
+    return [
+        AIMessage(content="", tool_calls=[{"id": call_id, "name": name, "args": args}]),
+        ToolMessage(content=output, tool_call_id=call_id, name=name),
+    ]
+
+
+def _history():
+    big = "\n".join(f"line {i} " + "x" * 40 for i in range(400))
+    return [
+        SystemMessage(content="system"),
+        HumanMessage(content="ACTUAL TASK: fix it"),
+        *_step("1", "read_file", {"filepath": "a.py"}, big),
+        *_step("2", "list_files", {}, "a.py\nb.py"),
+        *_step("3", "replace_code_block", {"filepath": "a.py", "old_code": "x", "new_code": "y"}, "ok"),
+        *_step("4", "read_file", {"filepath": "b.py"}, big),
+        *_step("5", "list_files", {}, "a.py\nb.py"),
+        *_step("6", "run_tests", {}, "Tests Passed"),
+    ]
+
+
+# Тест 1: устаревшие чтения, повторы и большие выводы сжимаются, последние шаги не трогаются
+def test_old_outputs_compressed():
+    history = _history()
+    messages, stats = ContextManager(max_tokens=100_000, tool_output_tokens=500, recent_steps=2).build(history)
+
+    contents = {m.tool_call_id: m.content for m in messages if isinstance(m, ToolMessage)}
+    assert contents["1"] == "[Output omitted: a.py was modified afterwards, read it again if needed]"
+    assert contents["2"] == "[Output omitted: the same list_files call was repeated later]"
+    assert "lines omitted to save context" in contents["4"]
+    assert contents["5"] == "a.py\nb.py"
+    assert stats.compressed == 3 and stats.tokens < stats.original_tokens
+    assert history[3].content.startswith("line 0")
+
+
+# Тест 2: бюджет соблюдается удалением целых шагов, пары вызов/результат не разрываются
+def test_budget_drops_whole_steps():
+    history = _history()
+    manager = ContextManager(max_tokens=400, tool_output_tokens=100_000, recent_steps=10)
+    messages, stats = manager.build(history)
+
+    assert messages[:2] == history[:2]
+    assert messages[-2:] == history[-2:]
+    assert stats.dropped_steps > 0 and "earlier steps were removed" in messages[2].content
+    assert stats.tokens == sum(count_message_tokens(m) for m in messages)
+
+    answered = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    requested = {c["id"] for m in messages if isinstance(m, AIMessage) for c in m.tool_calls}
+    assert answered == requested
+
+
+# Тест 3: отброшенные шаги остаются отброшенными, пока история влезает — начало истории стабильно
+def test_dropped_steps_are_sticky():
+    history = _history()
+    manager = ContextManager(max_tokens=1200, tool_output_tokens=100_000, recent_steps=10)
+    _, first = manager.build(history)
+
+    history += _step("7", "list_files", {"directory": "src"}, "src/a.py")
+    _, second = manager.build(history)
+    assert first.dropped_steps > 0
+    assert second.dropped_steps == first.dropped_steps
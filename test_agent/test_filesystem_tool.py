@@ -0,0 +1,63 @@
+import os
+import pytest
+
+from src.core.context import work_dir_context
+from src.core.ignore import IgnoreManager
+from src.tools.filesystem_tool import list_files
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    files = {
+        ".gitignore": "node_modules/\n*.log\n",
+        "app/main.py": "",
+        "app/debug.log": "",
+        "app/.gitignore": "!debug.log\ngenerated/\n",
+        "app/generated/schema.py": "",
+        "node_modules/lib/index.js": "",
+        "docs/readme.md": "",
+        "setup.py": "",
+    }
+    for path, content in files.items():
+        full_path = tmp_path / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text(content)
+
+    token = work_dir_context.set(str(tmp_path))
+    yield tmp_path
+    work_dir_context.reset(token)
+
+
+# Тест 1: вложенные .gitignore, отрицания и игнорируемые каталоги не обходятся
+def test_list_files_respects_nested_gitignore(workspace, monkeypatch):
+    visited = []
+    real_walk = os.walk
+    monkeypatch.setattr(os, "walk", lambda top: ((d, n, f) for d, n, f in real_walk(top) if not visited.append(d)))
+
+    result = list_files.invoke({}).splitlines()
+
+    assert sorted(result) == ["app/debug.log", "app/main.py", "docs/readme.md", "setup.py"]
+    assert not any("node_modules" in d or "generated" in d for d in visited)
+
+
+# Тест 2: фильтр, глубина и постраничный вывод
+def test_list_files_filters_and_pages(workspace):
+    assert list_files.invoke({"pattern": "*.py"}).splitlines() == ["setup.py", "app/main.py"]
+    assert list_files.invoke({"max_depth": 1}) == "setup.py"
+    # `**/` может не совпасть ни с одним каталогом
+    assert list_files.invoke({"pattern": "app/**/*.py"}).splitlines() == ["app/main.py"]
+
+    first = list_files.invoke({"limit": 2}).splitlines()
+    assert first[-1] == "... more files available, call list_files with offset=2"
+    second = list_files.invoke({"limit": 2, "offset": 2}).splitlines()
+    assert len(set(first[:2]) | set(second)) == 4
+
+
+# Тест 3: скомпилированные правила кэшируются и обновляются при изменении файла
+def test_ignore_manager_cached_per_workspace(workspace):
+    manager = IgnoreManager.for_workspace(workspace)
+    assert IgnoreManager.for_workspace(workspace) is manager
+
+    (workspace / ".coderignore").write_text("docs/\n")
+    assert IgnoreManager.for_workspace(workspace) is not manager
+    assert "docs/readme.md" not in list_files.invoke({})
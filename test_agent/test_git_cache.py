@@ -0,0 +1,100 @@
+import asyncio
+import os
+import pytest
+from git import Repo
+
+from src.core.git_cache import MirrorCache
+from src.core.local_git import LocalGit
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    repo = Repo.init(tmp_path / "upstream", initial_branch="main")
+    with repo.config_writer() as cw:
+        cw.set_value("user", "email", "agent@example.com")
+        cw.set_value("user", "name", "agent")
+        cw.set_value("receive", "denyCurrentBranch", "ignore")
+    (tmp_path / "upstream" / "a.txt").write_text("hello\n")
+    repo.index.add(["a.txt"])
+    repo.index.commit("init")
+    return f"file://{tmp_path / 'upstream'}"
+
+
+# Тест 1: worktree из зеркала, пуш ветки и повторное использование зеркала
+def test_worktree_from_mirror(tmp_path, upstream):
+    cache = MirrorCache(str(tmp_path / "mirrors"))
+    work_dir = str(tmp_path / "job")
+
+    git = LocalGit(upstream, work_dir, cache=cache)
+    git.clone()
+    assert git.default_branch == "main"
+    assert os.path.exists(os.path.join(work_dir, "a.txt"))
+
+    git.create_branch("fix/issue-1")
+    with open(os.path.join(work_dir, "b.txt"), "w") as f:
+        f.write("fix\n")
+    git.commit_all("fix")
+    git.push("fix/issue-1")
+    git.cleanup()
+
+    assert not os.path.exists(work_dir)
+    assert "fix/issue-1" in Repo(upstream[len("file://"):]).heads
+
+    again = LocalGit(upstream, work_dir, cache=cache)
+    again.clone()
+    again.create_branch("fix/issue-1")
+    assert len(os.listdir(cache.cache_dir)) == 2  # mirror + lock file
+    again.cleanup()
+
+
+# Тест 2: LRU-вытеснение не трогает зеркала с активными worktree
+def test_evict_skips_active_mirrors(tmp_path, upstream):
+    cache = MirrorCache(str(tmp_path / "mirrors"), max_bytes=1)
+    git = LocalGit(upstream, str(tmp_path / "job"), cache=cache)
+    git.clone()
+
+    cache.evict()
+    assert os.path.isdir(cache.mirror_path(upstream))
+
+    git.cleanup()
+    cache.evict()
+    assert not os.path.isdir(cache.mirror_path(upstream))
+
+
+# Тест 3: асинхронные clone/commit/push через git-подпроцессы
+def test_async_clone_commit_push(tmp_path, upstream):
+    work_dir = str(tmp_path / "job")
+    git = LocalGit(upstream, work_dir)
+
+    async def main():
+        await git.aclone()
+        git.create_branch("fix/issue-2")
+        with open(os.path.join(work_dir, "c.txt"), "w") as f:
+            f.write("async\n")
+        await git.acommit_all("async fix")
+        await git.apush("fix/issue-2")
+
+    asyncio.run(main())
+    branch = Repo(upstream[len("file://"):]).heads["fix/issue-2"]
+    assert branch.commit.message.strip() == "async fix"
+    assert "c.txt" in branch.commit.tree
+
+
+# Тест 4: продолжение запушенной ветки в новом checkout (зеркало и shallow-клон)
+@pytest.mark.parametrize("use_cache", [True, False])
+def test_checkout_pushed_branch(tmp_path, upstream, use_cache):
+    cache = MirrorCache(str(tmp_path / "mirrors")) if use_cache else None
+    git = LocalGit(upstream, str(tmp_path / "first"), cache=cache)
+    git.clone()
+    git.create_branch("fix/issue-1")
+    (tmp_path / "first" / "b.txt").write_text("fix\n")
+    git.commit_all("fix")
+    git.push("fix/issue-1")
+    git.cleanup()
+
+    again = LocalGit(upstream, str(tmp_path / "second"), cache=cache, depth=0 if use_cache else 1)
+    again.clone()
+    again.checkout_branch("fix/issue-1")
+    assert (tmp_path / "second" / "b.txt").read_text() == "fix\n"
+    assert again.repo.active_branch.name == "fix/issue-1"
+    again.cleanup()
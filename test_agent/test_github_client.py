@@ -0,0 +1,88 @@
+import time
+
+from src.core.github_client import GithubClient, RateLimitGuard
+
+
+class FakeGithub:
+    def __init__(self, remaining, limit=5000, reset_in=10.0):
+        self.rate_limiting = (remaining, limit)
+        self.rate_limiting_resettime = time.time() + reset_in
+
+
+class FakeIssue:
+    def __init__(self):
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+        return False
+
+
+# Тест 1: кэш отдаёт объект до истечения TTL, затем ревалидирует его условным запросом
+def test_cache_revalidates_after_ttl(monkeypatch):
+    client = GithubClient(token="token", ttl=0.05)
+    monkeypatch.setattr(client.rate_limit, "wait", lambda: None)
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return FakeIssue()
+
+    issue = client._cached(("issue", "org/repo", 1), fetch)
+    assert client._cached(("issue", "org/repo", 1), fetch) is issue
+    time.sleep(0.06)
+    assert client._cached(("issue", "org/repo", 1), fetch) is issue
+    assert len(fetches) == 1 and issue.updates == 1
+
+
+# Тест 2: при малом остатке лимита вызовы растягиваются до сброса окна
+def test_rate_limit_guard_paces(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+
+    RateLimitGuard(FakeGithub(remaining=4000), reserve=100).wait()
+    assert sleeps == []
+
+    RateLimitGuard(FakeGithub(remaining=10, reset_in=10), reserve=100).wait()
+    assert 0.5 < sleeps[-1] <= 1.0
+
+    RateLimitGuard(FakeGithub(remaining=0, reset_in=10), reserve=100).wait()
+    assert 9 < sleeps[-1] <= 10
+
+
+# Тест 3: ожидание идёт без блокировки, а следующие вызовы получают очередь после него
+def test_rate_limit_guard_sleeps_outside_lock(monkeypatch):
+    guard = RateLimitGuard(FakeGithub(remaining=10, reset_in=10), reserve=100)
+    sleeps = []
+
+    def sleep(delay):
+        assert not guard.lock.locked()
+        sleeps.append(delay)
+
+    monkeypatch.setattr(time, "sleep", sleep)
+    guard.wait()
+    guard.wait()
+    assert 0.5 < sleeps[0] <= 1.0 and 1.5 < sleeps[1] <= 2.0
+
+
+# Тест 4: ревью запрашиваются условно по собственному ETag, 304 означает, что новых нет
+def test_reviews_conditional_request(monkeypatch):
+    client = GithubClient(token="token")
+    monkeypatch.setattr(client.rate_limit, "wait", lambda: None)
+    review = '{"id": 1, "state": "APPROVED", "body": "ok", "submitted_at": "2026-01-01T00:00:00Z"}'
+    answers = [(200, {"etag": '"a"'}, f"[{review}]"), (304, {}, ""), (200, {"etag": '"b"'}, f"[{review}, {review}]")]
+    sent = []
+
+    def request_json(verb, url, parameters=None, headers=None, **kwargs):
+        sent.append((url, headers))
+        return answers.pop(0)
+
+    monkeypatch.setattr(client.client.requester, "requestJson", request_json)
+    pr = type("PR", (), {"url": "https://api.github.com/repos/org/repo/pulls/7"})()
+
+    [first] = client.get_reviews_if_changed(pr)
+    assert (first.state, first.body) == ("APPROVED", "ok")
+    assert client.get_reviews_if_changed(pr) is None
+    assert len(client.get_reviews_if_changed(pr)) == 2
+    assert sent[0] == (pr.url + "/reviews", None)
+    assert sent[1][1] == sent[2][1] == {"If-None-Match": '"a"'}
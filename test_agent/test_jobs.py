@@ -0,0 +1,77 @@
+import asyncio
+import time
+import pytest
+from src.server.jobs import AsyncJobRunner, JobQueue, JobStatus
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+# Тест 1: события для одного repo#issue склеиваются в одну задачу
+def test_enqueue_deduplicates(queue):
+    first, created = queue.enqueue("org/repo", 1)
+    second, created_again = queue.enqueue("org/repo", 1, feedback="fix typo")
+
+    assert created and not created_again
+    assert first.id == second.id
+    assert queue.get(first.id).feedback == "fix typo"
+    assert queue.counts()[JobStatus.PENDING] == 1
+
+
+# Тест 2: лимит на репозиторий и запрет параллельной работы над одной задачей
+def test_claim_respects_limits(queue):
+    queue.enqueue("org/repo", 1)
+    queue.enqueue("org/repo", 2)
+    queue.enqueue("org/other", 3)
+
+    a = queue.claim("w1", per_repo_limit=1)
+    b = queue.claim("w2", per_repo_limit=1)
+    assert (a.issue_number, b.issue_number) == (1, 3)
+    assert queue.claim("w3", per_repo_limit=1) is None
+
+    queue.enqueue("org/repo", 1, feedback="again")
+    queue.complete(a.id)
+    c = queue.claim("w3", per_repo_limit=1)
+    assert c.issue_number == 2
+    assert queue.claim("w4", per_repo_limit=2).issue_number == 1
+
+
+# Тест 3: задачи упавшего воркера возвращаются в очередь
+def test_requeue_running(queue):
+    job, _ = queue.enqueue("org/repo", 1)
+    queue.claim("dead")
+
+    assert queue.requeue_running("dead") == 1
+    assert queue.get(job.id).status == JobStatus.PENDING
+
+    for _ in range(3):
+        queue.claim("dead")
+        queue.requeue_running("dead")
+    assert queue.get(job.id).status == JobStatus.FAILED
+
+
+# Тест 4: асинхронный раннер выполняет задачи параллельно в одном потоке и пишет ошибки
+def test_async_runner_runs_jobs_concurrently(queue):
+    for i in range(4):
+        queue.enqueue(f"org/repo{i}", i)
+    queue.enqueue("org/broken", 9)
+
+    async def handler(repo_name, issue_number, feedback=""):
+        await asyncio.sleep(0.3)
+        if repo_name == "org/broken":
+            raise ValueError("boom")
+
+    async def main():
+        runner = AsyncJobRunner(queue, handler, concurrency=8, poll_interval=0.05)
+        runner.start()
+        while queue.counts()[JobStatus.PENDING] or queue.counts()[JobStatus.RUNNING]:
+            await asyncio.sleep(0.05)
+        await runner.stop()
+
+    started = time.time()
+    asyncio.run(main())
+    assert time.time() - started < 1.5
+    assert queue.counts()[JobStatus.DONE] == 4
+    assert queue.list(status=JobStatus.FAILED)[0].error == "ValueError: boom"
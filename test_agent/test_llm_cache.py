@@ -0,0 +1,53 @@
+import time
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.core.config import settings
+from src.core.llm_cache import LLMCacheMiss, LLMResponseCache
+
+
+def _model(cache, *replies):
+    return GenericFakeChatModel(messages=iter(AIMessage(content=r) for r in replies), cache=cache)
+
+
+# Тест 1: запись и воспроизведение; в режиме replay промах — ошибка, а не запрос в сеть
+def test_record_and_replay(tmp_path):
+    db = str(tmp_path / "llm.sqlite3")
+    recorder = _model(LLMResponseCache(db), "first", "second")
+    assert recorder.invoke([HumanMessage(content="hi")]).content == "first"
+    assert recorder.invoke([HumanMessage(content="hi")]).content == "first"
+    assert recorder.invoke([HumanMessage(content="bye")]).content == "second"
+
+    replayer = _model(LLMResponseCache(db, replay=True))
+    assert replayer.invoke([HumanMessage(content="bye")]).content == "second"
+    with pytest.raises(LLMCacheMiss):
+        replayer.invoke([HumanMessage(content="new")])
+
+
+# Тест 2: вытеснение по TTL и по размеру (самые давно использованные первыми)
+def test_eviction(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"), ttl=3600)
+    model = _model(cache, "a" * 1000, "b" * 1000, "c" * 1000)
+    for prompt in ("one", "two"):
+        model.invoke([HumanMessage(content=prompt)])
+    model.invoke([HumanMessage(content="one")])
+
+    cache.max_bytes = cache._connect().execute("SELECT MAX(size) FROM responses").fetchone()[0] * 1.5
+    model.invoke([HumanMessage(content="three")])
+    keys = {row[0] for row in cache._connect().execute("SELECT value FROM responses")}
+    assert len(keys) == 1 and "ccc" in keys.pop()
+
+    cache.ttl = 0.01
+    time.sleep(0.02)
+    assert cache.evict() == 1
+
+
+# Тест 3: агент в режиме replay работает офлайн и не ходит в сеть
+def test_coder_agent_replay_offline(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_MODE", "replay")
+    monkeypatch.setattr(settings, "LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3"))
+    from src.agents.coder import CoderAgent
+
+    with pytest.raises(LLMCacheMiss):
+        CoderAgent().run("Do nothing")
@@ -0,0 +1,45 @@
+from src.core.config import settings
+from src.core.metrics import MetricsStore, histogram, render
+from src.core.tracing import span, trace
+
+
+# Тест 1: спаны завершённого трейса становятся счётчиками и гистограммами, общими для процессов
+def test_trace_recorded_as_metrics(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TRACING", False)
+    monkeypatch.setattr(settings, "METRICS_DB_PATH", str(tmp_path / "metrics.sqlite3"))
+
+    for _ in range(2):
+        with trace("pipeline", entry="start"):
+            with span("git.clone"):
+                pass
+            with span("llm.call", model="gpt") as call:
+                call.set(**{"llm.input_tokens": 100, "llm.cached_tokens": 40, "llm.output_tokens": 7})
+            try:
+                with span("tool.run_tests"):
+                    raise RuntimeError("tests crashed")
+            except RuntimeError:
+                pass
+
+    # Второй экземпляр, как в другом воркере, видит те же данные
+    text = render(MetricsStore(settings.METRICS_DB_PATH).samples())
+    assert 'agent_pipeline_runs_total{entry="start",status="ok"} 2' in text
+    assert 'agent_stage_duration_seconds_count{stage="clone"} 2' in text
+    assert 'agent_stage_duration_seconds_count{stage="tests"} 2' in text
+    assert 'agent_llm_tokens_total{kind="cached",model="gpt"} 80' in text
+    assert 'agent_tool_calls_total{status="error",tool="run_tests"} 2' in text
+    assert "# TYPE agent_llm_call_duration_seconds histogram" in text
+    assert not (tmp_path / "traces").exists()
+
+
+# Тест 2: бакеты гистограммы кумулятивные и идут по возрастанию, метки экранируются
+def test_render_histogram():
+    samples = histogram("agent_tool_call_duration_seconds", {"tool": "read_file"}, 0.3, (0.1, 0.5, 1))
+    samples += histogram("agent_tool_call_duration_seconds", {"tool": "read_file"}, 0.7, (0.1, 0.5, 1))
+    samples.append(("agent_jobs", {"status": 'odd "name"'}, 3))
+
+    lines = render(samples).splitlines()
+    buckets = [line for line in lines if "_bucket" in line]
+    assert [line.rsplit(" ", 1)[1] for line in buckets] == ["0", "1", "2", "2"]
+    assert buckets[-1].startswith('agent_tool_call_duration_seconds_bucket{tool="read_file",le="+Inf"}')
+    assert 'agent_tool_call_duration_seconds_sum{tool="read_file"} 1' in lines
+    assert 'agent_jobs{status="odd \\"name\\""} 3' in lines
@@ -0,0 +1,88 @@
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.agents.coder import CoderAgent
+from src.core.pipeline_store import PipelineStatus, PipelineStore, SuspendedPipeline
+
+
+def suspended(issue_number: int, pr_number: int, deadline: float = 10**10) -> SuspendedPipeline:
+    return SuspendedPipeline(
+        repo_name="org/repo", issue_number=issue_number, branch=f"fix/issue-{issue_number}",
+        pr_number=pr_number, iteration=1, feedback="", cursor=0, since=0.0, deadline=deadline,
+        agent_state="{}",
+    )
+
+
+# Тест 1: приостановленный пайплайн забирает ровно один воркер, просроченные помечаются
+def test_store_claim_and_expire(tmp_path):
+    store = PipelineStore(str(tmp_path / "pipelines.sqlite3"))
+    store.save(suspended(1, 10))
+    store.save(suspended(2, 20, deadline=1.0))
+
+    assert store.find_by_pr("org/repo", 10).issue_number == 1
+    claimed = store.claim("org/repo", 1, worker="w1")
+    assert claimed.status == PipelineStatus.RUNNING and claimed.worker == "w1"
+    assert store.claim("org/repo", 1, worker="w2") is None
+
+    assert store.expire() == 1
+    assert store.get("org/repo", 2).status == PipelineStatus.TIMED_OUT
+    assert [p.issue_number for p in store.list(status=PipelineStatus.RUNNING)] == [1]
+
+
+# Тест 2: пайплайн упавшего воркера снова ждёт, завершённый можно забрать только явно
+def test_store_requeue_running(tmp_path):
+    store = PipelineStore(str(tmp_path / "pipelines.sqlite3"))
+    for issue_number in (1, 2):
+        store.save(suspended(issue_number, issue_number * 10))
+        store.claim("org/repo", issue_number, worker=f"w{issue_number}")
+
+    assert store.requeue_running("w1") == 1
+    assert store.get("org/repo", 1).status == PipelineStatus.WAITING
+    assert store.get("org/repo", 2).status == PipelineStatus.RUNNING
+
+    store.finish("org/repo", 1, PipelineStatus.TIMED_OUT)
+    assert store.claim("org/repo", 1, worker="w3") is None
+    assert store.claim("org/repo", 1, worker="w3", statuses=[PipelineStatus.TIMED_OUT]).worker == "w3"
+
+
+class MockTool:
+    name = "mock_tool"
+
+    def invoke(self, args):
+        return f"processed {args}"
+
+
+class TwoStepLLM:
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, messages):
+        self.calls.append(messages)
+        if len(self.calls) % 2:
+            return AIMessage(content="", tool_calls=[{"id": f"c{len(self.calls)}", "name": "mock_tool", "args": {}}])
+        return AIMessage(content="DONE")
+
+
+def make_agent() -> CoderAgent:
+    agent = CoderAgent(checkpointer=InMemorySaver())
+    agent.tools = [MockTool()]
+    agent.graph = agent._build_graph()
+    agent.llm = TwoStepLLM()
+    agent.streaming = False
+    return agent
+
+
+# Тест 3: состояние графа переносится в другой агент и разговор продолжается с замечаниями
+def test_agent_state_resumes_in_another_agent():
+    first = make_agent()
+    first.run("fix bug", thread_id="org/repo#1")
+    data = first.export_state("org/repo#1")
+
+    second = make_agent()
+    second.import_state("org/repo#1", data)
+    second.run("fix bug", feedback="rename the function", thread_id="org/repo#1")
+
+    resumed = second.llm.calls[0]
+    assert "rename the function" in resumed[1].content
+    assert [type(m).__name__ for m in resumed[2:]] == ["AIMessage", "ToolMessage", "AIMessage", "HumanMessage"]
+    assert second.graph.get_state(second._config("org/repo#1")).values["iterations"] == 2
@@ -0,0 +1,66 @@
+import pytest
+
+from src.core.context import work_dir_context
+from src.core import file_reader
+from src.core.file_reader import LineIndex, read_lines
+from src.tools.analysis_tool import read_file
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setattr(LineIndex, "STRIDE", 8)
+    token = work_dir_context.set(str(tmp_path))
+    yield tmp_path
+    work_dir_context.reset(token)
+
+
+# Тест 1: чтение диапазона через разреженный индекс строк
+def test_read_range(workspace, monkeypatch):
+    (workspace / "big.txt").write_text("".join(f"line {i}\n" for i in range(1, 101)) + "tail")
+
+    result = read_file.invoke({"filepath": "big.txt", "start_line": 50, "end_line": 52})
+    assert result == "--- big.txt (Lines 50-52 of 101) ---\nline 50\nline 51\nline 52\n"
+    assert read_lines(str(workspace / "big.txt"), 101).content == "tail"
+
+    # Контрольные точки совпадают с наивным подсчётом, в том числе на границах чанков
+    monkeypatch.setattr(file_reader, "CHUNK_BYTES", 37)
+    data = (workspace / "big.txt").read_bytes()
+    expected = [0] + [i + 1 for i, byte in enumerate(data) if byte == ord("\n")][7::8]
+    index = LineIndex(str(workspace / "big.txt"))
+    assert index.checkpoints == expected and index.total_lines == 101
+
+
+# Тест 2: лимит на вызов, подсказка для продолжения и длинные строки
+def test_read_budget_and_continuation(workspace):
+    (workspace / "bundle.js").write_text("a" * 100_000 + "\n" + "".join(f"{i}\n" for i in range(1000)))
+
+    first = read_file.invoke({"filepath": "bundle.js"})
+    assert "[line truncated, 52001 more bytes]" in first
+    assert 'Continue with read_file(filepath="bundle.js", start_line=2, end_line=-1)' in first
+
+    second = read_file.invoke({"filepath": "bundle.js", "start_line": 2})
+    assert "(Lines 2-501 of 1001)" in second
+    assert "start_line=502" in second
+
+
+# Тест 3: бинарные файлы отсекаются сразу
+def test_read_binary(workspace):
+    (workspace / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0")
+    assert "binary file" in read_file.invoke({"filepath": "image.png"})
+
+
+# Тест 4: строка длиннее CHUNK_BYTES считается одной строкой и при индексации, и при переходе к строке
+def test_line_longer_than_chunk(workspace, monkeypatch):
+    monkeypatch.setattr(file_reader, "CHUNK_BYTES", 64)
+    path = workspace / "bundle.min.js"
+    path.write_text("a" * 300 + "\n" + "".join(f"line{i}\n" for i in range(2, 12)) + "b" * 200 + "\nend")
+
+    index = LineIndex(str(path))
+    assert index.total_lines == 13
+    assert index.checkpoints == [0, 301 + 6 * 7]
+
+    result = read_lines(str(path), 2, 3)
+    assert (result.content, result.start_line, result.end_line) == ("line2\nline3\n", 2, 3)
+    result = read_lines(str(path), 13)
+    assert (result.content, result.end_line, result.total_lines) == ("end", 13, 13)
+    assert read_lines(str(path), 12, 12, max_bytes=10).content.startswith("bbbbbbbbbb ... [line truncated")
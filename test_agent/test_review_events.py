@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import time
+
+from src.core.review_events import ReviewBus
+
+
+# Тест 1: публикация из другого потока сразу будит ожидающий пайплайн
+def test_wait_wakes_on_publish(tmp_path):
+    bus = ReviewBus(str(tmp_path / "events.sqlite3"), poll_interval=30)
+    cursor = bus.cursor()
+
+    threading.Timer(0.1, bus.publish, args=("org/repo", 7, "changes_requested", "add tests")).start()
+
+    started = time.time()
+    event = bus.wait("org/repo", 7, cursor, timeout=10)
+    assert time.time() - started < 5
+    assert (event.state, event.body) == ("CHANGES_REQUESTED", "add tests")
+
+
+# Тест 2: старые ревью, комментарии и чужие PR не считаются вердиктом
+def test_wait_filters_events(tmp_path):
+    bus = ReviewBus(str(tmp_path / "events.sqlite3"), poll_interval=0.05)
+    bus.publish("org/repo", 7, "approved")
+    cursor = bus.cursor()
+
+    bus.publish("org/repo", 7, "commented", "nit")
+    bus.publish("org/repo", 8, "approved")
+    assert bus.wait("org/repo", 7, cursor, timeout=0.2) is None
+
+    bus.publish("org/repo", 7, "approved")
+    assert bus.wait("org/repo", 7, cursor, timeout=0.2).state == "APPROVED"
+
+
+# Тест 3: асинхронное ожидание тоже просыпается сразу после публикации
+def test_await_event_wakes_on_publish(tmp_path):
+    bus = ReviewBus(str(tmp_path / "events.sqlite3"), poll_interval=30)
+    cursor = bus.cursor()
+    threading.Timer(0.1, bus.publish, args=("org/repo", 7, "approved")).start()
+
+    started = time.time()
+    event = asyncio.run(bus.await_event("org/repo", 7, cursor, timeout=10))
+    assert time.time() - started < 5
+    assert event.state == "APPROVED"
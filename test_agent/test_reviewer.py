@@ -0,0 +1,153 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from github import GithubException
+from langchain_core.runnables import RunnableLambda
+
+from src.agents.reviewer import ReviewComment, ReviewerAgent, ReviewResult, _split_oversized, chunk_diff
+from src.core.config import settings
+from src.core.diff import HUNK_RANGE, ingest_pull_request, parse_diff
+
+
+def file_patch(path: str, hunks: int, lines: int) -> str:
+    body = [f"--- {path} ---"]
+    for h in range(hunks):
+        body.append(f"@@ -{h * 100 + 1},{lines} +{h * 100 + 1},{lines} @@")
+        body.extend(f"+line {h}-{i} of {path}" for i in range(lines))
+    return "\n".join(body)
+
+
+# Тест 1: дифф режется по файлам и ханкам в пределах бюджета, ничего не теряется
+def test_chunk_diff_covers_everything():
+    diff = "\n".join([file_patch("small_a.py", 1, 3), file_patch("small_b.py", 1, 3),
+                      file_patch("big.py", 4, 40), file_patch("huge_hunk.py", 1, 300)])
+    files = parse_diff(diff)
+    assert [(f.path, len(f.hunks)) for f in files] == [("small_a.py", 1), ("small_b.py", 1), ("big.py", 4),
+                                                       ("huge_hunk.py", 1)]
+
+    chunks = chunk_diff(files, budget=600)
+    assert chunks[0].paths == ["small_a.py", "small_b.py"]
+    assert all(c.tokens <= 600 for c in chunks)
+    assert sum(c.paths == ["big.py"] for c in chunks) > 1
+    assert sum(c.paths == ["huge_hunk.py"] for c in chunks) > 1
+
+    text = "\n".join(c.text for c in chunks)
+    for path, hunks, lines in (("big.py", 4, 40), ("huge_hunk.py", 1, 300)):
+        assert all(f"+line {h}-{i} of {path}\n" in text + "\n" for h in range(hunks) for i in range(lines))
+
+
+# Тест 2: части ревьюятся параллельно с ограничением, вердикты и комментарии сливаются
+def test_review_parts_in_parallel(monkeypatch):
+    monkeypatch.setattr(settings, "REVIEW_CHUNK_TOKENS", 600)
+    monkeypatch.setattr(settings, "REVIEW_MAX_CONCURRENCY", 2)
+    state = {"running": 0, "peak": 0, "prompts": []}
+    lock = threading.Lock()
+
+    def fake_review(messages):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            state["prompts"].append(messages)
+        time.sleep(0.1)
+        with lock:
+            state["running"] -= 1
+        diff = messages[-1].content
+        bad = "bad.py" in diff
+        return ReviewResult(
+            general_summary="bug" if bad else "fine",
+            comments=[ReviewComment(path="bad.py", line=1, body="Off by one")] if bad else [],
+            action="REQUEST_CHANGES" if bad else "Approve",
+        )
+
+    reviewer = ReviewerAgent()
+    reviewer.structured_llm = RunnableLambda(fake_review)
+    diff = "\n".join([file_patch("ok.py", 6, 30), file_patch("bad.py", 1, 3)])
+    result = reviewer.review_pr("Fix the loop", diff)
+
+    assert len(state["prompts"]) > 2 and state["peak"] == 2
+    assert all(p[1].content == state["prompts"][0][1].content for p in state["prompts"])
+    assert result.action == "REQUEST_CHANGES"
+    assert [c.body for c in result.comments] == ["Off by one"]
+    assert "**bad.py** (REQUEST_CHANGES): bug" in result.general_summary
+
+
+GIT_DIFF = """diff --git a/src/app.py b/src/app.py
+index 1..2 100644
+--- a/src/app.py
++++ b/src/app.py
+@@ -1,2 +1,2 @@
+ def f():
+-    return 1
++    return 2
+@@ -10 +10,2 @@ def g():
++    pass
+diff --git a/logo.png b/logo.png
+new file mode 100644
+Binary files /dev/null and b/logo.png differ
+diff --git a/uv.lock b/uv.lock
+@@ -1 +1 @@
+-a
++b
+diff --git a/docs/generated.md b/docs/generated.md
+@@ -1 +1 @@
++x
+"""
+
+
+class FakeGithub:
+    def __init__(self, diff_error=False):
+        self.diff_error = diff_error
+        self.client = SimpleNamespace(per_page=2)
+        self.pages = [
+            [SimpleNamespace(filename="a.py", status="modified", additions=1, deletions=0, patch="@@ -1 +1 @@\n+a")],
+            [SimpleNamespace(filename="big.bin", status="added", additions=0, deletions=0, patch=None)],
+        ]
+
+    def get_pull_diff(self, repo_name, pr_number):
+        if self.diff_error:
+            raise GithubException(406, {"message": "diff too large"})
+        return GIT_DIFF
+
+    def get_pull(self, repo_name, pr_number):
+        return SimpleNamespace(changed_files=3, get_files=lambda: SimpleNamespace(get_page=self.pages.__getitem__))
+
+
+# Тест 3: загрузка диффа — структура по файлам и ханкам, бинарные/сгенерированные/игнорируемые без содержимого
+def test_ingest_pull_request(tmp_path):
+    (tmp_path / ".coderignore").write_text("docs/\n")
+    files = ingest_pull_request(FakeGithub(), "org/repo", 1, project_root=str(tmp_path))
+
+    assert [(f.path, len(f.hunks), f.skipped) for f in files] == [
+        ("src/app.py", 2, ""),
+        ("logo.png", 0, "binary"),
+        ("uv.lock", 0, "generated or vendored"),
+        ("docs/generated.md", 0, "ignored by the project's ignore rules"),
+    ]
+    assert files[0].describe() == "src/app.py (modified, +2/-1)"
+    assert files[1].status == "added"
+
+    fallback = ingest_pull_request(FakeGithub(diff_error=True), "org/repo", 1)
+    assert [(f.path, f.hunks, f.skipped) for f in fallback] == [
+        ("a.py", ["@@ -1 +1 @@\n+a"], ""),
+        ("big.bin", [], "binary or too large for the API"),
+    ]
+    assert "None" not in "".join(f.describe() for f in fallback)
+
+
+# Тест 4: у каждой части разрезанного ханка свой заголовок с пересчитанными началом и длиной
+def test_split_hunk_headers_cover_their_lines():
+    lines = [line for i in range(100) for line in (f" context {i}", f"-old {i}", f"+new {i}", f"+added {i}")]
+    hunk = "\n".join(["@@ -10,200 +20,300 @@ def handler():", *lines])
+
+    pieces = _split_oversized(hunk, budget=200)
+    assert len(pieces) > 2
+    old_line, new_line = 10, 20
+    for piece in pieces:
+        header, *body = piece.split("\n")
+        assert header.endswith(" @@ def handler():")
+        old_start, old_len, new_start, new_len = map(int, HUNK_RANGE.match(header).groups())
+        assert old_len == sum(line[0] in " -" for line in body) and new_len == sum(line[0] in " +" for line in body)
+        assert (old_start, new_start) == (old_line if old_len else old_line - 1, new_line if new_len else new_line - 1)
+        old_line, new_line = old_line + old_len, new_line + new_len
+    assert (old_line, new_line) == (210, 320)
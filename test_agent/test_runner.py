@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import src.runner
+from src.core.code_search import TrigramIndex
+from src.core.config import settings
+from src.core.context import work_dir_context
+from src.core.metrics import get_metrics_store, render
+from src.core.pipeline_store import PipelineStatus
+from src.core.review_events import ReviewBus
+from src.core.symbol_index import SymbolIndex
+from src.runner import PipelineRunner
+
+
+class FakeGithub:
+    def __init__(self, bus: ReviewBus, verdicts):
+        self.bus = bus
+        self.verdicts = list(verdicts)
+        self.pulls = []
+
+    def get_issue(self, repo_name, issue_number):
+        return SimpleNamespace(title="Bug", body="It breaks", repository=SimpleNamespace(clone_url="file:///x"))
+
+    def create_pull_request(self, repo_name, title, body, head, base):
+        pr = SimpleNamespace(number=7, html_url="https://example.com/pull/7")
+        self.pulls.append(head)
+        # Ревьюер отвечает сразу после открытия PR
+        self.bus.publish(repo_name, pr.number, *self.verdicts.pop(0))
+        return pr
+
+
+class FakeGit:
+    default_branch = "main"
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def aclone(self):
+        self.calls.append("clone")
+
+    def create_branch(self, name):
+        self.calls.append(f"branch {name}")
+
+    def checkout_branch(self, name):
+        self.calls.append(f"checkout {name}")
+
+    async def acommit_all(self, message):
+        self.calls.append("commit")
+
+    async def apush(self, branch):
+        self.calls.append(f"push {branch}")
+
+    def cleanup(self):
+        self.calls.append("cleanup")
+
+
+class FakeAgent:
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.feedback = []
+
+    async def arun(self, task, feedback="", thread_id=None):
+        assert work_dir_context.get() == self.workspace
+        # Поиск по коду строит индекс рабочей копии, его должен освободить _release
+        TrigramIndex.for_workspace(self.workspace)
+        self.feedback.append(feedback)
+        return "Finished"
+
+    def export_state(self, thread_id):
+        return "{}"
+
+    def import_state(self, thread_id, data):
+        pass
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_DB_PATH", str(tmp_path / "events.sqlite3"))
+    monkeypatch.setattr(settings, "PIPELINES_DB_PATH", str(tmp_path / "pipelines.sqlite3"))
+    monkeypatch.setattr(settings, "TRACING", False)
+    monkeypatch.setattr(settings, "METRICS", False)
+    bus = ReviewBus(settings.EVENTS_DB_PATH)
+    github = FakeGithub(bus, [("changes_requested", "add a test"), ("approved", "")])
+    monkeypatch.setattr(src.runner, "get_github_client", lambda: github)
+
+    runner = PipelineRunner("org/repo", 1)
+    runner.workspace_path = str(tmp_path / "work")
+    runner.agent = FakeAgent(runner.workspace_path)
+    runner.calls = []
+    runner._make_local_git = lambda issue: FakeGit(runner.calls)
+    return runner
+
+
+# Тест 1: асинхронный пайплайн проходит ревью до одобрения и освобождает рабочую копию с индексами
+def test_arun_until_approved_releases_workspace(runner):
+    asyncio.run(runner.arun())
+
+    assert runner.agent.feedback == ["", "add a test"]
+    assert runner.calls.count("push fix/issue-1") == 2
+    assert runner.calls[-1] == "cleanup"
+    assert runner.workspace_path not in SymbolIndex._instances
+    assert runner.workspace_path not in TrigramIndex._instances
+
+
+# Тест 2: асинхронные start/resume приостанавливают пайплайн и продолжают его на той же ветке и PR,
+# ожидание ревью между ними попадает в метрики
+def test_astart_and_aresume(runner, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS", True)
+    monkeypatch.setattr(settings, "METRICS_DB_PATH", str(tmp_path / "metrics.sqlite3"))
+    pipeline = asyncio.run(runner.astart())
+    assert (pipeline.pr_number, pipeline.iteration) == (7, 1)
+    assert runner.store.get("org/repo", 1).status == PipelineStatus.WAITING
+
+    claimed = runner.store.claim("org/repo", 1, worker="async-1")
+    resumed = asyncio.run(runner.aresume(claimed, "add a test"))
+
+    assert resumed.iteration == 2 and resumed.feedback == "add a test"
+    assert runner.gh.pulls == ["fix/issue-1"]
+    assert runner.calls.count("push fix/issue-1") == 2 and "checkout fix/issue-1" in runner.calls
+    assert runner.calls.count("cleanup") == 2
+    assert runner.workspace_path not in TrigramIndex._instances
+
+    text = render(get_metrics_store().samples())
+    assert 'agent_stage_duration_seconds_count{stage="review_wait"} 1' in text
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+
+from src.core.context import work_dir_context
+from src.core.symbol_index import SymbolIndex
+from src.tools.edit_tool import replace_code_block
+
+
+def write(root, path, content):
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w") as f:
+        f.write(content)
+
+
+# Тест 1: поиск символов по всему репозиторию, в том числе в параллельном режиме
+def test_find_symbol_across_repo(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    monkeypatch.setattr(SymbolIndex, "PARALLEL_THRESHOLD", 2)
+    write(root, "pkg/service.py", "class Service:\n    def run(self):\n        return 1\n")
+    write(root, "pkg/util.py", "def run_all():\n    pass\n")
+    write(root, "web/app.ts", "function run(): number { return 1; }\n")
+    write(root, "__pycache__/junk.py", "def run():\n    pass\n")
+
+    index = SymbolIndex(root)
+    matches = index.find("run")
+
+    assert [(path, d.qualified_name) for path, d in matches] == [
+        ("pkg/service.py", "Service.run"),
+        (os.path.join("web", "app.ts"), "run"),
+        ("pkg/util.py", "run_all"),
+    ]
+    assert matches[0][1].kind == "method"
+    assert (matches[0][1].start_line, matches[0][1].end_line) == (2, 3)
+
+
+# Тест 2: правки через инструменты обновляют только изменённый файл
+def test_index_follows_edits(tmp_path):
+    root = str(tmp_path)
+    write(root, "a.py", "def old_name():\n    pass\n")
+    write(root, "b.py", "def other():\n    pass\n")
+    index = SymbolIndex.for_workspace(root)
+    index.ensure_built()
+    untouched = index.files["b.py"]
+
+    token = work_dir_context.set(root)
+    try:
+        replace_code_block.invoke({"filepath": "a.py", "old_code": "old_name", "new_code": "new_name"})
+    finally:
+        work_dir_context.reset(token)
+        SymbolIndex.drop(root)
+
+    assert [d.name for d in index.files["a.py"].definitions] == ["new_name"]
+    assert index.files["b.py"] is untouched
+
+
+def build_count(root, results):
+    index = SymbolIndex(root)
+    index.build()
+    results.put(len(index.files))
+
+
+# Тест 3: в демоническом процессе воркера большой репозиторий индексируется без пула процессов
+def test_build_inside_daemon_worker(tmp_path):
+    root = str(tmp_path)
+    for i in range(SymbolIndex.PARALLEL_THRESHOLD + 6):
+        write(root, f"pkg/m{i}.py", f"def f{i}():\n    pass\n")
+
+    results = multiprocessing.Queue()
+    worker = multiprocessing.Process(target=build_count, args=(root, results), daemon=True)
+    worker.start()
+    worker.join(60)
+
+    assert worker.exitcode == 0
+    assert results.get(timeout=5) == SymbolIndex.PARALLEL_THRESHOLD + 6
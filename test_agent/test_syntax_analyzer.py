@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.syntax_analyzer import SyntaxAnalyzer
+
+CODE = "class A:\n    \"\"\"Doc\x0c\"\"\"\n    def f(self):\n        return 1\n\nasync def g():\n    pass\n"
+
+
+# Тест 1: структурированный скелет, номера строк не сбиваются на \x0c
+def test_get_definitions_structured():
+    definitions = SyntaxAnalyzer.get_definitions(CODE, "a.py")
+
+    assert [(d.qualified_name, d.kind, d.start_line, d.end_line) for d in definitions] == [
+        ("A", "class", 1, 4),
+        ("A.f", "method", 3, 4),
+        ("g", "function", 6, 7),
+    ]
+    assert definitions[1].signature == "    def f(self):"
+    assert SyntaxAnalyzer.get_definitions(CODE, "notes.txt") is None
+
+
+# Тест 2: общий кэш запросов и парсеры по потокам
+def test_get_backbone_thread_safe():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: SyntaxAnalyzer.get_backbone(CODE, "a.py"), range(16)))
+
+    assert len(set(results)) == 1
+    assert results[0].split("\n")[1:4] == ["L1: class A:     \"\"\"Doc\x0c\"\"\"     def f(self):", "L3:     def f(self):", "L6: async def g():"]
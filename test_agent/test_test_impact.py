@@ -0,0 +1,78 @@
+import subprocess
+import pytest
+
+from src.core.context import work_dir_context
+from src.core.test_impact import changed_files, impacted_tests, module_names
+from src.tools.test_tool import run_tests
+
+
+def _git(root, *args):
+    subprocess.run(["git", *args], cwd=root, check=True, capture_output=True)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    files = {
+        "pytest.ini": "[pytest]\n",
+        "src/pkg/__init__.py": "",
+        "src/pkg/core.py": "def add(a, b):\n    return a + b\n",
+        "src/pkg/api.py": "from .core import add\n\ndef total(xs):\n    return sum(xs)\n",
+        "src/pkg/other.py": "VALUE = 1\n",
+        "tests/conftest.py": "import sys, os\nsys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))\n",
+        "tests/test_api.py": "from pkg.api import total\n\ndef test_total():\n    assert total([1, 2]) == 3\n",
+        "tests/test_other.py": "import pkg.other\n\ndef test_value():\n    assert pkg.other.VALUE == 1\n",
+    }
+    for path, content in files.items():
+        full_path = tmp_path / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text(content)
+
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init")
+
+    token = work_dir_context.set(str(tmp_path))
+    yield tmp_path
+    work_dir_context.reset(token)
+
+
+# Тест 1: тесты выбираются по графу импортов, включая транзитивные и относительные
+def test_impacted_tests_follow_imports(workspace):
+    assert module_names("src/pkg/__init__.py") == ["src.pkg", "pkg"]
+
+    (workspace / "src/pkg/core.py").write_text("def add(a, b):\n    return b + a\n")
+    assert changed_files(str(workspace)) == ["src/pkg/core.py"]
+    assert impacted_tests(str(workspace), ["src/pkg/core.py"]) == ["tests/test_api.py"]
+    assert impacted_tests(str(workspace), ["tests/conftest.py"]) is None
+    assert impacted_tests(str(workspace), ["tests/data/expected.json"]) is None
+    assert impacted_tests(str(workspace), ["README.md"]) == []
+
+
+# Тест 2: run_tests запускает только затронутые тесты и возвращает структурированный отчёт
+def test_run_tests_impact_mode(workspace):
+    (workspace / "src/pkg/api.py").write_text("def total(xs):\n    return sum(xs) + 1\n")
+
+    result = run_tests.invoke({})
+    assert result.startswith("Tests Failed: 0 passed, 1 failed")
+    assert "Selected 1 test files affected by 1 changed files." in result
+    assert "FAILED tests.test_api::test_total" in result
+    assert "test_other" not in result
+
+    (workspace / "src/pkg/api.py").write_text("def total(xs):\n    return sum(xs)\n")
+    result = run_tests.invoke({"mode": "all"})
+    assert result.startswith("Tests Passed: 1 passed")
+    assert "Remaining 1 test files." in result
+
+    # Ни один тест не импортирует изменённый файл: запускается весь набор, а не ничего
+    _git(workspace, "checkout", "-q", ".")
+    (workspace / "src/pkg/loader.py").write_text("NAME = 'plugin'\n")
+    result = run_tests.invoke({})
+    assert result.startswith("Tests Passed: 2 passed")
+    assert "None of the tests import the changed files, ran the full suite." in result
+
+
+# Тест 3: холодный режим запускает pytest тем же интерпретатором, что и тёплый, а не из PATH
+def test_run_tests_uses_own_interpreter(workspace, monkeypatch):
+    monkeypatch.setenv("PATH", str(workspace / "no-bin"))
+    result = run_tests.invoke({"test_path": "tests/test_other.py"})
+    assert result.startswith("Tests Passed: 1 passed")
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from src.agents.coder import ToolExecutorNode
+from src.core.config import settings
+from src.core.tracing import span, trace, traced
+
+
+class FailingTool:
+    name = "read_file"
+
+    def invoke(self, args):
+        raise ValueError("no such file")
+
+
+@traced("work.async")
+async def async_work():
+    with span("work.inner"):
+        await asyncio.sleep(0)
+
+
+# Тест 1: спаны вкладываются через потоки инструментов и async, трейс пишется в OTLP JSONL
+def test_trace_nesting_and_export(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "METRICS", False)
+    message = AIMessage(content="", tool_calls=[{"name": "read_file", "args": {"filepath": "a.py"}, "id": "1"}])
+
+    with trace("pipeline", repo="org/repo") as root:
+        result = ToolExecutorNode([FailingTool()])({"messages": [message]})
+        asyncio.run(async_work())
+
+    assert "no such file" in result["messages"][0].content
+    [path] = tmp_path.glob("*.jsonl")
+    spans = {s["name"]: s for s in map(json.loads, path.read_text().splitlines())}
+    assert spans["pipeline"]["spanId"] == root.span_id and "parentSpanId" not in spans["pipeline"]
+    assert spans["tools"]["parentSpanId"] == root.span_id
+    assert spans["tool.read_file"]["parentSpanId"] == spans["tools"]["spanId"]
+    assert spans["tool.read_file"]["status"]["code"] == 2
+    assert spans["work.inner"]["parentSpanId"] == spans["work.async"]["spanId"]
+    assert {"key": "repo", "value": {"stringValue": "org/repo"}} in spans["pipeline"]["attributes"]
+
+
+# Тест 2: вне трейса инструментированный код ничего не пишет, сводка считает токены
+def test_no_trace_and_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "METRICS", False)
+    with span("orphan") as orphan:
+        assert orphan is None
+
+    monkeypatch.setattr(settings, "TRACING", False)
+    with trace("pipeline"):
+        pass
+    assert not list(tmp_path.iterdir())
+
+    monkeypatch.setattr(settings, "TRACING", True)
+    with pytest.raises(RuntimeError):
+        with trace("pipeline"):
+            for tokens in (100, 50):
+                with span("llm.call") as call:
+                    call.set(**{"llm.input_tokens": tokens, "llm.cached_tokens": 10, "llm.output_tokens": 5})
+            raise RuntimeError("boom")
+
+    lines = next(tmp_path.glob("*.jsonl")).read_text().splitlines()
+    assert json.loads(lines[0])["status"] == {"code": 2, "message": "RuntimeError: boom"}
+    assert len(lines) == 3
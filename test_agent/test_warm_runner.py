@@ -0,0 +1,50 @@
+import os
+import pytest
+
+from src.core.config import settings
+from src.core.warm_runner import WarmRunner, warm_supported
+from src.tools.test_tool import run_pytest
+
+pytestmark = pytest.mark.skipif(not warm_supported(), reason="needs os.fork")
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TEST_RUNNER_MODE", "warm")
+    (tmp_path / "pytest.ini").write_text("[pytest]\n")
+    (tmp_path / "app.py").write_text("VALUE = 1\n")
+    (tmp_path / "conftest.py").write_text("")
+    (tmp_path / "test_app.py").write_text("import app\n\ndef test_value():\n    assert app.VALUE == 1\n")
+    yield tmp_path
+    WarmRunner.drop(str(tmp_path))
+
+
+# Тест 1: прогоны идут в форках одного процесса и видят свежие исходники
+def test_warm_runs_see_source_changes(project):
+    first = run_pytest(project, ["test_app.py"], 60)
+    runner = WarmRunner.for_workspace(str(project))
+    worker_pid = runner.process.pid
+    assert first.passed and first.count("passed") == 1
+
+    (project / "app.py").write_text("VALUE = 2\n")
+    second = run_pytest(project, ["test_app.py"], 60)
+    assert not second.passed and second.count("failed") == 1
+    assert runner.process.pid == worker_pid
+
+
+# Тест 2: изменение предзагруженного файла перезапускает воркер, таймаут убивает только форк
+def test_warm_runner_restarts_when_stale(project, monkeypatch):
+    # Project code importable by the worker, e.g. an editable install
+    monkeypatch.setenv("PYTHONPATH", str(project))
+    runner = WarmRunner.for_workspace(str(project), ["app"])
+    assert run_pytest(project, ["test_app.py"], 60).passed
+    worker_pid = runner.process.pid
+
+    (project / "app.py").write_text("VALUE = 2\n")
+    os.utime(project / "app.py", ns=(1, 1))
+    assert not run_pytest(project, ["test_app.py"], 60).passed
+    assert runner.process.pid != worker_pid
+
+    (project / "test_slow.py").write_text("import time\n\ndef test_slow():\n    time.sleep(30)\n")
+    slow = run_pytest(project, ["test_slow.py"], 1)
+    assert slow.timed_out and runner.process.poll() is None